@@ -0,0 +1,109 @@
+"""!
+    @file                       micropython.py
+    @brief                      A host-side stand-in for MicroPython's micropython module
+    @details                    The code emitter decorators leave functions unchanged, so code marked as native or
+                                viper runs as ordinary Python. Functions passed to @c schedule() are called at once,
+                                which on the PC is as soon as MicroPython would call them after an interrupt.
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+
+def const(expr):
+    """!
+        @brief                  Returns its parameter, as constants need no special treatment on the PC
+    """
+    return expr
+
+
+def native(fun):
+    """!
+        @brief                  Leaves a function to be run as ordinary Python
+    """
+    return fun
+
+
+def viper(fun):
+    """!
+        @brief                  Leaves a function to be run as ordinary Python
+    """
+    return fun
+
+
+def asm_thumb(fun):
+    """!
+        @brief                  Replaces a function written in assembly, which can't run on the PC
+        @details                Modules which define such functions can still be imported; calling one raises
+                                @c NotImplementedError.
+    """
+    def refuse(*args):
+        raise NotImplementedError(f"Inline assembler function '{fun.__name__}' can't be simulated")
+    refuse.__name__ = fun.__name__
+    return refuse
+
+
+def schedule(fun, arg):
+    """!
+        @brief                  Calls a function which MicroPython would call soon after an interrupt
+        @return                 @c True
+    """
+    fun(arg)
+    return True
+
+
+def alloc_emergency_exception_buf(size):
+    """!
+        @brief                  Does nothing, as exceptions in simulated interrupts can allocate memory
+    """
+
+
+def heap_lock():
+    """!
+        @brief                  Does nothing; memory allocation isn't locked on the PC
+        @return                 0
+    """
+    return 0
+
+
+def heap_unlock():
+    """!
+        @brief                  Does nothing; memory allocation isn't locked on the PC
+        @return                 0
+    """
+    return 0
+
+
+def kbd_intr(char):
+    """!
+        @brief                  Does nothing; Ctrl-C is handled by CPython
+    """
+
+
+def opt_level(level=None):
+    """!
+        @brief                  Returns 0, as there is no optimization level to set
+    """
+    return 0
+
+
+def mem_info(verbose=None):
+    """!
+        @brief                  Prints a note that memory information isn't available
+    """
+    print("mem_info: not available in simulation")
+
+
+def qstr_info(verbose=None):
+    """!
+        @brief                  Prints a note that interned string information isn't available
+    """
+    print("qstr_info: not available in simulation")
+
+
+def stack_use():
+    """!
+        @brief                  Returns 0, as stack use isn't measured
+    """
+    return 0
@@ -0,0 +1,304 @@
+"""!
+    @file                       motor_plant.py
+    @brief                      A simulated brushed DC motor with a gearbox and quadrature encoder
+    @details                    This module models the motors of the ME405 kit so that the motor tasks can be tuned on
+                                a PC. A plant is attached to two simulated timers in @c pyb: the PWM timer which
+                                @c MotorDriver drives and the encoder timer which @c EncoderReader reads. Whenever the
+                                program reads the encoder count or changes a PWM duty cycle, the plant works out how
+                                the motor has moved since it was last asked, using the simulated time in @c utime, and
+                                puts the new count in the encoder timer's 16-bit counter.
+
+                                The motor is modelled by its armature circuit and the inertia of the rotor and load:
+                                @code
+                                    L di/dt = V - R i - Ke w
+                                    J dw/dt = Kt i - b w - Tf
+                                    dtheta/dt = w
+                                @endcode
+                                where @c V is the supply voltage times the duty cycle, @c Tf is Coulomb friction
+                                opposing motion, and @c J and @c b include the load inertia and viscous friction seen
+                                through the gearbox. Between changes of duty cycle the equations are linear with
+                                constant inputs, so they are solved exactly with a matrix exponential rather than by
+                                small integration steps; this lets a 6 second step response be simulated in a few
+                                milliseconds.
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+import math
+import pyb
+import utime
+
+
+def _mat_mul(a, b):
+    """!
+        @brief                  Multiplies two square matrices stored as lists of rows
+    """
+    n = len(a)
+    return [[sum(a[r][k] * b[k][c] for k in range(n)) for c in range(n)] for r in range(n)]
+
+
+def _expm(m):
+    """!
+        @brief                  Computes the matrix exponential of a small square matrix
+        @details                The matrix is scaled down by a power of two until it is small, its exponential is found
+                                from a Taylor series, and the result is squared back up.
+        @param  m               The matrix, as a list of rows
+        @return                 The exponential of the matrix, as a list of rows
+    """
+    n = len(m)
+    norm = max(sum(abs(x) for x in row) for row in m)
+    squarings = max(0, int(math.ceil(math.log2(norm / 0.5)))) if norm > 0.5 else 0
+    scale = 2.0 ** -squarings
+    a = [[x * scale for x in row] for row in m]
+
+    result = [[1.0 if r == c else 0.0 for c in range(n)] for r in range(n)]
+    term = [row[:] for row in result]
+    for k in range(1, 13):
+        term = _mat_mul(term, a)
+        term = [[x / k for x in row] for row in term]
+        result = [[result[r][c] + term[r][c] for c in range(n)] for r in range(n)]
+
+    for _ in range(squarings):
+        result = _mat_mul(result, result)
+    return result
+
+
+class DCMotorPlant:
+    """!
+    @brief                      A simulated DC motor, gearbox and encoder attached to simulated timers
+    @details                    The default parameters are rough values for a small 12 V gearmotor with an encoder on
+                                the motor shaft; they give step responses of the same character as those in the
+                                README. All units are SI except where noted.
+    """
+
+    ## Largest time step in microseconds taken at once, so changes of friction direction are found promptly
+    MAX_STEP_US = 10000
+
+    def __init__(self, supply_voltage=12.0, resistance=2.0, inductance=0.002, torque_constant=0.05,
+                 back_emf_constant=0.05, rotor_inertia=1.5e-5, load_inertia=0.0, gear_ratio=1.0,
+                 viscous_friction=1e-5, coulomb_friction=0.004, counts_per_rev=1024, direction=1):
+        """!
+            @brief                      Creates a motor model at rest
+            @param  supply_voltage      The voltage across the motor at 100% duty cycle
+            @param  resistance          The armature resistance in ohms
+            @param  inductance          The armature inductance in henries
+            @param  torque_constant     The torque constant in N*m/A
+            @param  back_emf_constant   The back EMF constant in V*s/rad
+            @param  rotor_inertia       The inertia of the rotor in kg*m^2
+            @param  load_inertia        The inertia of the load on the gearbox output shaft in kg*m^2
+            @param  gear_ratio          The number of motor turns per turn of the output shaft
+            @param  viscous_friction    Viscous friction at the motor shaft in N*m*s/rad
+            @param  coulomb_friction    Coulomb friction at the motor shaft in N*m
+            @param  counts_per_rev      Encoder counts per turn of the motor shaft, after quadrature decoding
+            @param  direction           1 if positive duty cycles make the count go up, -1 if they make it go down
+        """
+        self.supply_voltage = supply_voltage
+        self.resistance = resistance
+        self.inductance = inductance
+        self.torque_constant = torque_constant
+        self.back_emf_constant = back_emf_constant
+        self.inertia = rotor_inertia + load_inertia / (gear_ratio * gear_ratio)
+        self.gear_ratio = gear_ratio
+        self.viscous_friction = viscous_friction
+        self.coulomb_friction = coulomb_friction
+        self.counts_per_rev = counts_per_rev
+        self.direction = direction
+
+        ## Armature current in amperes
+        self.current = 0.0
+        ## Motor shaft speed in rad/s
+        self.speed = 0.0
+        ## Motor shaft angle in radians
+        self.angle = 0.0
+
+        self._pwm_timer = None
+        self._enc_timer = None
+        self._pwm_channels = (1, 2)
+        self._last_us = None
+        self._cache = {}
+
+    def attach(self, pwm_timer, encoder_timer, pwm_channels=(1, 2)):
+        """!
+            @brief                  Connects the motor to a PWM timer and an encoder timer
+            @details                Timers may be attached before or after the drivers set them up. The PWM channels
+                                    are given in the order used by @c MotorDriver: the first drives the motor in the
+                                    positive direction and the second in the negative direction.
+            @param  pwm_timer       The number of the timer, or the timer, whose channels drive the motor
+            @param  encoder_timer   The number of the timer, or the timer, which counts encoder pulses
+            @param  pwm_channels    The channel numbers for the positive and negative directions
+            @return                 The plant, so that creating and attaching can be done in one line
+        """
+        self._pwm_timer = pwm_timer if isinstance(pwm_timer, pyb.Timer) else pyb.Timer(pwm_timer)
+        self._enc_timer = encoder_timer if isinstance(encoder_timer, pyb.Timer) else pyb.Timer(encoder_timer)
+        self._pwm_channels = pwm_channels
+        self._pwm_timer.add_hook(self._on_access)
+        if self._enc_timer is not self._pwm_timer:
+            self._enc_timer.add_hook(self._on_access)
+        self._last_us = utime.now_us()
+        return self
+
+    def duty(self):
+        """!
+            @brief                  Finds the duty cycle now applied to the motor
+            @return                 The duty cycle from -100 to 100 percent
+        """
+        positive = self._pwm_timer.channel(self._pwm_channels[0])
+        negative = self._pwm_timer.channel(self._pwm_channels[1])
+        level = 0.0
+        if positive is not None:
+            level += positive.pulse_width_percent()
+        if negative is not None:
+            level -= negative.pulse_width_percent()
+        return level
+
+    def counts(self):
+        """!
+            @brief                  Returns the encoder position, without the 16-bit wraparound of the timer
+            @return                 The number of encoder counts from the starting position
+        """
+        return self.direction * self.angle * self.counts_per_rev / (2 * math.pi)
+
+    def output_angle(self):
+        """!
+            @brief                  Returns the angle of the gearbox output shaft in radians
+        """
+        return self.angle / self.gear_ratio
+
+    def update(self, now_us=None):
+        """!
+            @brief                  Brings the motor's state up to the present time and updates the encoder count
+            @details                This is called automatically when the program uses either timer; it may also be
+                                    called to look at the motor's state at other times.
+            @param  now_us          The time to which to simulate, or @c None for the present simulated time
+        """
+        if now_us is None:
+            now_us = utime.now_us()
+        if self._last_us is None:
+            self._last_us = now_us
+        voltage = self.direction * self.supply_voltage * self.duty() / 100.0
+        while self._last_us < now_us:
+            step = min(now_us - self._last_us, self.MAX_STEP_US)
+            self._step(voltage, step)
+            self._last_us += step
+        self._enc_timer.counter(int(math.floor(self.counts())))
+
+    def _on_access(self, timer):
+        """!
+            @brief                  Called by an attached timer before its count is read or a pulse width is changed
+        """
+        self.update()
+
+    def _matrices(self, dt_us):
+        """!
+            @brief                  Finds the state transition for a time step, caching it for reuse
+            @details                The state is (current, speed, angle) and the inputs are (voltage, friction
+                                    torque). The step is found from the exponential of the system matrix augmented
+                                    with the input matrix.
+            @return                 The exponential of the augmented matrix for the step
+        """
+        matrices = self._cache.get(dt_us)
+        if matrices is None:
+            inv_l = 1.0 / self.inductance
+            inv_j = 1.0 / self.inertia
+            dt = dt_us * 1e-6
+            m = [[-self.resistance * inv_l, -self.back_emf_constant * inv_l, 0.0, inv_l, 0.0],
+                 [self.torque_constant * inv_j, -self.viscous_friction * inv_j, 0.0, 0.0, -inv_j],
+                 [0.0, 1.0, 0.0, 0.0, 0.0],
+                 [0.0, 0.0, 0.0, 0.0, 0.0],
+                 [0.0, 0.0, 0.0, 0.0, 0.0]]
+            matrices = _expm([[x * dt for x in row] for row in m])
+            if len(self._cache) > 512:
+                self._cache.clear()
+            self._cache[dt_us] = matrices
+        return matrices
+
+    def _advance(self, voltage, friction, dt_us):
+        """!
+            @brief                  Moves the state forward by a time step with constant voltage and friction
+        """
+        e = self._matrices(dt_us)
+        x = (self.current, self.speed, self.angle, voltage, friction)
+        self.current, self.speed, self.angle = (sum(e[r][k] * x[k] for k in range(5)) for r in range(3))
+
+    def _step(self, voltage, dt_us):
+        """!
+            @brief                  Moves the state forward by a time step, handling Coulomb friction
+            @details                While the motor turns, friction opposes the motion. If the speed changes sign
+                                    during the step, the step is done again in short pieces so that the moment of
+                                    stopping is found; a stopped motor stays stopped until its torque is greater
+                                    than the friction can hold.
+        """
+        start_speed = self.speed
+        friction = self._friction(voltage)
+        if friction is None:
+            # Stuck: current still responds to the voltage but the shaft doesn't turn
+            self._advance(voltage, self.torque_constant * self.current, dt_us)
+            self.speed = 0.0
+            return
+
+        saved = (self.current, self.speed, self.angle)
+        self._advance(voltage, friction, dt_us)
+        if self.coulomb_friction > 0 and start_speed != 0.0 and self.speed * start_speed < 0:
+            self.current, self.speed, self.angle = saved
+            piece = max(dt_us // 10, 1)
+            done = 0
+            while done < dt_us:
+                size = min(piece, dt_us - done)
+                before = self.speed
+                friction = self._friction(voltage)
+                if friction is None:
+                    self._advance(voltage, self.torque_constant * self.current, size)
+                    self.speed = 0.0
+                else:
+                    self._advance(voltage, friction, size)
+                    if before != 0.0 and self.speed * before < 0:
+                        self.speed = 0.0
+                done += size
+
+    def _friction(self, voltage):
+        """!
+            @brief                  Finds the Coulomb friction torque for the present state
+            @return                 The friction torque, or @c None if the motor is stopped and friction holds it
+        """
+        if self.speed > 0.0:
+            return self.coulomb_friction
+        if self.speed < 0.0:
+            return -self.coulomb_friction
+        torque = self.torque_constant * self.current
+        if abs(torque) <= self.coulomb_friction and abs(voltage) / self.resistance * self.torque_constant \
+                <= self.coulomb_friction:
+            return None
+        return self.coulomb_friction if torque > 0 or (torque == 0 and voltage > 0) else -self.coulomb_friction
+
+
+if __name__ == '__main__':
+    # Run motor 1 of main.py through a 6 second step response with a 10 ms motor task period
+    import os
+    import sys
+    import time
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    import cotask
+    import motor_task
+
+    plant = DCMotorPlant().attach(3, 8)
+    motor1 = motor_task.MotorTask((None, None, None, None), 'A10', 'B4', 'B5', 3, 'C6', 'C7', 8, 0.1)
+    motor1.set_setpoint(24000)
+    log = []
+
+    def motor_fun():
+        while True:
+            motor1.update()
+            log.append((utime.ticks_ms(), motor1.encoder.position))
+            yield 0
+
+    tasks = cotask.TaskList()
+    tasks.append(cotask.Task(motor_fun, name='Motor', priority=1, period=10))
+    start = time.perf_counter()
+    while utime.now_us() < 6000000:
+        tasks.idle_sched()
+    wall = time.perf_counter() - start
+    print(f"Simulated 6000 ms in {wall * 1000:.1f} ms of wall time")
+    for when, position in log[::50]:
+        print(f"{when:6d} ms {position:8d} counts")
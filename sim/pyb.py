@@ -0,0 +1,631 @@
+"""!
+    @file                       pyb.py
+    @brief                      A host-side stand-in for the parts of MicroPython's pyb module used in this project
+    @details                    This module lets the code in @c src run under CPython on a PC. It provides pins,
+                                timers with encoder counters and PWM channels, UARTs, and interrupt control which
+                                behave like the pyboard's closely enough for the motor tasks and scheduler to run
+                                unchanged.
+
+                                Each timer and UART number refers to one object, as on the pyboard, so simulated
+                                hardware can find the timers which the drivers create. A timer's encoder counter
+                                holds whatever value was last given to @c counter(value); functions added with
+                                @c Timer.add_hook() are called before the counter is read and before a channel's
+                                pulse width is changed, which lets a simulated motor bring the counter up to date
+                                only when the program looks at it. Timer callbacks are run by the simulated clock in
+                                @c utime at the timer's frequency.
+
+                                Bytes written to a UART are kept in its @c tx bytearray, or passed to a function given
+                                to @c UART.set_sink(). If an environment variable such as @c SIM_UART2 names a file,
+                                bytes written to that UART are written to the file.
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+import os
+import utime
+
+_irq_enabled = True
+_pending = []
+_timers = {}
+_uarts = {}
+_pins = {}
+
+
+def reset():
+    """!
+        @brief                  Forgets all timers, UARTs and pins
+        @details                This is used to give each simulated run a fresh start when many runs are made in one
+                                process. It should be called along with @c utime.reset(). Files opened for UARTs
+                                named in @c SIM_UARTn are closed.
+    """
+    global _irq_enabled
+    for timer in _timers.values():
+        timer.deinit()
+    _timers.clear()
+    for uart in _uarts.values():
+        if uart._stream is not None:
+            uart._stream.close()
+    _uarts.clear()
+    _pins.clear()
+    _pending.clear()
+    _irq_enabled = True
+
+
+def disable_irq():
+    """!
+        @brief                  Disables interrupts, returning the previous state for @c enable_irq()
+        @details                Simulated interrupts only happen when the clock is read or when sleeping, so this
+                                just keeps track of the state.
+        @return                 @c True if interrupts were enabled
+    """
+    global _irq_enabled
+    state = _irq_enabled
+    _irq_enabled = False
+    return state
+
+
+def enable_irq(state=True):
+    """!
+        @brief                  Enables interrupts, or restores the state returned by @c disable_irq()
+        @details                As on the pyboard, timer interrupts which came while interrupts were disabled are
+                                handled as soon as they are enabled again.
+        @param  state           @c True to enable interrupts
+    """
+    global _irq_enabled
+    _irq_enabled = state
+    while _irq_enabled and _pending:
+        _pending.pop(0)._interrupt()
+
+
+def repl_uart(uart=None):
+    """!
+        @brief                  Does nothing, as there is no REPL to move on the PC
+    """
+    return None
+
+
+def wfi():
+    """!
+        @brief                  Waits for the next interrupt
+        @details                The clock moves to the next timer callback or to the next SysTick interrupt, which
+                                happens every millisecond, whichever comes first.
+    """
+    now = utime.now_us()
+    wake = (now // 1000 + 1) * 1000
+    event = utime.next_event_us()
+    if event is not None and now <= event < wake:
+        wake = event
+    utime.sleep_us(wake - now)
+
+
+def delay(ms):
+    """!
+        @brief                  Waits for the given number of milliseconds
+    """
+    utime.sleep_ms(ms)
+
+
+def udelay(us):
+    """!
+        @brief                  Waits for the given number of microseconds
+    """
+    utime.sleep_us(us)
+
+
+def millis():
+    """!
+        @brief                  Returns the number of milliseconds since the simulated clock started
+    """
+    return utime.ticks_ms()
+
+
+def micros():
+    """!
+        @brief                  Returns the number of microseconds since the simulated clock started
+    """
+    return utime.ticks_us()
+
+
+# ============================================================================
+
+class _PinNames:
+    """!
+    @brief                      Lets pins be named as attributes, as in @c pyb.Pin.cpu.A10
+    """
+
+    def __getattr__(self, name):
+        """!
+            @brief              Returns the pin with the given name
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return Pin(name)
+
+
+class Pin:
+    """!
+    @brief                      A simulated GPIO pin
+    @details                    Pins are identified by name; making a pin object with the name of an existing one gives
+                                an object which shares its level with the existing one.
+    """
+    IN = 0
+    OUT_PP = 1
+    OUT_OD = 2
+    AF_PP = 3
+    AF_OD = 4
+    ANALOG = 5
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    cpu = _PinNames()
+    board = _PinNames()
+
+    def __init__(self, id, mode=-1, pull=-1, value=None, alt=-1, af=-1):
+        """!
+            @brief              Creates or refers to the pin with the given name
+            @param  id          The pin's name, such as @c 'A10', or another pin object
+            @param  mode        The pin mode, such as @c Pin.OUT_PP
+            @param  pull        The pull resistor setting, such as @c Pin.PULL_UP
+            @param  value       The initial level for an output pin
+        """
+        self._name = id._name if isinstance(id, Pin) else str(id)
+        state = _pins.setdefault(self._name, {'mode': Pin.IN, 'pull': Pin.PULL_NONE, 'value': 0})
+        self._state = state
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None, alt=-1, af=-1):
+        """!
+            @brief              Changes the pin's mode, pull resistor or level
+        """
+        if mode != -1:
+            self._state['mode'] = mode
+        if pull != -1:
+            self._state['pull'] = pull
+        if value is not None:
+            self._state['value'] = 1 if value else 0
+
+    def value(self, level=None):
+        """!
+            @brief              Reads or sets the pin's level
+            @param  level       The level to set, or @c None to read the level
+            @return             The pin's level if no level was given
+        """
+        if level is None:
+            return self._state['value']
+        self._state['value'] = 1 if level else 0
+
+    def high(self):
+        """!
+            @brief              Sets the pin high
+        """
+        self._state['value'] = 1
+
+    def low(self):
+        """!
+            @brief              Sets the pin low
+        """
+        self._state['value'] = 0
+
+    def on(self):
+        """!
+            @brief              Sets the pin high
+        """
+        self.high()
+
+    def off(self):
+        """!
+            @brief              Sets the pin low
+        """
+        self.low()
+
+    def name(self):
+        """!
+            @brief              Returns the pin's name
+        """
+        return self._name
+
+    def mode(self):
+        """!
+            @brief              Returns the pin's mode
+        """
+        return self._state['mode']
+
+    def pull(self):
+        """!
+            @brief              Returns the pin's pull resistor setting
+        """
+        return self._state['pull']
+
+    def __repr__(self):
+        return f"Pin({self._name})"
+
+
+# ============================================================================
+
+class TimerChannel:
+    """!
+    @brief                      A channel of a simulated timer
+    @details                    PWM channels remember their pulse width as a percentage of the timer period, which is
+                                what simulated hardware driven by the channel looks at.
+    """
+
+    def __init__(self, timer, number, mode, pin):
+        """!
+            @brief              Creates a timer channel; done by @c Timer.channel()
+        """
+        self._timer = timer
+        self._number = number
+        self.mode = mode
+        self.pin = pin
+        self._percent = 0.0
+        self._compare = 0
+        self._callback = None
+
+    def pulse_width_percent(self, value=None):
+        """!
+            @brief              Reads or sets the pulse width as a percentage of the timer period
+            @param  value       The pulse width from 0 to 100, or @c None to read it
+            @return             The pulse width if no value was given
+        """
+        if value is None:
+            return self._percent
+        self._timer._run_hooks()
+        self._percent = min(max(float(value), 0.0), 100.0)
+
+    def pulse_width(self, value=None):
+        """!
+            @brief              Reads or sets the pulse width in timer counts
+            @param  value       The pulse width in counts, or @c None to read it
+            @return             The pulse width if no value was given
+        """
+        span = self._timer.period() + 1
+        if value is None:
+            return int(self._percent * span / 100.0)
+        self.pulse_width_percent(100.0 * value / span)
+
+    def compare(self, value=None):
+        """!
+            @brief              Reads or sets the channel's compare value
+        """
+        if value is None:
+            return self._compare
+        self._compare = value
+
+    capture = compare
+
+    def callback(self, fun):
+        """!
+            @brief              Sets a function to be called by the channel; kept but never called
+        """
+        self._callback = fun
+
+
+class Timer:
+    """!
+    @brief                      A simulated hardware timer
+    @details                    There is one object for each timer number; making a timer object with a number which
+                                is already in use reinitializes and returns the existing object.
+    """
+    UP = 0
+    DOWN = 1
+    CENTER = 2
+    PWM = 0
+    PWM_INVERTED = 1
+    OC_TIMING = 2
+    OC_ACTIVE = 3
+    OC_INACTIVE = 4
+    OC_TOGGLE = 5
+    OC_FORCED_ACTIVE = 6
+    OC_FORCED_INACTIVE = 7
+    IC = 8
+    ENC_A = 9
+    ENC_B = 10
+    ENC_AB = 11
+    HIGH = 0
+    LOW = 2
+    RISING = 0
+    FALLING = 2
+    BOTH = 10
+
+    ## The frequency in Hz of the clock which drives the simulated timers
+    SOURCE_FREQ = 84000000
+
+    def __new__(cls, id, *args, **kwargs):
+        """!
+            @brief              Returns the existing object for this timer number, or makes one
+        """
+        timer = _timers.get(id)
+        if timer is None:
+            timer = super().__new__(cls)
+            timer._id = id
+            timer._hooks = []
+            timer._channels = {}
+            timer._callback = None
+            timer._event = None
+            timer._counter = 0
+            timer._prescaler = 0
+            timer._period = 0xFFFF
+            _timers[id] = timer
+        return timer
+
+    def __init__(self, id, *, freq=None, prescaler=None, period=None, mode=UP, div=1, callback=None, deadtime=0):
+        """!
+            @brief              Initializes the timer, if any settings are given
+            @param  id          The timer number
+            @param  freq        The frequency in Hz at which the timer's count rolls over
+            @param  prescaler   The prescaler setting, used with @c period if @c freq isn't given
+            @param  period      The largest count before the count rolls over
+            @param  callback    A function to be called each time the count rolls over
+        """
+        if freq is not None or prescaler is not None or period is not None:
+            self.init(freq=freq, prescaler=prescaler, period=period, mode=mode, callback=callback)
+
+    def init(self, *, freq=None, prescaler=None, period=None, mode=UP, div=1, callback=None, deadtime=0):
+        """!
+            @brief              Sets the timer's frequency or its prescaler and period
+        """
+        if freq is not None:
+            self._prescaler = 0
+            self._period = max(int(Timer.SOURCE_FREQ / freq) - 1, 0)
+        else:
+            if prescaler is not None:
+                self._prescaler = int(prescaler)
+            if period is not None:
+                self._period = int(period)
+        self.callback(callback)
+
+    def deinit(self):
+        """!
+            @brief              Stops the timer's callback and forgets its channels
+        """
+        self.callback(None)
+        self._channels.clear()
+
+    def channel(self, channel, mode=None, pin=None, **kwargs):
+        """!
+            @brief              Returns a timer channel, setting it up if a mode is given
+            @param  channel     The channel number
+            @param  mode        The channel mode, such as @c Timer.PWM or @c Timer.ENC_AB
+            @param  pin         The pin which the channel uses
+            @return             The channel object
+        """
+        if mode is None:
+            return self._channels.get(channel)
+        chan = TimerChannel(self, channel, mode, pin)
+        self._channels[channel] = chan
+        if 'pulse_width_percent' in kwargs:
+            chan.pulse_width_percent(kwargs['pulse_width_percent'])
+        elif 'pulse_width' in kwargs:
+            chan.pulse_width(kwargs['pulse_width'])
+        return chan
+
+    def counter(self, value=None):
+        """!
+            @brief              Reads or sets the timer's count
+            @param  value       The count to set, or @c None to read it
+            @return             The count if no value was given
+        """
+        if value is None:
+            self._run_hooks()
+            return self._counter
+        self._counter = int(value) % (self._period + 1)
+
+    def freq(self, value=None):
+        """!
+            @brief              Reads or sets the frequency at which the timer's count rolls over
+        """
+        if value is None:
+            return Timer.SOURCE_FREQ / ((self._prescaler + 1) * (self._period + 1))
+        self.init(freq=value, callback=self._callback)
+
+    def period(self, value=None):
+        """!
+            @brief              Reads or sets the largest count before the count rolls over
+        """
+        if value is None:
+            return self._period
+        self._period = int(value)
+
+    def prescaler(self, value=None):
+        """!
+            @brief              Reads or sets the prescaler
+        """
+        if value is None:
+            return self._prescaler
+        self._prescaler = int(value)
+
+    def source_freq(self):
+        """!
+            @brief              Returns the frequency of the clock which drives the timer
+        """
+        return Timer.SOURCE_FREQ
+
+    def callback(self, fun):
+        """!
+            @brief              Sets a function to be called, with the timer as its parameter, at each rollover
+            @details            The simulated clock calls the function at the timer's frequency.
+            @param  fun         The function, or @c None to stop calling it
+        """
+        if self._event is not None:
+            utime.cancel(self._event)
+            self._event = None
+        self._callback = fun
+        if fun is not None:
+            self._interval = 1e6 / self.freq()
+            self._next_fire = utime.now_us() + self._interval
+            self._event = utime.call_at(round(self._next_fire), self._fire)
+
+    def _fire(self):
+        """!
+            @brief              Calls the timer's callback and arranges the next call
+        """
+        self._next_fire += self._interval
+        self._event = utime.call_at(round(self._next_fire), self._fire)
+        if _irq_enabled:
+            self._interrupt()
+        elif self not in _pending:
+            # Like the timer's interrupt flag, this holds one interrupt however many rollovers happen meanwhile
+            _pending.append(self)
+
+    def _interrupt(self):
+        """!
+            @brief              Calls the timer's callback, if it still has one
+        """
+        if self._callback is not None:
+            self._callback(self)
+
+    def add_hook(self, fun):
+        """!
+            @brief              Adds a function to be called before the count is read or a pulse width is changed
+            @details            This is used by simulated hardware, not by code which runs on the pyboard.
+            @param  fun         A function which takes the timer as its parameter
+        """
+        self._hooks.append(fun)
+
+    def _run_hooks(self):
+        """!
+            @brief              Calls the functions added with @c add_hook()
+        """
+        for fun in self._hooks:
+            fun(self)
+
+    def __repr__(self):
+        return f"Timer({self._id}, prescaler={self._prescaler}, period={self._period})"
+
+
+# ============================================================================
+
+class UART:
+    """!
+    @brief                      A simulated UART
+    @details                    There is one object for each UART number. Bytes written are kept in @c tx or passed to
+                                the sink function; bytes given to @c feed() can be read back as received data.
+    """
+
+    def __new__(cls, bus, *args, **kwargs):
+        """!
+            @brief              Returns the existing object for this UART number, or makes one
+        """
+        uart = _uarts.get(bus)
+        if uart is None:
+            uart = super().__new__(cls)
+            uart._bus = bus
+            uart.tx = bytearray()
+            uart._rx = bytearray()
+            uart._sink = None
+            uart._stream = None
+            uart.baudrate = 9600
+            path = os.environ.get(f'SIM_UART{bus}')
+            if path:
+                uart._stream = open(path, 'ab', buffering=0)
+                uart._sink = uart._stream.write
+            _uarts[bus] = uart
+        return uart
+
+    def __init__(self, bus, baudrate=None, bits=8, parity=None, stop=1, **kwargs):
+        """!
+            @brief              Initializes the UART
+            @param  bus         The UART number
+            @param  baudrate    The baud rate, which is remembered but doesn't slow anything down
+        """
+        if baudrate is not None:
+            self.baudrate = baudrate
+
+    def init(self, baudrate=None, bits=8, parity=None, stop=1, **kwargs):
+        """!
+            @brief              Changes the UART's baud rate
+        """
+        if baudrate is not None:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        """!
+            @brief              Does nothing
+        """
+
+    def set_sink(self, fun):
+        """!
+            @brief              Sets a function to be called with each buffer of bytes written
+            @details            This is used by simulations, not by code which runs on the pyboard.
+            @param  fun         A function which takes a bytes-like object, or @c None to keep bytes in @c tx
+        """
+        self._sink = fun
+
+    def write(self, buf):
+        """!
+            @brief              Writes bytes or a string to the UART
+            @return             The number of bytes written
+        """
+        data = buf.encode() if isinstance(buf, str) else bytes(buf)
+        if self._sink is not None:
+            self._sink(data)
+        else:
+            self.tx.extend(data)
+        return len(data)
+
+    def writechar(self, char):
+        """!
+            @brief              Writes one byte to the UART
+        """
+        self.write(bytes((char & 0xFF,)))
+
+    def feed(self, data):
+        """!
+            @brief              Adds bytes to those waiting to be read, as if they had been received
+            @details            This is used by simulations, not by code which runs on the pyboard.
+        """
+        self._rx.extend(data.encode() if isinstance(data, str) else data)
+
+    def any(self):
+        """!
+            @brief              Returns the number of bytes waiting to be read
+        """
+        return len(self._rx)
+
+    def read(self, nbytes=None):
+        """!
+            @brief              Reads up to the given number of received bytes
+            @return             The bytes read, or @c None if none were waiting
+        """
+        if not self._rx:
+            return None
+        if nbytes is None:
+            nbytes = len(self._rx)
+        data = bytes(self._rx[:nbytes])
+        del self._rx[:nbytes]
+        return data
+
+    def readchar(self):
+        """!
+            @brief              Reads one received byte
+            @return             The byte, or -1 if none was waiting
+        """
+        data = self.read(1)
+        return data[0] if data else -1
+
+    def readline(self):
+        """!
+            @brief              Reads received bytes up to and including a newline
+            @return             The bytes read, or @c None if none were waiting
+        """
+        end = self._rx.find(b'\n')
+        return self.read(None if end < 0 else end + 1)
+
+    def readinto(self, buf, nbytes=None):
+        """!
+            @brief              Reads received bytes into a buffer
+            @return             The number of bytes read, or @c None if none were waiting
+        """
+        data = self.read(len(buf) if nbytes is None else nbytes)
+        if data is None:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def __repr__(self):
+        return f"UART({self._bus}, baudrate={self.baudrate})"
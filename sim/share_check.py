@@ -0,0 +1,149 @@
+"""!
+    @file                       share_check.py
+    @brief                      Checks the lock-free shares in @c task_share on a PC
+    @details                    The @c RingQueue and @c RecordShare classes are meant to be used between an interrupt
+                                service routine and a task without disabling interrupts, which is hard to exercise on
+                                the board. This file checks them with the simulated @c micropython module: a ring
+                                queue is filled and emptied in blocks of every size so that its indices wrap around
+                                at every place, its full and empty edges are tried, and a writer which interrupts a
+                                reader partway through copying a record is imitated to show that the torn copy is
+                                caught. Each check raises @c AssertionError if it fails.
+
+                                Example, from the repository folder:
+                                @code
+                                    python sim/share_check.py
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+import array
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import task_share
+
+
+def check_ring_wrap(size=7):
+    """!
+        @brief                  Checks that blocks put with @c put_many() come out of @c get_into() in order
+        @details                Blocks of every size up to the queue's size are put in and taken out many times, so
+                                the blocks start and end at every place in the buffer and often wrap around its end.
+        @param  size            The size of the queue
+    """
+    queue = task_share.RingQueue('l', size, name="Wrap")
+    items = array.array('l', range(size))
+    out = array.array('l', range(size))
+    expected = 0
+    for count in range(1, size + 1):
+        for _ in range(2 * size + 1):
+            for index in range(count):
+                items[index] = expected + index
+            assert queue.put_many(items, count) == count
+            assert queue.num_in() == count and queue.room() == size - count
+            assert queue.get_into(out, count) == count
+            assert list(out[:count]) == list(range(expected, expected + count)), (count, list(out[:count]))
+            assert queue.empty()
+            expected += count
+
+
+def check_ring_edges(size=5):
+    """!
+        @brief                  Checks how a @c RingQueue behaves when it is full and when it is empty
+        @param  size            The size of the queue
+    """
+    queue = task_share.RingQueue('l', size, name="Edges")
+    out = array.array('l', range(size + 2))
+
+    # Empty: nothing can be taken
+    assert queue.empty() and not queue.any() and not queue.full()
+    assert queue.try_get() is None and queue.try_get(-1) == -1
+    assert queue.get_into(out) == 0
+
+    # Full: the last place stays empty, and whatever doesn't fit is refused and counted
+    for item in range(size):
+        assert queue.try_put(item)
+    assert queue.full() and queue.room() == 0 and queue.num_in() == size
+    assert not queue.try_put(99)
+    assert queue.put_many(array.array('l', [98, 97])) == 0
+    assert queue._refused == 3
+
+    # A block is cut short at the room left, and a read at the number waiting
+    assert queue.try_get() == 0 and queue.try_get() == 1
+    assert queue.put_many(array.array('l', [5, 6, 7])) == 2
+    assert queue._refused == 4
+    assert queue.get_into(out) == size
+    assert list(out[:size]) == [2, 3, 4, 5, 6]
+    assert queue.empty() and queue.try_get() is None
+
+
+class _InterruptingBuffer(bytearray):
+    """!
+    @brief                      A snapshot buffer which imitates a writer interrupting the reader during a copy
+    @details                    When the reader copies the byte at @c at into this buffer, the record is published
+                                again with new values, as an interrupt service routine writing the record would.
+    """
+
+    def __init__(self, size, share, at, times):
+        """!
+            @brief              Creates the buffer
+            @param  size        The size of the record
+            @param  share       The @c RecordShare into which new values are published
+            @param  at          The index of the byte during whose copy the record is written
+            @param  times       How many copies are interrupted; later copies are left alone
+        """
+        super().__init__(size)
+        self._share = share
+        self._at = at
+        self._times = times
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        if index == self._at and self._times > 0:
+            self._times -= 1
+            self._share.publish([-self._share.sequence(), self._share.sequence()])
+
+
+def check_torn_read():
+    """!
+        @brief                  Checks that @c RecordShare.snapshot_into() notices when the record changes mid-copy
+    """
+    share = task_share.RecordShare('<qq', ('first', 'second'), name="Torn")
+    share.publish([1, 2])
+    size = len(share.new_buffer())
+
+    # Written during every copy: the only try fails and is counted
+    buf = _InterruptingBuffer(size, share, size // 2, 1)
+    assert not share.snapshot_into(buf, retries=1)
+    assert share._torn == 1
+
+    # Written during the first copy only: the second try gets the new record, consistent
+    buf = _InterruptingBuffer(size, share, size // 2, 1)
+    assert share.snapshot_into(buf, retries=2)
+    assert share._torn == 2
+    first, second = share.unpack_from(buf, 'first'), share.unpack_from(buf, 'second')
+    assert first == -second, (first, second)
+
+    # Halfway through a write, when the sequence number is odd, nothing is copied
+    share._seq += 1
+    assert not share.snapshot_into(share.new_buffer(), retries=3)
+    assert share._torn == 5
+    share._seq += 1
+    assert share.snapshot_into(share.new_buffer(), retries=1)
+
+
+def main():
+    """!
+        @brief                  Runs every check, printing the name of each as it passes
+    """
+    for check in (check_ring_wrap, check_ring_edges, check_torn_read):
+        check()
+        print(f'{check.__name__}: ok')
+
+
+if __name__ == '__main__':
+    main()
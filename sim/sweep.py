@@ -0,0 +1,184 @@
+"""!
+    @file                       sweep.py
+    @brief                      Runs simulated step responses over grids of controller gain and motor task period
+    @details                    Each configuration runs the motor task from @c src against the motor model in
+                                @c motor_plant, with the step task stepping the setpoint as @c task2_step in
+                                @c main.py does and logging the position. Configurations are spread over the PC's
+                                cores with a process pool, and each result gives the rise time, percent overshoot,
+                                settling time and steady-state error of the response, measured as
+                                @c temp/step_analysis.py measures runs logged from the boards.
+
+                                Example, from the repository folder:
+                                @code
+                                    python sim/sweep.py --kp 0.05 0.1 0.2 --period 10 20 30 50 100 --csv sweep.csv
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import math
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'temp'))
+
+import pyb
+import utime
+import cotask
+import task_share
+import motor_task
+import motor_plant
+import step_analysis
+
+## The names of the values in each result, in the order used for printing and CSV files
+RESULT_FIELDS = ('kp', 'period_ms', 'rise_time_ms', 'overshoot_pct', 'settling_time_ms', 'steady_state_error')
+
+
+def reset_simulation():
+    """!
+        @brief                  Clears the simulated clock, hardware and shares so a new run starts fresh
+    """
+    utime.reset()
+    pyb.reset()
+    task_share.share_list.clear()
+
+
+def simulate_step(kp, period_ms, setpoint=24000, duration_ms=6000, sample_period_ms=10, plant_params=None):
+    """!
+        @brief                      Simulates one step response of motor 1 from @c main.py
+        @param  kp                  The proportional gain for @c MotorController
+        @param  period_ms           The period of the motor task in milliseconds
+        @param  setpoint            The setpoint in encoder counts to which the motor is stepped at time zero
+        @param  duration_ms         How long to run the step response
+        @param  sample_period_ms    The period of the task which logs the motor position
+        @param  plant_params        A dictionary of parameters for @c DCMotorPlant, or @c None for the defaults
+        @return                     A tuple of lists of times in milliseconds and positions in encoder counts
+    """
+    reset_simulation()
+    motor_plant.DCMotorPlant(**(plant_params or {})).attach(3, 8)
+    setpoint_share = task_share.Share('q', thread_protect=False, name="setpoint")
+    position_share = task_share.Share('q', thread_protect=False, name="position")
+    times = []
+    positions = []
+
+    def motor_fun():
+        motor = motor_task.MotorTask((None, None, None, None), 'A10', 'B4', 'B5', 3, 'C6', 'C7', 8, kp)
+        yield 0
+        while True:
+            motor.set_setpoint(setpoint_share.get())
+            motor.update()
+            position_share.put(motor.encoder.position)
+            yield 0
+
+    def step_fun():
+        setpoint_share.put(setpoint)
+        start = utime.ticks_ms()
+        while True:
+            times.append(utime.ticks_diff(utime.ticks_ms(), start))
+            positions.append(position_share.get())
+            yield 0
+
+    tasks = cotask.TaskList()
+    tasks.append(cotask.Task(motor_fun, name="Motor", priority=1, period=period_ms))
+    tasks.append(cotask.Task(step_fun, name="Step", priority=2, period=sample_period_ms))
+    end_us = utime.now_us() + (duration_ms + sample_period_ms) * 1000
+    while utime.now_us() < end_us:
+        tasks.idle_sched()
+    return times, positions
+
+
+def step_metrics(times, positions, setpoint, band=0.02):
+    """!
+        @brief                  Finds the rise time, overshoot, settling time and steady-state error of a response
+        @details                The measures are found by @c step_analysis.analyze() in @c temp, so results of the
+                                sweep can be compared with those of runs logged from the boards. The response is
+                                assumed to start from zero. Times which are never reached are given as @c None.
+        @param  times           Sample times in milliseconds
+        @param  positions       Positions at those times
+        @param  setpoint        The setpoint to which the response was stepped
+        @param  band            The settling band as a fraction of the setpoint
+        @return                 A dictionary holding @c rise_time_ms, @c overshoot_pct, @c settling_time_ms and
+                                @c steady_state_error
+    """
+    results = step_analysis.analyze(times, positions, setpoint, initial=0, band=band)
+    return {name: None if math.isnan(results[name]) else results[name] for name in RESULT_FIELDS[2:]}
+
+
+def run_config(config):
+    """!
+        @brief                  Simulates one configuration and finds its step response measures
+        @details                This is the function run by each worker process. The drivers' printouts are
+                                discarded.
+        @param  config          A tuple of (Kp, period in ms, dictionary of parameters for @c simulate_step())
+        @return                 A dictionary of the configuration and its results, with keys @c RESULT_FIELDS
+    """
+    kp, period_ms, options = config
+    with contextlib.redirect_stdout(io.StringIO()):
+        times, positions = simulate_step(kp, period_ms, **options)
+    result = {'kp': kp, 'period_ms': period_ms}
+    result.update(step_metrics(times, positions, options.get('setpoint', 24000)))
+    return result
+
+
+def sweep(kps, periods, processes=None, **options):
+    """!
+        @brief                  Simulates the step response for every combination of gain and task period
+        @param  kps             The proportional gains to try
+        @param  periods         The motor task periods in milliseconds to try
+        @param  processes       The number of worker processes, or @c None for one per CPU core
+        @param  options         Other parameters passed to @c simulate_step() for every configuration
+        @return                 A list of result dictionaries from @c run_config(), in the order of the grid
+    """
+    configs = [(kp, period, options) for kp, period in itertools.product(kps, periods)]
+    if processes == 1:
+        return [run_config(config) for config in configs]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(run_config, configs, chunksize=max(1, len(configs) // (4 * (processes or os.cpu_count()))))
+
+
+def _format(value):
+    """!
+        @brief                  Formats a result value for the printed table
+    """
+    if value is None:
+        return '-'
+    return f'{value:.4g}' if isinstance(value, float) else str(value)
+
+
+def main():
+    """!
+        @brief                  Runs a sweep given on the command line and prints or saves the results
+    """
+    parser = argparse.ArgumentParser(description="Sweep simulated step responses over Kp and motor task period")
+    parser.add_argument('--kp', type=float, nargs='+', default=[0.1], help="proportional gains to try")
+    parser.add_argument('--period', type=int, nargs='+', default=[10, 20, 30, 50, 100],
+                        help="motor task periods in ms to try")
+    parser.add_argument('--setpoint', type=int, default=24000, help="step size in encoder counts")
+    parser.add_argument('--duration', type=int, default=6000, help="length of each run in ms")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--csv', help="file in which to save the results")
+    args = parser.parse_args()
+
+    results = sweep(args.kp, args.period, processes=args.processes, setpoint=args.setpoint,
+                    duration_ms=args.duration)
+    if args.csv:
+        with open(args.csv, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    print(''.join(f'{name:>20s}' for name in RESULT_FIELDS))
+    for result in results:
+        print(''.join(f'{_format(result[name]):>20s}' for name in RESULT_FIELDS))
+
+
+if __name__ == '__main__':
+    main()
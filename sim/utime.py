@@ -0,0 +1,296 @@
+"""!
+    @file                       utime.py
+    @brief                      A host-side stand-in for MicroPython's utime module
+    @details                    This module lets the code in @c src run under CPython on a PC. It provides the tick
+                                functions used by the tasks and scheduler, with the same 30-bit wraparound as on the
+                                pyboard, driven by a simulated clock.
+
+                                The clock has two modes, chosen with @c configure() or with the @c SIM_CLOCK
+                                environment variable:
+                                - @c virtual (the default) keeps its own time in microseconds. Each read of the clock
+                                  moves it forward by a small step, standing in for the time the code takes to run,
+                                  and each sleep moves it forward at once, so a program which sleeps between tasks
+                                  runs many times faster than real time.
+                                - @c scaled follows the PC's real clock multiplied by a speed factor given by
+                                  @c SIM_SPEED, for running with real waiting at a faster or slower pace.
+
+                                If @c SIM_STOP_MS is set, or @c stop_at() is called, @c KeyboardInterrupt is raised
+                                when the clock reaches the given time, as if Ctrl-C had been pressed, so a program
+                                such as @c main.py which runs until stopped can be run for a set simulated time.
+
+                                Simulated hardware such as timers in @c pyb uses @c call_at() to have functions called
+                                at given times, as interrupts would be. These functions are called as the clock passes
+                                their times, whether the time passes by reading the clock or by sleeping.
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+import heapq
+import os
+import time as _time
+
+## The number of distinct tick values before the tick counters wrap around
+TICKS_PERIOD = 1 << 30
+## The largest value returned by the tick functions
+TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+## Clock mode in which time moves only as the program reads the clock or sleeps
+VIRTUAL = 'virtual'
+## Clock mode in which time follows the PC's clock times a speed factor
+SCALED = 'scaled'
+
+# The time in seconds since 1970 at which the simulated clock starts, used by
+#  time() so that it gives plausible dates
+_EPOCH_START = 1672531200
+
+_mode = VIRTUAL
+_step_us = 1
+_scale = 1.0
+_now_us = 0
+_real_start = 0.0
+_events = []
+_event_ser = 0
+_in_event = False
+_stop_us = None
+
+
+def configure(mode=None, step_us=None, scale=None):
+    """!
+        @brief                  Chooses how the simulated clock runs
+        @details                Parameters which are not given keep their present values. Changing the mode does
+                                not reset the clock; it continues from the present time.
+        @param  mode            Either @c VIRTUAL or @c SCALED
+        @param  step_us         In virtual mode, the number of microseconds by which each read of the clock moves
+                                it forward
+        @param  scale           In scaled mode, the number of simulated seconds which pass per real second
+    """
+    global _mode, _step_us, _scale, _real_start, _now_us
+    now = _now()
+    if mode is not None:
+        if mode not in (VIRTUAL, SCALED):
+            raise ValueError(f"Unknown clock mode '{mode}'")
+        _mode = mode
+    if step_us is not None:
+        _step_us = int(step_us)
+    if scale is not None:
+        if scale <= 0:
+            raise ValueError("Clock scale must be positive")
+        _scale = float(scale)
+    _now_us = now
+    _real_start = _time.perf_counter()
+
+
+def reset():
+    """!
+        @brief                  Restarts the simulated clock at zero
+        @details                All pending calls from @c call_at() are forgotten. This is used to give each
+                                simulated run a fresh start when many runs are made in one process.
+    """
+    global _now_us, _real_start, _events, _in_event, _stop_us
+    _now_us = 0
+    _stop_us = None
+    _real_start = _time.perf_counter()
+    _events = []
+    _in_event = False
+
+
+def stop_at(time_us):
+    """!
+        @brief                  Arranges for @c KeyboardInterrupt to be raised when the clock reaches a given time
+        @param  time_us         The simulated time, as given by @c now_us(), or @c None to cancel
+    """
+    global _stop_us
+    _stop_us = None if time_us is None else int(time_us)
+
+
+def now_us():
+    """!
+        @brief                  Returns the simulated time without moving the clock forward
+        @details                Unlike the tick functions, this time doesn't wrap around, so it is convenient for
+                                simulated hardware which needs to know how much time has passed.
+        @return                 The simulated time in microseconds since the clock was started or reset
+    """
+    if _mode == SCALED:
+        _advance_to(_scaled_now())
+    return _now_us
+
+
+def call_at(time_us, fun):
+    """!
+        @brief                  Arranges for a function to be called at a given simulated time
+        @details                The function is called with no parameters when the clock reaches the given time. It
+                                is called once; a periodic source such as a timer arranges its next call from within
+                                the function.
+        @param  time_us         The simulated time, as given by @c now_us(), at which to call the function
+        @param  fun             The function to be called
+        @return                 A handle which may be passed to @c cancel()
+    """
+    global _event_ser
+    entry = [int(time_us), _event_ser, fun]
+    _event_ser += 1
+    heapq.heappush(_events, entry)
+    return entry
+
+
+def cancel(handle):
+    """!
+        @brief                  Cancels a call arranged with @c call_at()
+        @param  handle          The handle returned by @c call_at()
+    """
+    handle[2] = None
+
+
+def next_event_us():
+    """!
+        @brief                  Returns the time of the next call arranged with @c call_at()
+        @return                 The simulated time of the next pending call, or @c None if there are none
+    """
+    while _events and _events[0][2] is None:
+        heapq.heappop(_events)
+    return _events[0][0] if _events else None
+
+
+def _scaled_now():
+    """!
+        @brief                  Computes the simulated time in scaled mode from the PC's clock
+    """
+    return _now_us + int((_time.perf_counter() - _real_start) * _scale * 1e6)
+
+
+def _now():
+    """!
+        @brief                  Returns the simulated time in either mode without firing any events
+    """
+    return _scaled_now() if _mode == SCALED else _now_us
+
+
+def _advance_to(time_us):
+    """!
+        @brief                  Moves the simulated clock forward, calling any functions which come due
+        @details                Each function is called with the clock set to the time at which it was due, as if an
+                                interrupt had occurred then. Functions called in this way may read the clock, but
+                                doing so does not move it further or call more functions.
+        @param  time_us         The simulated time to which the clock is moved
+    """
+    global _now_us, _in_event, _real_start, _stop_us
+    if _in_event:
+        return
+    _in_event = True
+    try:
+        while _events and _events[0][0] <= time_us:
+            entry = heapq.heappop(_events)
+            if entry[2] is not None:
+                if entry[0] > _now_us:
+                    _now_us = entry[0]
+                entry[2]()
+    finally:
+        _in_event = False
+    if time_us > _now_us:
+        _now_us = time_us
+    if _mode == SCALED:
+        _real_start = _time.perf_counter()
+    if _stop_us is not None and _now_us >= _stop_us:
+        _stop_us = None
+        raise KeyboardInterrupt
+
+
+def _read():
+    """!
+        @brief                  Reads the clock for the tick functions, moving it forward in virtual mode
+    """
+    if _in_event:
+        return _now_us
+    if _mode == SCALED:
+        _advance_to(_scaled_now())
+    else:
+        _advance_to(_now_us + _step_us)
+    return _now_us
+
+
+def ticks_us():
+    """!
+        @brief                  Returns the simulated time in microseconds, wrapping around at @c TICKS_PERIOD
+    """
+    return _read() & TICKS_MAX
+
+
+def ticks_ms():
+    """!
+        @brief                  Returns the simulated time in milliseconds, wrapping around at @c TICKS_PERIOD
+    """
+    return (_read() // 1000) & TICKS_MAX
+
+
+def ticks_cpu():
+    """!
+        @brief                  Returns the simulated time with the finest resolution available, here microseconds
+    """
+    return ticks_us()
+
+
+def ticks_diff(ticks1, ticks2):
+    """!
+        @brief                  Finds the signed difference between two tick values, allowing for wraparound
+        @return                 The number of ticks from @c ticks2 to @c ticks1
+    """
+    return ((ticks1 - ticks2 + _TICKS_HALF) & TICKS_MAX) - _TICKS_HALF
+
+
+def ticks_add(ticks, delta):
+    """!
+        @brief                  Adds a number of ticks to a tick value, allowing for wraparound
+        @return                 The tick value @c delta ticks after @c ticks
+    """
+    return (ticks + delta) & TICKS_MAX
+
+
+def sleep_us(us):
+    """!
+        @brief                  Sleeps for the given number of microseconds of simulated time
+    """
+    if us <= 0:
+        return
+    if _mode == SCALED:
+        _time.sleep(us / 1e6 / _scale)
+        _advance_to(_scaled_now())
+    else:
+        _advance_to(_now_us + int(us))
+
+
+def sleep_ms(ms):
+    """!
+        @brief                  Sleeps for the given number of milliseconds of simulated time
+    """
+    sleep_us(int(ms) * 1000)
+
+
+def sleep(seconds):
+    """!
+        @brief                  Sleeps for the given number of seconds of simulated time
+    """
+    sleep_us(int(seconds * 1e6))
+
+
+def time():
+    """!
+        @brief                  Returns the simulated time of day in whole seconds since 1970
+    """
+    return _EPOCH_START + _read() // 1000000
+
+
+def _configure_from_environment():
+    """!
+        @brief                  Sets up the clock from the @c SIM_CLOCK, @c SIM_SPEED, @c SIM_TICK_US and
+                                @c SIM_STOP_MS variables
+    """
+    configure(mode=os.environ.get('SIM_CLOCK', VIRTUAL),
+              scale=float(os.environ.get('SIM_SPEED', '1.0')),
+              step_us=int(os.environ.get('SIM_TICK_US', '1')))
+    if os.environ.get('SIM_STOP_MS'):
+        stop_at(int(os.environ['SIM_STOP_MS']) * 1000)
+
+
+_configure_from_environment()
@@ -28,9 +28,60 @@ ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
-import gc                              # Memory allocation garbage collector
+import array                           # Preallocated histograms and trace
 import utime                           # Micropython version of time library
 import micropython                     # This shuts up incorrect warnings
+try:
+    import heapq                       # Priority queue for the deadline heap
+except ImportError:
+    import uheapq as heapq             # Older MicroPython name for heapq
+
+
+# Deadlines in the heap used by @c TaskList.heap_sched() are kept as offsets
+#  from a base time which is moved forward after this many microseconds, well
+#  before the offsets could be confused by the wraparound of @c ticks_us()
+_HEAP_REBASE_US = 1 << 27
+
+## Overrun policy: a task which is late by one or more periods runs once for
+#  each period until it has caught up with its schedule. This was the only
+#  behavior of earlier versions and is the default.
+CATCH_UP = 0
+## Overrun policy: a task which is late by one or more periods runs once, and
+#  the periods it missed are skipped; later runs keep the original phase.
+SKIP = 1
+## Overrun policy: a task which is late by one or more periods runs once, and
+#  its schedule is restarted so that the next run is one period from now.
+REALIGN = 2
+
+## The number of buckets in each profiling histogram. Bucket 0 counts times
+#  of 0 microseconds, bucket @c n counts times from 2**(n-1) up to 2**n - 1
+#  microseconds, and the last bucket also counts all longer times, so with 16
+#  buckets it holds times of 16.384 ms and more.
+HIST_BUCKETS = 16
+
+## The number of state transitions held by the trace buffer, @c trace, which
+#  is shared by all tasks; when it is full, the oldest are overwritten.
+TRACE_SIZE = 256
+
+## The state recorded in the trace buffer when a task yields something which
+#  isn't an integer that fits in 32 bits, such as @c None from a bare
+#  @c yield
+OTHER_STATE = -1
+
+
+@micropython.native
+def _bucket(us):
+    """!
+    Find the profiling histogram bucket for a time, which is the number of
+    bits needed to write the time in binary, limited to the last bucket.
+    @param us A time in microseconds
+    @return The index of the bucket in which the time is counted
+    """
+    bucket = 0
+    while us > 0 and bucket < HIST_BUCKETS - 1:
+        us >>= 1
+        bucket += 1
+    return bucket
 
 
 class Task:
@@ -68,8 +119,11 @@ class Task:
       @endcode
       """
 
+    # The identifier which will be given to the next task created
+    _next_id = 0
+
     def __init__(self, run_fun, name="NoName", priority=0, period=None,
-                 profile=False, trace=False, shares=()):
+                 profile=False, trace=False, shares=(), overrun=CATCH_UP):
         """!
         Initialize a task object so it may be run by the scheduler.
 
@@ -87,10 +141,19 @@ class Task:
                The time can be given in a @c float or @c int; it will be 
                converted to microseconds for internal use by the scheduler.
         @param profile Set to @c True to enable run-time profiling 
-        @param trace Set to @c True to generate a list of transitions between
-               states. @b Note: This slows things down and allocates memory.
+        @param trace Set to @c True to record transitions between states in
+               the trace buffer @c cotask.trace. This takes a little time but
+               no memory beyond that of the buffer, which keeps only the most
+               recent transitions, so tracing can be left on. States are
+               recorded as 32-bit integers; a yielded state which isn't one,
+               such as @c None, is recorded as @c OTHER_STATE.
         @param shares A list or tuple of shares and queues used by this task.
                If no list is given, no shares are passed to the task
+        @param overrun What to do when a timed task is found to be late by
+               one or more whole periods: @c CATCH_UP (the default) to run
+               it once per missed period, @c SKIP to drop the missed periods
+               and keep the original phase, or @c REALIGN to restart the
+               schedule one period from now
         """
         # The function which is run to implement this task's code. Since it 
         # is a generator, we "run" it here, which doesn't actually run it but
@@ -103,6 +166,11 @@ class Task:
         # The name of the task, hopefully a short and descriptive string.
         self.name = name
 
+        # A number which identifies the task in the trace buffer, different
+        #  for each task created
+        self.id = Task._next_id
+        Task._next_id += 1
+
         # The task's priority, an integer with higher numbers meaning higher
         #  priority. 
         self.priority = int(priority)
@@ -119,25 +187,39 @@ class Task:
             self.period = period
             self._next_run = None
 
+        # What to do when the task falls one or more periods behind
+        self._overrun = overrun
+
+        # Under @c CATCH_UP, the number of missed run times which have already
+        #  been counted but not yet caught up with, so that each is counted
+        #  only once however many catch-up runs see it
+        self._backlog = 0
+
         # Flag which causes the task to be profiled, in which the execution
         #  time of the @c run() method is measured and basic statistics kept. 
+        #  Histograms of run durations and lateness are allocated here once,
+        #  so that profiling never allocates memory while the task runs
         self._prof = profile
+        self._run_hist = array.array('L', [0] * HIST_BUCKETS)
+        self._late_hist = array.array('L', [0] * HIST_BUCKETS)
         self.reset_profile()
 
         # The previous state in which the task last ran. It is used to watch
         # for and track state transitions.
         self._prev_state = 0
 
-        # If transition tracing has been enabled, create an empty list in 
-        # which to store transition (time, to-state) stamps
+        # If transition tracing has been enabled, transitions are recorded in
+        # the trace buffer shared by all tasks
         self._trace = trace
-        self._tr_data = []
-        self._prev_time = utime.ticks_us()
 
         # Flag which is set true when the task is ready to be run by the
         #  scheduler
         self.go_flag = False
 
+        # The task list to which this task has been added, if any, so that
+        #  @c go() can wake that list's scheduler if it's sleeping
+        self._task_list = None
+
     def schedule(self) -> bool:
         """!
         This method is called by the scheduler; it attempts to run this task.
@@ -148,51 +230,51 @@ class Task:
         @return @c True if the task ran or @c False if it did not
         """
         if self.ready():
-
-            # Reset the go flag for the next run
-            self.go_flag = False
-
-            # If profiling, save the start time
-            if self._prof:
-                stime = utime.ticks_us()
-
-            # Run the method belonging to the state which should be run next
-            curr_state = next(self._run_gen)
-
-            # If profiling or tracing, save timing data
-            if self._prof or self._trace:
-                etime = utime.ticks_us()
-
-            # If profiling, save timing data
-            if self._prof:
-                self._runs += 1
-                runt = utime.ticks_diff(etime, stime)
-                if self._runs > 2:
-                    self._run_sum += runt
-                    if runt > self._slowest:
-                        self._slowest = runt
-
-            # If transition logic tracing is on, record a transition; if not,
-            # ignore the state. If out of memory, switch tracing off and 
-            # run the memory allocation garbage collector
-            if self._trace:
-                try:
-                    if curr_state != self._prev_state:
-                        self._tr_data.append(
-                            (utime.ticks_diff(etime, self._prev_time),
-                             curr_state))
-                except MemoryError:
-                    self._trace = False
-                    gc.collect()
-
-                self._prev_state = curr_state
-                self._prev_time = etime
-
+            self.run()
             return True
 
         else:
             return False
 
+    def run(self):
+        """!
+        This method runs the task's generator up to the next @c yield().
+        It is called by @c schedule() when the task is ready; schedulers which
+        keep track of readiness themselves, such as @c TaskList.heap_sched(),
+        call it directly once they have found that the task's @c go_flag is
+        set. Profiling and transition tracing are done here.
+        """
+        # Reset the go flag for the next run
+        self.go_flag = False
+
+        # If profiling, save the start time
+        if self._prof:
+            stime = utime.ticks_us()
+
+        # Run the method belonging to the state which should be run next
+        curr_state = next(self._run_gen)
+
+        # If profiling or tracing, save timing data
+        if self._prof or self._trace:
+            etime = utime.ticks_us()
+
+        # If profiling, save timing data
+        if self._prof:
+            self._runs += 1
+            runt = utime.ticks_diff(etime, stime)
+            if self._runs > 2:
+                self._run_sum += runt
+                if runt > self._slowest:
+                    self._slowest = runt
+                self._run_hist[_bucket(runt)] += 1
+
+        # If transition logic tracing is on, record a transition; if not,
+        # ignore the state
+        if self._trace:
+            if curr_state != self._prev_state:
+                trace.record(etime, self.id, curr_state)
+            self._prev_state = curr_state
+
     @micropython.native
     def ready(self) -> bool:
         """!
@@ -207,70 +289,190 @@ class Task:
         if self.period != None:
             late = utime.ticks_diff(utime.ticks_us(), self._next_run)
             if late > 0:
-                self.go_flag = True
-                self._next_run = utime.ticks_diff(self.period, 
-                                                  -self._next_run)
-
-                # If keeping a latency profile, record the data
-                if self._prof:
-                    self._late_sum += late
-                    if late > self._latest:
-                        self._latest = late
+                self._release(late)
 
         # If the task doesn't use a timer, we rely on go_flag to signal ready
         return self.go_flag
 
+    @micropython.native
+    def _release(self, late):
+        """!
+        This method marks a timed task as ready to run because its run time
+        has passed, then sets the time at which it should next run. It is
+        used by @c ready() and by @c TaskList.heap_sched(), which finds tasks
+        whose time has come without asking each task to check the time.
+        @param late How many microseconds after its run time the task was
+               found to be ready
+        """
+        self.go_flag = True
+
+        # Count the whole periods which have been missed; what is done about
+        # them depends on the overrun policy. When catching up, each release
+        # uses up one run time which was counted as missed before, so only
+        # periods beyond those are newly missed
+        missed = late // self.period
+        new_missed = missed
+        if self._overrun == CATCH_UP:
+            if self._backlog > 0:
+                self._backlog -= 1
+            new_missed = missed - self._backlog
+            self._backlog = missed
+        if new_missed > 0:
+            self._overruns += 1
+            self._missed += new_missed
+        if missed > 0:
+            if self._overrun == SKIP:
+                self._next_run = utime.ticks_diff((missed + 1) * self.period,
+                                                  -self._next_run)
+            elif self._overrun == REALIGN:
+                self._next_run = utime.ticks_diff(self.period + late,
+                                                  -self._next_run)
+            else:
+                self._next_run = utime.ticks_diff(self.period,
+                                                  -self._next_run)
+        else:
+            self._next_run = utime.ticks_diff(self.period, -self._next_run)
+
+        # If keeping a latency profile, record the data
+        if self._prof:
+            self._late_sum += late
+            if late > self._latest:
+                self._latest = late
+            self._late_hist[_bucket(late)] += 1
+
     def set_period(self, new_period):
         """!
         This method sets the period between runs of the task to the given
         number of milliseconds, or @c None if the task is triggered by calls
         to @c go() rather than time.
         @param new_period The new period in milliseconds between task runs
+               (if the task had no period before, call @c TaskList.refresh()
+               so that @c TaskList.heap_sched() will find it)
         """
+        self._backlog = 0
         if new_period is None:
             self.period = None
         else:
             self.period = int(new_period) * 1000
+            if self._next_run == None:
+                self._next_run = utime.ticks_diff(self.period,
+                                                  -utime.ticks_us())
 
     def reset_profile(self):
         """!
         This method resets the variables used for execution time profiling.
         This method is also used by @c __init__() to create the variables.
+        The counts of overruns (runs at which the task was late by at least
+        one period) and of missed periods are kept whether or not the task
+        is being profiled, and they are reset here too.
         """
         self._runs = 0
         self._run_sum = 0
         self._slowest = 0
         self._late_sum = 0
         self._latest = 0
+        self._overruns = 0
+        self._missed = 0
+        for bucket in range(HIST_BUCKETS):
+            self._run_hist[bucket] = 0
+            self._late_hist[bucket] = 0
+
+    def profile_into(self, buf, start=0):
+        """!
+        This method copies the task's profile into a buffer, such as an
+        @c array.array, without allocating memory, so that it can be sent
+        elsewhere; see @c telemetry.MetricsReporter. The items written are
+        the number of runs, the total and longest run durations, the total
+        and greatest lateness, the number of missed periods, then the
+        @c HIST_BUCKETS counts of the run duration histogram and the
+        @c HIST_BUCKETS counts of the lateness histogram. Times are in
+        microseconds.
+        @param buf The buffer into which the profile is written
+        @param start The index in @c buf of the first item written
+        @return The index in @c buf just after the last item written
+        """
+        buf[start] = self._runs
+        buf[start + 1] = self._run_sum
+        buf[start + 2] = self._slowest
+        buf[start + 3] = self._late_sum
+        buf[start + 4] = self._latest
+        buf[start + 5] = self._missed
+        start += 6
+        for bucket in range(HIST_BUCKETS):
+            buf[start + bucket] = self._run_hist[bucket]
+            buf[start + HIST_BUCKETS + bucket] = self._late_hist[bucket]
+        return start + 2 * HIST_BUCKETS
+
+    def get_histograms(self):
+        """!
+        This method returns a string showing the task's histograms of run
+        duration and lateness. Each column is one bucket, headed by the
+        shortest time in microseconds which it counts.
+        @return A string with a heading line and a line for each histogram
+        """
+        hist_str = f"{self.name:<16s}" + ''.join(
+            f"{(1 << bucket >> 1): 7d}" for bucket in range(HIST_BUCKETS))
+        if not self._prof:
+            return hist_str + '\n  not profiled'
+        hist_str += '\n  DURATION      '
+        hist_str += ''.join(f"{count: 7d}" for count in self._run_hist)
+        if self.period != None:
+            hist_str += '\n  LATENESS      '
+            hist_str += ''.join(f"{count: 7d}" for count in self._late_hist)
+        return hist_str
 
     def get_trace(self):
         """!
-        This method returns a string containing the task's transition trace.
-        The trace is a set of tuples, each of which contains a time and the
-        states from and to which the system transitioned. 
+        This method returns a string containing the task's transitions which
+        are still in the trace buffer. Each line holds a time in seconds since
+        the oldest transition in the buffer, of any task, and the states from
+        and to which the task transitioned.
         @return A possibly quite large string showing state transitions
         """
         tr_str = 'Task ' + self.name + ':'
         if self._trace:
             tr_str += '\n'
-            last_state = 0
-            total_time = 0.0
-            for item in self._tr_data:
-                total_time += item[0] / 1000000.0
-                tr_str += '{: 12.6f}: {: 2d} -> {:d}\n'.format (total_time, 
-                    last_state, item[1])
-                last_state = item[1]
+            last_state = None
+            for time, task_id, state in trace.entries():
+                if task_id == self.id:
+                    if last_state == None:
+                        tr_str += '{: 12.6f}: -> {:d}\n'.format(
+                            time / 1000000.0, state)
+                    else:
+                        tr_str += '{: 12.6f}: {: 2d} -> {:d}\n'.format(
+                            time / 1000000.0, last_state, state)
+                    last_state = state
         else:
             tr_str += ' not traced'
         return tr_str
 
+    def subscribe(self, share, watermark=1):
+        """!
+        Method to have this task woken when data is put into a queue or share.
+        Each time data is put in, including from an interrupt service routine,
+        this task's @c go() method is called if the queue holds at least
+        @c watermark items. A task with no period then runs only when there
+        is data for it, and a task with a period also runs early when data
+        arrives.
+        @param share The @c task_share.Queue, @c RingQueue, @c Share or
+               @c RecordShare to watch
+        @param watermark The number of items which must be in a queue for the
+               task to be woken, by default 1; for example, half the queue's
+               size wakes the task when the queue is half full
+        """
+        share.subscribe(self, watermark)
+
     def go(self):
         """!
         Method to set a flag so that this task indicates that it's ready to run.
         This method may be called from an interrupt service routine or from
         another task which has data that this task needs to process soon.
+        If the scheduler is sleeping in @c TaskList.idle_sched(), it is woken
+        so that this task can run without waiting for the sleep to end.
         """
         self.go_flag = True
+        if self._task_list != None:
+            self._task_list.wake_flag = True
 
     def __repr__(self):
         """!
@@ -291,9 +493,133 @@ class Task:
             rst += f"{avg_dur: 10.3f}{(self._slowest / 1000.0): 10.3f}"
             if self.period != None:
                 rst += f"{avg_late: 10.3f}{(self._latest / 1000.0): 10.3f}"
+                rst += f"{self._missed: 8d}"
         return rst
 
 
+# =============================================================================
+
+class TraceBuffer:
+    """!
+    A ring buffer of state transitions shared by all traced tasks.
+
+    Each entry holds the time at which a task changed state, the task's
+    @c id and its new state, in arrays which are allocated when the buffer is
+    created. Recording a transition only writes into the arrays, so tracing
+    never allocates memory; when the buffer is full, each new transition
+    overwrites the oldest one. Because all tasks share the buffer, the
+    entries form one timeline of the whole system, in which the order of
+    transitions in different tasks can be seen.
+
+    States are 32-bit integers; any other state is recorded as
+    @c OTHER_STATE. Print the buffer with
+    @c dump() and turn the printout into a file which can be viewed in
+    Perfetto or @c chrome://tracing with @c temp/trace_export.py.
+
+    @code
+        # Keep more transitions than the default by replacing the buffer
+        # before the scheduler is started
+        cotask.trace = cotask.TraceBuffer(1024)
+        ...
+        cotask.trace.dump()
+    @endcode
+    """
+
+    def __init__(self, size=TRACE_SIZE):
+        """!
+        Create a trace buffer and allocate its arrays.
+        @param size The number of transitions which the buffer holds
+        """
+        self._times = array.array('L', [0] * size)
+        self._ids = array.array('H', [0] * size)
+        self._states = array.array('l', [0] * size)
+        self._size = size
+        self._next = 0
+        self._count = 0
+        ## The number of transitions which have been overwritten
+        self.overwritten = 0
+
+    @micropython.native
+    def record(self, time, task_id, state):
+        """!
+        Record a transition, overwriting the oldest one if the buffer is full.
+        @param time The time of the transition, from @c utime.ticks_us()
+        @param task_id The @c id of the task which changed state
+        @param state The state into which the task changed
+        """
+        if not isinstance(state, int) or state < -0x80000000 \
+                or state > 0x7FFFFFFF:
+            state = OTHER_STATE
+        index = self._next
+        self._times[index] = time
+        self._ids[index] = task_id
+        self._states[index] = state
+        index += 1
+        self._next = 0 if index >= self._size else index
+        if self._count < self._size:
+            self._count += 1
+        else:
+            self.overwritten += 1
+
+    def clear(self):
+        """!
+        Remove all transitions from the buffer.
+        """
+        self._next = 0
+        self._count = 0
+        self.overwritten = 0
+
+    def num_in(self):
+        """!
+        Find how many transitions are in the buffer.
+        @return The number of transitions held
+        """
+        return self._count
+
+    def entries(self):
+        """!
+        Generator which gives the transitions in the buffer, oldest first.
+        Times are found from the differences between successive entries, so
+        they are correct across the wraparound of @c utime.ticks_us() as long
+        as no two successive transitions are more than about nine minutes
+        apart.
+        @return Tuples of the time in microseconds since the oldest
+                transition, the task's @c id and the new state
+        """
+        index = self._next - self._count
+        if index < 0:
+            index += self._size
+        time = 0
+        last = self._times[index]
+        for _ in range(self._count):
+            time += utime.ticks_diff(self._times[index], last)
+            last = self._times[index]
+            yield time, self._ids[index], self._states[index]
+            index += 1
+            if index >= self._size:
+                index = 0
+
+    def dump(self, tasks=None):
+        """!
+        Print the transitions in the buffer, oldest first, in a form read by
+        @c temp/trace_export.py. A line @c T followed by a task's @c id,
+        priority and name is printed for each task in the task list, then
+        a line @c S with the number of overwritten transitions, then a line
+        with the time in microseconds, task @c id and state of each
+        transition.
+        @param tasks The task list whose tasks are named, by default
+               @c cotask.task_list
+        """
+        if tasks == None:
+            tasks = task_list
+        for pri in tasks.pri_list:
+            for task in pri[2:]:
+                print('T', task.id, task.priority, task.name)
+        print('S', self.overwritten)
+        for time, task_id, state in self.entries():
+            print(time, task_id, state)
+
+
 # =============================================================================
 
 class TaskList:
@@ -309,6 +635,11 @@ class TaskList:
     look through the list to find the highest priority task which is ready to
     run at any given time. Tasks can also be scheduled in a simpler
     "round-robin" fashion.
+
+    Tasks which run on a timer are also kept in a min-heap sorted by the time
+    at which each task is next due to run. The @c heap_sched() scheduler uses
+    this heap so that only tasks whose time has come are looked at, rather
+    than every task checking the time on every pass through the scheduler.
     """
 
     def __init__(self):
@@ -322,6 +653,26 @@ class TaskList:
         #  that priority. 
         self.pri_list = []
 
+        # The heap of timed tasks used by @c heap_sched(). Each entry is a list
+        #  [deadline, serial number, task] where the deadline is the task's
+        #  next run time in microseconds after @c _heap_base and the serial
+        #  number breaks ties so tasks themselves are never compared. The heap
+        #  is rebuilt when tasks are added
+        self._heap = []
+        self._heap_base = utime.ticks_us()
+        self._heap_stale = True
+
+        # Entries taken from the heap during one pass, held so that each task
+        #  is released at most once per pass as it would be by @c ready()
+        self._due = []
+
+        # Flag set by @c Task.go() to end a sleep in @c idle_sched() early
+        self.wake_flag = False
+
+        # Scheduler-wide metrics: passes made by any of the schedulers and
+        #  time spent sleeping in @c idle_sched(), since @c _metrics_start
+        self.reset_metrics()
+
     def append(self, task):
         """!
         Append a task to the task list. The list will be sorted by task 
@@ -348,6 +699,76 @@ class TaskList:
         # Make sure the main list (of lists at each priority) is sorted
         self.pri_list.sort(key=lambda pri: pri[0], reverse=True)
 
+        # The deadline heap needs to be rebuilt to include the new task
+        self._heap_stale = True
+        task._task_list = self
+
+    def refresh(self):
+        """!
+        Rebuild the deadline heap used by @c heap_sched(). This is done
+        automatically when tasks are appended; it should be called by hand
+        if a task which had no period is given one with @c set_period().
+        """
+        self._heap_base = utime.ticks_us()
+        heap = []
+        ser_num = 0
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                if task.period != None and task._next_run != None:
+                    heap.append([utime.ticks_diff(task._next_run,
+                                                  self._heap_base),
+                                 ser_num, task])
+                    ser_num += 1
+        heapq.heapify(heap)
+        self._heap = heap
+        self._due = []
+        self._heap_stale = False
+
+    @micropython.native
+    def _rebase(self, now):
+        """!
+        Move the base time of the deadline heap forward to the given time.
+        Every deadline moves by the same amount, so the heap remains in order.
+        @param now The new base time, from @c utime.ticks_us()
+        """
+        shift = utime.ticks_diff(now, self._heap_base)
+        for entry in self._heap:
+            entry[0] -= shift
+        self._heap_base = now
+
+    @micropython.native
+    def _release_due(self):
+        """!
+        Release every timed task whose run time has passed. Tasks are taken
+        from the top of the deadline heap until one is found which isn't due
+        yet, so tasks which aren't due are never looked at. Each task which is
+        due has its go flag set and is put back into the heap at its next run
+        time.
+        """
+        now = utime.ticks_us()
+        if utime.ticks_diff(now, self._heap_base) > _HEAP_REBASE_US:
+            self._rebase(now)
+        elapsed = utime.ticks_diff(now, self._heap_base)
+
+        heap = self._heap
+        due = self._due
+        while heap and heap[0][0] < elapsed:
+            entry = heapq.heappop(heap)
+            task = entry[2]
+
+            # A task whose period has been removed no longer belongs here
+            if task.period == None:
+                continue
+
+            task._release(elapsed - entry[0])
+            entry[0] = utime.ticks_diff(task._next_run, self._heap_base)
+            due.append(entry)
+
+        # Put released tasks back in only now, so that a task which is still
+        # late isn't released several times in one pass
+        while due:
+            heapq.heappush(heap, due.pop())
+
     @micropython.native
     def rr_sched(self):
         """!
@@ -361,6 +782,8 @@ class TaskList:
         about the same amount of time before each is given a chance to run 
         again.
         """
+        self._passes += 1
+
         # For each priority level, run all tasks at that level
         for pri in self.pri_list:
             for task in pri[2:]:
@@ -375,6 +798,8 @@ class TaskList:
         called, it finds the highest priority task which is ready to run and
         calls that task's @c run() method.
         """
+        self._passes += 1
+
         # Go down the list of priorities, beginning with the highest
         for pri in self.pri_list:
             # Within each priority list, run tasks in round-robin order
@@ -391,16 +816,155 @@ class TaskList:
                 if ran:
                     return
 
+    @micropython.native
+    def heap_sched(self) -> bool:
+        """!
+        Run tasks according to their priorities, using the deadline heap.
+
+        This scheduler runs the same highest-priority-first, round-robin
+        within a priority policy as @c pri_sched(). Rather than asking each
+        task whether it is ready, which makes every timed task read the clock,
+        it reads the clock once, releases the timed tasks whose run time has
+        passed from the deadline heap, and then runs the highest priority
+        task whose go flag is set. Tasks without a period still run when their
+        @c go() method has been called. Tasks scheduled with this method
+        should not also be scheduled with @c pri_sched() or @c rr_sched().
+
+        @return @c True if a task was run or @c False if no task was ready
+        """
+        if self._heap_stale:
+            self.refresh()
+        self._release_due()
+        self._passes += 1
+
+        for pri in self.pri_list:
+            tries = 2
+            length = len(pri)
+            while tries < length:
+                task = pri[pri[1]]
+                tries += 1
+                pri[1] += 1
+                if pri[1] >= length:
+                    pri[1] = 2
+                if task.go_flag:
+                    task.run()
+                    return True
+
+        return False
+
+    def time_to_next(self):
+        """!
+        Find how long it is until the next timed task is due to run.
+        This doesn't account for tasks whose go flag is already set; if
+        @c heap_sched() has just returned @c False, no task is ready and this
+        is how long the scheduler has nothing to do.
+        @return The time in microseconds until the earliest run time in the
+                deadline heap, @c 0 if that time has already passed, or
+                @c None if no task runs on a timer
+        """
+        if self._heap_stale:
+            self.refresh()
+        if not self._heap:
+            return None
+        wait = self._heap[0][0] - utime.ticks_diff(utime.ticks_us(),
+                                                   self._heap_base)
+        return wait if wait > 0 else 0
+
+    def idle_sched(self, sleep_fun=utime.sleep_us, max_sleep=1000):
+        """!
+        Run a task if one is ready, otherwise sleep until one will be.
+
+        This method runs tasks as @c heap_sched() does. When no task is
+        ready, rather than returning at once so that the caller's loop spins,
+        it sleeps until the next timed task is due to run. Sleeping is done
+        by calling @c sleep_fun with a number of microseconds, so the way of
+        sleeping can be chosen to suit the hardware or a simulation. If
+        @c Task.go() is called during the sleep, by an interrupt or by a
+        timer callback, this method returns as soon as @c sleep_fun does so
+        the task can be run. No single call to @c sleep_fun asks for more than
+        @c max_sleep microseconds, which limits how long a task woken by
+        @c go() may wait if @c sleep_fun can't be cut short by an interrupt.
+
+        Example:
+          @code
+              while True:
+                  cotask.task_list.idle_sched()
+
+              # On a pyboard, sleep until the next interrupt (the SysTick
+              # interrupt occurs every millisecond) instead
+              while True:
+                  cotask.task_list.idle_sched(lambda us: pyb.wfi())
+          @endcode
+
+        @param sleep_fun A function which sleeps for about the number of
+               microseconds given as its parameter, or less if interrupted;
+               the default is @c utime.sleep_us()
+        @param max_sleep The longest time in microseconds for each call to
+               @c sleep_fun (default 1000)
+        """
+        # Clear the wake flag before looking for a ready task, so a call to
+        # go() made after the look can't be missed
+        self.wake_flag = False
+        if self.heap_sched():
+            return
+
+        wait = self.time_to_next()
+        start = utime.ticks_us()
+        while not self.wake_flag:
+            if wait == None or wait > max_sleep:
+                wait = max_sleep
+            elif wait <= 0:
+                break
+            sleep_fun(wait)
+            wait = self.time_to_next()
+        self._idle_us += utime.ticks_diff(utime.ticks_us(), start)
+
+    def reset_metrics(self):
+        """!
+        Reset the scheduler-wide metrics, starting a new measuring interval.
+        This is also used by @c __init__() to create the variables.
+        """
+        self._metrics_start = utime.ticks_us()
+        self._passes = 0
+        self._idle_us = 0
+
+    def metrics_into(self, buf, start=0):
+        """!
+        Copy the scheduler-wide metrics into a buffer without allocating
+        memory. The items written are the time in microseconds since the
+        metrics were reset, the number of passes made by the schedulers
+        (@c heap_sched(), @c pri_sched() or @c rr_sched()) in that time, the
+        microseconds spent sleeping in @c idle_sched(), and the number of
+        tasks in the list. Since times are microseconds, the metrics
+        should be reset at least every half hour or so to keep them within 32
+        bits.
+        @param buf The buffer into which the metrics are written
+        @param start The index in @c buf of the first item written
+        @return The index in @c buf just after the last item written
+        """
+        buf[start] = utime.ticks_diff(utime.ticks_us(), self._metrics_start)
+        buf[start + 1] = self._passes
+        buf[start + 2] = self._idle_us
+        num_tasks = 0
+        for pri in self.pri_list:
+            num_tasks += len(pri) - 2
+        buf[start + 3] = num_tasks
+        return start + 4
+
     def __repr__(self):
         """!
         Create some diagnostic text showing the tasks in the task list.
         """
         ret_str = 'TASK             PRI    PERIOD    RUNS   AVG DUR   MAX ' \
-            'DUR  AVG LATE  MAX LATE\n'
+            'DUR  AVG LATE  MAX LATE  MISSED\n'
         for pri in self.pri_list:
             for task in pri[2:]:
                 ret_str += str(task) + '\n'
 
+        elapsed = utime.ticks_diff(utime.ticks_us(), self._metrics_start)
+        if elapsed > 0:
+            ret_str += f"{(self._passes * 1000000 / elapsed):.0f} passes/s, " \
+                f"{(self._idle_us * 100 / elapsed):.1f}% idle\n"
         return ret_str
 
 
@@ -408,4 +972,8 @@ class TaskList:
 #  @c cotask.py is imported into a program. 
 task_list = TaskList()
 
+# This is the trace buffer in which all tasks record their state transitions.
+#  It may be replaced by a larger or smaller one before tasks are run.
+trace = TraceBuffer()
+
 
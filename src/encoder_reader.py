@@ -1,4 +1,7 @@
+import array
+import micropython
 import pyb
+import utime
 
 """!
     @file                       encoder_reader.py
@@ -6,12 +9,45 @@ import pyb
     @details                    This is a driver for interfacing with Quadrature Encoders. This driver
                                 needs input parameters of the timer which is the proper timer that
                                 corresponds to the pins and the 2 channel pins which the encoder outputs.
+                                Each reading is timestamped so that the driver can also estimate the velocity of the
+                                encoder shaft.
 
     @author                     Peyton Archibald
     @author                     Harrison Hirsch
     @date                       January 31, 2023
 """
 
+## Velocity estimation mode: no velocity is estimated
+VELOCITY_NONE = 0
+## Velocity estimation mode: the change in position since the last reading divided by the time between them
+VELOCITY_DELTA = 1
+## Velocity estimation mode: the change in position over the last few readings divided by the time they span
+VELOCITY_WINDOW = 2
+## Velocity estimation mode: an alpha-beta tracker, which predicts position from the estimated velocity and corrects
+#  both by fractions of the difference between predicted and measured position
+VELOCITY_TRACKER = 3
+
+
+@micropython.native
+def _per_second(distance, dt):
+    """!
+        @brief                  Divides a distance by a time in microseconds, giving the distance per second
+        @details                Multiplying the distance by a million first would make a number too big for the
+                                pyboard's small integers, which are 31 bits, so a new integer object would be made on
+                                the heap. Instead the distance is multiplied by a thousand twice, with the remainder
+                                of the first division carried into the second, which gives the same result as long as
+                                the distance is less than about a million counts. Times of a second or more are
+                                rounded down to whole milliseconds.
+        @param  distance        The distance in encoder counts
+        @param  dt              The time in microseconds, greater than zero
+        @return                 The distance per second, rounded down
+    """
+    if dt >= 1000000:
+        return distance * 1000 // (dt // 1000)
+    scaled = distance * 1000
+    whole = scaled // dt
+    return whole * 1000 + (scaled - whole * dt) * 1000 // dt
+
 
 class EncoderReader:
     """!
@@ -21,15 +57,24 @@ class EncoderReader:
                                 corresponds to the pins and the 2 channel pins which the encoder outputs.
     """
 
-    def __init__(self, pinA, pinB, timer):
+    def __init__(self, pinA, pinB, timer, velocity_mode=VELOCITY_DELTA, window=8, alpha=0.5, beta=0.1):
         """!
             @brief              Constructs an encoder object
             @details            Upon instantiation, the encoder object is created with the input parameters
                                 of the timer and channel pins which the encoder outputs on. Additionally,
-                                the position, count, and delta variables are created and zeroed.
+                                the position, count, and delta variables are created and zeroed, and the memory
+                                for velocity estimation is allocated.
             @param  timer       The timer number which the encoder uses
             @param  pinA        The pin A for the encoder which channel 1 output is on
             @param  pinB        The pin B for the encoder which channel 2 output is on.
+            @param  velocity_mode   How velocity is estimated: @c VELOCITY_NONE, @c VELOCITY_DELTA,
+                                @c VELOCITY_WINDOW or @c VELOCITY_TRACKER
+            @param  window      For @c VELOCITY_WINDOW, the number of readings over which velocity is found; the
+                                shaft should turn less than about a million counts over the window
+            @param  alpha       For @c VELOCITY_TRACKER, the fraction of the position error by which the position
+                                estimate is corrected
+            @param  beta        For @c VELOCITY_TRACKER, the fraction of the position error, per update period, by
+                                which the velocity estimate is corrected
         """
         print("Creating an encoder reader")
         self.pinA = pyb.Pin(pinA)
@@ -43,23 +88,100 @@ class EncoderReader:
         self.count = 0
         self.position = 0
 
+        self.velocity_mode = velocity_mode
+        self._alpha = alpha
+        self._beta = beta
+        # Readings kept for VELOCITY_WINDOW, as a ring buffer of positions and their times
+        self._window = window if velocity_mode == VELOCITY_WINDOW else 1
+        self._window_positions = array.array('q', [0] * self._window)
+        self._window_times = array.array('l', [0] * self._window)
+        self._reset_velocity()
+
+    def _reset_velocity(self):
+        """!
+            @brief              Forgets the readings used to estimate velocity and sets the velocity to zero
+        """
+        ## The estimated velocity in encoder counts per second
+        self.velocity = 0
+        self.time_us = utime.ticks_us()
+        self._readings = 0
+        self._window_index = 0
+        self._tracked_position = float(self.position)
+        self._tracked_velocity = 0.0
+
+    @micropython.native
     def update(self):
         """!
             @brief              Updates encoder position and delta
-            @details            update() uses the counter from the encoder to update the known position of the encoder and
-                                check if increase in counts is greater than half of the period to ensure that the position
-                                of the encoder is acurate and does not experience an overload.
+            @details            update() uses the counter from the encoder to update the known position of the encoder,
+                                allowing for the counter wrapping around so that the position is accurate and does not
+                                experience an overload. The position is a Python integer, which has no fixed limit, so
+                                it stays accurate however far the shaft turns; it fits the 64-bit @c 'q' shares used
+                                for positions and setpoints.
         """
 
+        self.update_count(self.encodertimer.counter(), utime.ticks_us())
+
+    @micropython.native
+    def update_count(self, count, time_us):
+        """!
+            @brief              Updates encoder position, delta and velocity from a count which has already been read
+            @details            update_count() does what update() does with a count read from the timer beforehand,
+                                so that the counters of several encoders can be read one right after another.
+            @param  count       The count read from the encoder's timer
+            @param  time_us     The time at which the count was read, from @c utime.ticks_us()
+        """
         self.initialCount = self.count
-        self.count = self.encodertimer.counter()
-        self.delta = self.count - self.initialCount
+        self.count = count
+        # The counter wraps around every 65536 counts; masking the difference to 16 bits and moving it into the range
+        # -32768 to 32767 gives the true change as long as the shaft moved less than half a period since the last
+        # update, using only integer arithmetic
+        self.delta = ((count - self.initialCount + 32768) & 0xFFFF) - 32768
         self.initialCount = self.count
-        if self.delta >= 65535 / 2:
-            self.delta -= 65535
-        elif self.delta <= -65535 / 2:
-            self.delta += 65535
         self.position += self.delta
+        if self.velocity_mode != VELOCITY_NONE:
+            self._update_velocity(time_us)
+
+    @micropython.native
+    def _update_velocity(self, time_us):
+        """!
+            @brief              Updates the velocity estimate with the latest position and its time
+            @details            The delta and window estimates use only small integer arithmetic, so they make no
+                                objects on the heap. The tracker works in floating point, which on the pyboard makes
+                                small objects on the heap.
+            @param  time_us     The time at which the position was read, from @c utime.ticks_us()
+        """
+        dt = utime.ticks_diff(time_us, self.time_us)
+        self.time_us = time_us
+        mode = self.velocity_mode
+        if mode == VELOCITY_DELTA:
+            if dt > 0 and self._readings > 0:
+                self.velocity = _per_second(self.delta, dt)
+            self._readings = 1
+        elif mode == VELOCITY_WINDOW:
+            index = self._window_index
+            # Until the window is full, measure from the first reading, which is the one at index 0
+            oldest = index if self._readings >= self._window else 0
+            span = utime.ticks_diff(time_us, self._window_times[oldest])
+            if self._readings > 0 and span > 0:
+                self.velocity = _per_second(self.position - self._window_positions[oldest], span)
+            self._window_positions[index] = self.position
+            self._window_times[index] = time_us
+            index += 1
+            self._window_index = 0 if index >= self._window else index
+            if self._readings < self._window:
+                self._readings += 1
+        elif mode == VELOCITY_TRACKER:
+            if self._readings == 0 or dt <= 0:
+                self._tracked_position = float(self.position)
+                self._readings = 1
+                return
+            dt_s = dt / 1000000
+            predicted = self._tracked_position + self._tracked_velocity * dt_s
+            error = self.position - predicted
+            self._tracked_position = predicted + self._alpha * error
+            self._tracked_velocity += self._beta * error / dt_s
+            self.velocity = int(self._tracked_velocity)
 
     def read(self):
         """!
@@ -71,6 +193,25 @@ class EncoderReader:
         self.update()
         return self.position, self.delta
 
+    @micropython.native
+    def read_position(self):
+        """!
+            @brief              Updates and returns only the encoder position
+            @details            read_position() does the same as read() but returns the position alone rather than
+                                a tuple, so that calling it in a fast control loop doesn't allocate any memory.
+            @return             The position of the encoder shaft
+        """
+        self.update()
+        return self.position
+
+    @micropython.native
+    def read_velocity(self):
+        """!
+            @brief              Returns the velocity found at the last update
+            @return             The estimated velocity of the encoder shaft in counts per second
+        """
+        return self.velocity
+
     def zero(self):
         """!
             @brief              Zeros all of the encoder values, including position
@@ -82,6 +223,7 @@ class EncoderReader:
         self.initialCount = 0
         self.count = 0
         self.position = 0
+        self._reset_velocity()
 
     def set(self, position):
         """!
@@ -93,6 +235,7 @@ class EncoderReader:
         """
         self.position = position
         self.delta = 0
+        self._reset_velocity()
 
 
 if __name__ == '__main__':
@@ -15,13 +15,47 @@
 """
 
 import gc
+import micropython
 import pyb
 import cotask
 import task_share
 import motor_task
+import motor_controller
+import telemetry
+import trajectory
 import utime
 import array
 
+## How long the step response runs, in milliseconds
+STEP_TIME = 6000
+
+## The period of the motor control task, in milliseconds
+CONTROL_PERIOD = 10
+
+## The motors, one row per axis: the pins and timers of the motor and encoder as given to @c motor_task.MotorTask,
+#  the proportional gain, and the setpoint in encoder counts for the step response
+AXES = (
+    (('A10', 'B4', 'B5', 3, 'C6', 'C7', 8), 0.1, 24000),
+    (('C1', 'A0', 'A1', 5, 'B6', 'B7', 4), 0.1, 16000),
+)
+
+## If True, the step response follows a smooth motion profile rather than jumping straight to the new setpoints
+USE_TRAJECTORY = False
+## Limits of the motion profile: velocity in counts/s, acceleration in counts/s^2 and jerk in counts/s^3; a jerk of
+#  None gives a trapezoidal profile rather than an S-curve
+TRAJECTORY_LIMITS = (20000, 40000, 400000)
+
+## If True, the motors are controlled from a timer interrupt and the scheduler runs only the other tasks
+TIMER_CONTROL = False
+## The frequency of the control loop when it is run from a timer interrupt, in Hz
+CONTROL_FREQ = 1000
+## The timer whose interrupt runs the control loop
+CONTROL_TIMER = 6
+
+## The time between reports of the scheduler metrics and task profiles sent to the serial port, in milliseconds, or
+#  None to send none
+METRICS_PERIOD = 1000
+
 
 # def task1_fun(shares):
 #     """!
@@ -60,99 +94,113 @@ import array
 #         yield 0
 
 
-def task1_motor(shares):
-    """!
-        @brief 				Task that sets up and runs motor 1
-        @details			This task sets up motor 1 on its first call, and runs it on every other call by setting the
-                            controller setpoint, updating the motor, and adding the position the appropriate share
-        @param shares       A list holding the shares used by all tasks
-    """
-    motor1 = motor_task.MotorTask(shares, 'A10', 'B4', 'B5', 3, 'C6', 'C7', 8, 0.1)
-    setpoint_share, setpoint_share2, motor1position, motor2position = shares
-    yield 0
-    while True:
-        motor1.set_setpoint(setpoint_share.get())
-        motor1.update()
-        motor1position.put(motor1.get_position()[0])
-        yield 0
-
-
-def task3_motor(shares):
-    """!
-        @brief 				Task that sets up and runs motor 2
-        @details			This task sets up motor 2 on its first call, and runs it on every other call by setting the
-                            controller setpoint, updating the motor, and adding the position the appropriate share
-        @param shares       A list holding the shares used by all tasks
-    """
-    motor2 = motor_task.MotorTask(shares, 'C1', 'A0', 'A1', 5, 'B6', 'B7', 4, 0.1)
-    setpoint_share, setpoint_share2, motor1position, motor2position = shares
-    yield 0
-    while True:
-        motor2.set_setpoint(setpoint_share2.get())
-        motor2.update()
-        motor2position.put(motor2.get_position()[0])
-        yield 0
-
-
 def task2_step(shares):
     """!
-        @brief 				Task that runs and stores data from a step response
-        @details			This task sets creates both setpoints, runs a step response, and outputs the data to a
-                            serial port
-        @param shares       A list holding the shares used by all tasks
+        @brief 				Task that runs a step response and queues its data to be streamed
+        @details			This task sets the setpoints of all axes, runs a step response, and puts a record of time,
+                            each motor's position and each setpoint into the sample queue each time it runs. The
+                            telemetry task streams the records to a serial port while the step response runs (see
+                            telemetry.py).
+        @param shares       A tuple holding a list of the setpoint shares, the record share of positions, the
+                            sample queue, and a trajectory.TrajectoryTask which moves the setpoints or @c None to step
+                            them
     """
-    u2 = pyb.UART(2, baudrate=115200)  # Set up the second USB-serial port
     currTime = 0  # Allocate memory for current time
-    storedData = []  # Allocate memory for stored data
-    setpoint_share, setpoint_share2, motor1position, motor2position = shares
-    setpoint_share.put(24000)
-    setpoint_share2.put(16000)
+    setpoint_shares, motor_state, sample_queue, planner = shares
+    num_axes = len(setpoint_shares)
+    snapshot = motor_state.new_buffer()  # Allocate memory for a copy of all the positions
+    dataPt = array.array('l', [0] * (1 + 2 * num_axes))  # Allocate memory for one record of data
+    dropped = 0  # Count records which didn't fit in the queue
+    if planner is None:
+        for setpoint_share, axis in zip(setpoint_shares, AXES):
+            setpoint_share.put(axis[2])
     input('Press Enter to perform a step response')
+    if planner is not None:
+        planner.move_to([axis[2] for axis in AXES])
     startTime = utime.ticks_ms()  # Begin start time counter
-    tst_flg = True
     yield 0
-    while tst_flg:
+    while True:
         stopTime = utime.ticks_ms()
         currTime = utime.ticks_diff(stopTime, startTime)  # Calculate current time
-        storedData.append(array.array('i', [currTime, motor1position.get(), motor2position.get()]))
-        print([currTime, motor1position.get(), motor2position.get()])
-        if storedData[len(storedData)-1][0] > 6000:
+        dataPt[0] = currTime
+        motor_state.snapshot_into(snapshot)
+        for axis in range(num_axes):
+            dataPt[1 + axis] = motor_state.unpack_from(snapshot, axis)
+            dataPt[1 + num_axes + axis] = setpoint_shares[axis].get()
+        if not telemetry.put_record(sample_queue, dataPt):  # Queue the record to be streamed
+            dropped += 1
+        print(list(dataPt[:1 + num_axes]))
+        if currTime > STEP_TIME:
             break
         yield 0
-    for dataPt in storedData:  # Write stored data to serial port
-        u2.write(f'{dataPt[0]}, {dataPt[1]}\r\n')
+    if dropped:
+        print(f'{dropped} records dropped')
+    while True:  # Step response done; the motors hold their positions
+        yield 0
 
 
 if __name__ == "__main__":
 
-    # Create a share and a queue to test function and diagnostic printouts
-    setpoint_share = task_share.Share('h', thread_protect=False, name="setpoint")
-    setpoint_share2 = task_share.Share('h', thread_protect=False, name="setpoint")
-    motor1_position_share = task_share.Share('q', thread_protect=False, name="motor1position")
-    motor2_position_share = task_share.Share('q', thread_protect=False, name="motor2position")
-
-    # Create the tasks. If trace is enabled for any task, memory will be
-    # allocated for state transition tracing, and the application will run out
-    # of memory after a while and quit. Therefore, use tracing only for
-    # debugging and set trace to False when it's not needed
-    motor_task1 = cotask.Task(task1_motor, name="Task_1", priority=1, period=20,
-                              profile=False, trace=False, shares=(setpoint_share, setpoint_share2, motor1_position_share, motor2_position_share))
-    motor_task2 = cotask.Task(task3_motor, name="Task_3", priority=1, period=10,
-                              profile=False, trace=False, shares=(setpoint_share, setpoint_share2, motor1_position_share, motor2_position_share))
+    # Create a setpoint and a position share for each axis, and the queue of records to be streamed. Shares used
+    # by a timer interrupt must be protected from being changed while they're read
+    setpoint_shares = [task_share.Share('q', thread_protect=TIMER_CONTROL, name=f"setpoint{axis + 1}")
+                       for axis in range(len(AXES))]
+    # The positions of all axes are published together, so readers always get positions from the same instant
+    motor_state = task_share.RecordShare('<' + 'q' * len(AXES),
+                                         [f"position_{axis + 1}" for axis in range(len(AXES))], name="positions")
+    record_size = 1 + 2 * len(AXES)
+    sample_queue = task_share.RingQueue('l', record_size * 32, name="samples")
+
+    # The telemetry task streams records from the sample queue to the second USB-serial port
+    u2 = pyb.UART(2, baudrate=115200)
+    streamer = telemetry.TelemetryStreamer(sample_queue, u2, record_size, chunk=8)
+
+    # All the motors are updated together by one group, either from a task or from a timer interrupt
+    control_period = 1000 / CONTROL_FREQ if TIMER_CONTROL else CONTROL_PERIOD
+    motors = motor_task.MotorGroup([(hardware, motor_controller.FixedPIDController(kp, period=control_period))
+                                    for hardware, kp, step in AXES], setpoint_shares, motor_state)
+
+    # Create the tasks. Tasks with trace enabled record their state transitions in cotask.trace, a fixed-size buffer
+    # which keeps the most recent ones, so tracing can be left on; print it with cotask.trace.dump()
+    motor_group_task = cotask.Task(motors.run, name="Motors", priority=1, period=CONTROL_PERIOD,
+                                   profile=True, trace=False)
+    planner = None
+    if USE_TRAJECTORY:
+        # The trajectory task moves the setpoints as often as the motors are controlled
+        planner = trajectory.TrajectoryTask(setpoint_shares, *TRAJECTORY_LIMITS)
+        cotask.task_list.append(cotask.Task(planner.run, name="Trajectory", priority=2, period=CONTROL_PERIOD,
+                                            profile=False, trace=False))
     stepresponse_task2 = cotask.Task(task2_step, name="Task_2", priority=2, period=60,
-                         profile=True, trace=False, shares=(setpoint_share, setpoint_share2, motor1_position_share, motor2_position_share))
-    cotask.task_list.append(motor_task1)
-    cotask.task_list.append(motor_task2)
+                         profile=True, trace=False, shares=(setpoint_shares, motor_state, sample_queue, planner))
+    # The telemetry task has no period; it runs only when a whole record has been put into the sample queue
+    telemetry_task = cotask.Task(streamer.run, name="Telemetry", priority=0, period=None,
+                                 profile=True, trace=False)
+    telemetry_task.subscribe(sample_queue, record_size)
+    if TIMER_CONTROL:
+        # Run the control loop from a timer interrupt at a steady rate; the scheduler runs only the other tasks
+        micropython.alloc_emergency_exception_buf(100)
+        motors.start_timer_control(CONTROL_TIMER, CONTROL_FREQ)
+    else:
+        cotask.task_list.append(motor_group_task)
     cotask.task_list.append(stepresponse_task2)
+    cotask.task_list.append(telemetry_task)
+    if METRICS_PERIOD is not None:
+        # The metrics task reports on the same serial port as the samples; the PC tells the frames apart by type
+        reporter = telemetry.MetricsReporter(u2)
+        cotask.task_list.append(cotask.Task(reporter.run, name="Metrics", priority=0, period=METRICS_PERIOD,
+                                            profile=False, trace=False))
 
     # Run the memory garbage collector to ensure memory is as defragmented as
     # possible before the real-time scheduler is started
     gc.collect()
 
-    # Run the scheduler with the chosen scheduling algorithm. Quit if ^C pressed
+    # Run the scheduler with the chosen scheduling algorithm, sleeping between
+    # task runs rather than spinning. Quit if ^C pressed
     while True:
         try:
-            cotask.task_list.pri_sched()
+            cotask.task_list.idle_sched()
         except KeyboardInterrupt:
             break
+    if TIMER_CONTROL:
+        motors.stop_timer_control()
     print('Done')
@@ -1,15 +1,25 @@
 """!
     @file                       motor_controller.py
-    @brief                      A universal proportional control algorithm
-    @details                    This is a class that implements a basic proportional control algorithm. The difference
-                                between a setpoint and current position is multiplied by a proportional gain value to
-                                produce an output.
+    @brief                      Universal proportional and PID control algorithms
+    @details                    This file contains a class that implements a basic proportional control algorithm. The
+                                difference between a setpoint and current position is multiplied by a proportional gain
+                                value to produce an output. It also contains PID controllers with feedforward, integrator
+                                anti-windup, a filtered derivative of the measurement and an output limit, in floating
+                                point and in integer fixed point for fast control loops on the board.
                                 
     @author                     Peyton Archibald
     @author                     Harrison Hirsch
     @date                       February 7, 2023
 """
 
+import micropython
+
+## Number of fractional bits in the gains and internal values of @c FixedPIDController
+FIXED_SHIFT = 16
+
+## Number of fractional bits kept in the filtered derivative of @c FixedPIDController
+DERIVATIVE_SHIFT = 4
+
 
 class MotorController:
     """!
@@ -74,3 +84,195 @@ class MotorController:
         dataPt = [time, position]       # Create data point from time and position
         data_lst.append(dataPt)         # Append to output list
         return data_lst                 # Return output list
+
+
+class PIDController(MotorController):
+    """!
+    @brief                      A PID controller with feedforward, for use with a DC motor
+    @details                    The output is the sum of four terms:
+                                - proportional, @c Kp times the error;
+                                - integral, the sum of @c Ki times the error times the period. The integral stops
+                                  growing while the output is at a limit and the error would push it further, and it is
+                                  itself kept within the output limits, so it doesn't wind up during a long step;
+                                - derivative, @c Kd times the rate of change of the measured position, negated. Taking
+                                  the derivative of the measurement rather than of the error means a step in the
+                                  setpoint doesn't cause a spike in the output. The rate is smoothed by a first-order
+                                  filter with time constant @c d_filter;
+                                - feedforward, @c Kf times the setpoint.
+
+                                The sum is limited to the range which @c MotorDriver.set_duty_cycle() accepts. The
+                                controller must be run once every @c period milliseconds, as it is by a periodic task.
+    """
+
+    def __init__(self, Kp, Ki=0.0, Kd=0.0, Kf=0.0, set_point=0, period=10, d_filter=0.0, out_min=-100, out_max=100):
+        """!
+            @brief                  Constructs a PID controller
+            @param  Kp              The proportional gain, in duty cycle percent per encoder tick
+            @param  Ki              The integral gain, in percent per tick-second
+            @param  Kd              The derivative gain, in percent per tick per second
+            @param  Kf              The feedforward gain, in percent per tick of setpoint
+            @param  set_point       The initial setpoint
+            @param  period          The time between runs of the controller in milliseconds
+            @param  d_filter        The time constant of the derivative filter in milliseconds; 0 for no filter
+            @param  out_min         The smallest output allowed
+            @param  out_max         The largest output allowed
+        """
+        super().__init__(Kp, set_point)
+        self.period = period
+        self.d_filter = d_filter
+        self.out_min = out_min
+        self.out_max = out_max
+        self.set_gains(Kp, Ki, Kd, Kf)
+        self.reset()
+
+    def set_gains(self, Kp, Ki=0.0, Kd=0.0, Kf=0.0):
+        """!
+            @brief              Changes all the gains of the controller
+            @details            The integral and derivative gains are combined with the period here so that
+                                @c run() needs no division.
+            @param  Kp          The new proportional gain
+            @param  Ki          The new integral gain
+            @param  Kd          The new derivative gain
+            @param  Kf          The new feedforward gain
+        """
+        self.Kp = Kp
+        self.Ki = Ki
+        self.Kd = Kd
+        self.Kf = Kf
+        dt = self.period / 1000
+        self._ki_dt = Ki * dt
+        self._kd_dt = Kd / dt
+        self._alpha = self.period / (self.d_filter + self.period)
+
+    def set_Kp(self, new_Kp):
+        """!
+            @brief              Changes the proportional gain, keeping the other gains
+            @param  new_Kp      The new proportional gain
+        """
+        self.set_gains(new_Kp, self.Ki, self.Kd, self.Kf)
+
+    def reset(self):
+        """!
+            @brief              Clears the integral and derivative, as before the first run
+        """
+        self._integral = 0.0
+        self._derivative = 0.0
+        self._last_point = None
+
+    def run(self, current_point):
+        """!
+            @brief                  Runs the PID control algorithm once
+            @param  current_point   The current position of the system
+            @return                 The duty cycle to send to the motor driver, within the output limits
+        """
+        error = self.set_point - current_point
+        if self._last_point is not None:
+            rate = self._last_point - current_point
+            self._derivative += self._alpha * (rate - self._derivative)
+        self._last_point = current_point
+
+        output = self.Kp * error + self._integral + self._kd_dt * self._derivative + self.Kf * self.set_point
+        integral = self._integral + self._ki_dt * error
+
+        # Integrate only if the output isn't already at a limit which the error would push it past
+        if output >= self.out_max:
+            output = self.out_max
+            if error < 0:
+                self._integral = integral
+        elif output <= self.out_min:
+            output = self.out_min
+            if error > 0:
+                self._integral = integral
+        else:
+            self._integral = integral
+        if self._integral > self.out_max:
+            self._integral = self.out_max
+        elif self._integral < self.out_min:
+            self._integral = self.out_min
+        return output
+
+
+class FixedPIDController(PIDController):
+    """!
+    @brief                      A PID controller which does its arithmetic in integers
+    @details                    This works as @c PIDController does, but the gains are kept as integers scaled by
+                                2**@c FIXED_SHIFT and all the arithmetic in @c run() is done on integers. On the
+                                pyboard, every floating point result is a new object on the heap, while small integers
+                                are not, so this controller can run at 1 kHz or faster without making work for the
+                                garbage collector. Positions and setpoints must be integers, as encoder counts are, and
+                                the output is a whole percent.
+
+                                The derivative filter is done with a shift, so its time constant is rounded to the
+                                period times one less than a power of two. Small integers on the pyboard hold 31 bits,
+                                so the product of a scaled gain and an error should stay under about 2**30; for
+                                example, with a gain of 0.1 errors up to about 160000 counts stay fast.
+    """
+
+    def set_gains(self, Kp, Ki=0.0, Kd=0.0, Kf=0.0):
+        """!
+            @brief              Changes all the gains of the controller, converting them to fixed point
+            @param  Kp          The new proportional gain
+            @param  Ki          The new integral gain
+            @param  Kd          The new derivative gain
+            @param  Kf          The new feedforward gain
+        """
+        super().set_gains(Kp, Ki, Kd, Kf)
+        scale = 1 << FIXED_SHIFT
+        self._kp_q = round(Kp * scale)
+        self._ki_q = round(self._ki_dt * scale)
+        self._kd_q = round(self._kd_dt * scale)
+        self._kf_q = round(Kf * scale)
+        shift = 0
+        while (1 << (shift + 1)) <= (self.d_filter + self.period) / self.period:
+            shift += 1
+        self._d_shift = shift
+        self._max_q = self.out_max << FIXED_SHIFT
+        self._min_q = self.out_min << FIXED_SHIFT
+
+    def reset(self):
+        """!
+            @brief              Clears the integral and derivative, as before the first run
+        """
+        self._integral = 0
+        self._derivative = 0
+        self._last_point = None
+
+    @micropython.native
+    def run(self, current_point):
+        """!
+            @brief                  Runs the PID control algorithm once using integer arithmetic
+            @param  current_point   The current position of the system, an integer
+            @return                 The duty cycle to send to the motor driver, rounded to the nearest integer
+                                    percent, within the output limits
+        """
+        error = self.set_point - current_point
+        last = self._last_point
+        if last is not None:
+            # The derivative is kept in fractions of a count per period so that the filter can settle smoothly
+            rate = (last - current_point) << DERIVATIVE_SHIFT
+            self._derivative += (rate - self._derivative) >> self._d_shift
+        self._last_point = current_point
+
+        output = (self._kp_q * error + self._integral + ((self._kd_q * self._derivative) >> DERIVATIVE_SHIFT)
+                  + self._kf_q * self.set_point)
+        integral = self._integral + self._ki_q * error
+
+        if output >= self._max_q:
+            output = self._max_q
+            if error < 0:
+                self._integral = integral
+        elif output <= self._min_q:
+            output = self._min_q
+            if error > 0:
+                self._integral = integral
+        else:
+            self._integral = integral
+        if self._integral > self._max_q:
+            self._integral = self._max_q
+        elif self._integral < self._min_q:
+            self._integral = self._min_q
+        # Round to the nearest percent the same way for either sign; shifting alone would round toward negative
+        # infinity and bias the output downward
+        if output >= 0:
+            return (output + (1 << (FIXED_SHIFT - 1))) >> FIXED_SHIFT
+        return -(((1 << (FIXED_SHIFT - 1)) - output) >> FIXED_SHIFT)
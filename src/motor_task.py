@@ -11,9 +11,11 @@
 """
 
 # import gc
+import micropython
 import pyb
 import cotask
 import task_share
+import utime
 import encoder_reader
 import motor_controller
 import motor_driver
@@ -26,12 +28,12 @@ class MotorTask:
                                 creates a driver, encoder, and controller.
     """
 
-    def __init__(self, shares, motor_enable_pin_str, motor_in1_pin, motor_in2_pin, motor_timer, encoder_pinA, encoder_pinB, encoder_timer, Kp):
+    def __init__(self, shares, motor_enable_pin_str, motor_in1_pin, motor_in2_pin, motor_timer, encoder_pinA, encoder_pinB, encoder_timer, Kp, controller=None):
         """!
             @brief                          Constructs a motor-encoder object
             @details                        Upon instantiation, the motor-encoder object has all pins and timer channels
                                             defined. It notifies the user that a motor-encoder object is being created
-            @param  shares                  The variables to be used between tasks
+            @param  shares                  The variables to be used between tasks, or @c None
             @param  motor_enable_pin_str    The motor enable pin
             @param  motor_in1_pin           The motor input pin 1
             @param  motor_in2_pin           The motor input pin 2
@@ -40,11 +42,16 @@ class MotorTask:
             @param  encoder_pinB            The encoder pin B
             @param  encoder_timer           The encoder timer channel
             @param  Kp                      The proportional gain to be used
+            @param  controller              A controller to use instead of a proportional controller with gain
+                                            @c Kp, such as a @c motor_controller.PIDController
         """
-        self.setpoint_share, self.setpoint_share2, self.motor1position, self.motor2position = shares
+        if shares is not None:
+            self.setpoint_share, self.setpoint_share2, self.motor1position, self.motor2position = shares
         self.motor = motor_driver.MotorDriver(motor_enable_pin_str, motor_in1_pin, motor_in2_pin, motor_timer)
         self.encoder = encoder_reader.EncoderReader(encoder_pinA, encoder_pinB, encoder_timer)
-        self.controller = motor_controller.MotorController(Kp, 0)
+        if controller is None:
+            controller = motor_controller.MotorController(Kp, 0)
+        self.controller = controller
         print("Created a motor motor-encoder object")
 
     def update(self):
@@ -59,6 +66,76 @@ class MotorTask:
         # print(self.encoder_position[0],self.motor_desiredduty)
         self.motor.set_duty_cycle(self.motor_desiredduty)
 
+    @micropython.native
+    def fast_update(self, setpoint_share, position_share):
+        """!
+            @brief              Runs the motor for one period without allocating memory
+            @details            This method does what calling set_setpoint(), update() and get_position() in turn does,
+                                but reads the encoder only once and keeps no tuples or other new objects. It takes the
+                                setpoint from one share and puts the position it read into another. Used with an
+                                integer controller such as @c motor_controller.FixedPIDController, nothing is put on
+                                the heap, so the garbage collector doesn't need to run during control and the task
+                                can run with periods under 10 ms.
+            @param  setpoint_share  The share from which the setpoint is read
+            @param  position_share  The share into which the position is put
+        """
+        position = self.encoder.read_position()
+        controller = self.controller
+        controller.set_point = setpoint_share.get()
+        self.motor.set_duty_cycle(controller.run(position))
+        position_share.put(position)
+
+    def start_timer_control(self, timer, freq, setpoint_share, position_share, hard=False):
+        """!
+            @brief              Starts running the motor from a hardware timer's interrupt rather than from a task
+            @details            Each time the timer rolls over, the motor is updated as by fast_update(), so the
+                                control loop runs at a steady rate however busy the cooperative scheduler is. By
+                                default the interrupt only asks MicroPython to run the update as soon as the current
+                                bytecode finishes, with @c micropython.schedule(); with @c hard set, the update runs
+                                in the interrupt itself, which gives the least jitter but must not allocate memory,
+                                so the controller must then be an integer one such as
+                                @c motor_controller.FixedPIDController.
+
+                                The shares are also used by tasks which run outside the interrupt, so they must be
+                                created with @c thread_protect set; the update itself uses them with @c in_ISR set.
+            @param  timer       The number of a timer which isn't used for anything else, such as 6 or 7
+            @param  freq        The frequency of the control loop in Hz
+            @param  setpoint_share  The share from which the setpoint is read
+            @param  position_share  The share into which the position is put
+            @param  hard        If @c True, run the update in the interrupt itself
+        """
+        self._setpoint_share = setpoint_share
+        self._position_share = position_share
+        # Make the bound methods now; an interrupt can't allocate the memory to make them
+        self._control_ref = self._control
+        self._schedule_ref = self._schedule_control
+        self.control_timer = pyb.Timer(timer, freq=freq)
+        self.control_timer.callback(self._control_ref if hard else self._schedule_ref)
+
+    def stop_timer_control(self):
+        """!
+            @brief              Stops running the motor from a timer interrupt and stops the motor
+        """
+        self.control_timer.callback(None)
+        self.motor.set_duty_cycle(0)
+
+    def _schedule_control(self, timer):
+        """!
+            @brief              Timer callback which asks MicroPython to run the update soon
+        """
+        micropython.schedule(self._control_ref, timer)
+
+    @micropython.native
+    def _control(self, timer):
+        """!
+            @brief              Runs the motor for one period from a timer interrupt
+        """
+        position = self.encoder.read_position()
+        controller = self.controller
+        controller.set_point = self._setpoint_share.get(in_ISR=True)
+        self.motor.set_duty_cycle(controller.run(position))
+        self._position_share.put(position, in_ISR=True)
+
     def get_position(self):
         """!
             @brief                  Gets the position of the motor in encoder ticks
@@ -78,5 +155,131 @@ class MotorTask:
         pass
 
 
+class MotorGroup:
+    """!
+    @brief                      A set of motors which are updated together, as one task
+    @details                    Each update reads the counters of all the encoders one right after another, so that
+                                the positions of all axes are taken at nearly the same instant; then it runs each
+                                axis's controller, sets all the duty cycles, and finally puts all the positions into
+                                their shares, or publishes them together in one record share so that readers get the
+                                positions of all axes from the same instant. Running every axis in one task, rather
+                                than one task per motor, saves the scheduler's overhead for each extra motor and keeps
+                                the axes from drifting apart in time.
+
+                                The motors are described by a table with one row per axis:
+                                @code
+                                axes = (
+                                    # (motor and encoder pins and timers,       controller)
+                                    (('A10', 'B4', 'B5', 3, 'C6', 'C7', 8),    motor_controller.FixedPIDController(0.1)),
+                                    (('C1', 'A0', 'A1', 5, 'B6', 'B7', 4),     motor_controller.FixedPIDController(0.1)),
+                                )
+                                group = motor_task.MotorGroup(axes, setpoint_shares, position_shares)
+                                @endcode
+    """
+
+    def __init__(self, axes, setpoint_shares, position_shares):
+        """!
+            @brief                  Creates a motor, encoder and controller for each axis
+            @param  axes            A table with a row for each axis holding a tuple of the pins and timers given to
+                                    @c MotorTask, in order, and the axis's controller
+            @param  setpoint_shares A share for each axis from which its setpoint is read
+            @param  position_shares A share for each axis into which its position is put, or a
+                                    @c task_share.RecordShare with a field for each axis into which all the positions
+                                    are published together
+        """
+        self.motors = [MotorTask(None, *hardware, 0, controller=controller) for hardware, controller in axes]
+        self._num_axes = len(self.motors)
+        self._setpoint_shares = list(setpoint_shares)
+        if isinstance(position_shares, task_share.RecordShare):
+            self._state = position_shares
+            self._position_shares = []
+        else:
+            self._state = None
+            self._position_shares = list(position_shares)
+        self._positions = [0] * self._num_axes
+        # Keep everything used by update() in lists made now, so that updates allocate nothing
+        self._counters = [motor.encoder.encodertimer.counter for motor in self.motors]
+        self._encoders = [motor.encoder for motor in self.motors]
+        self._controllers = [motor.controller for motor in self.motors]
+        self._drivers = [motor.motor for motor in self.motors]
+        self._counts = [0] * self._num_axes
+        self._duties = [0] * self._num_axes
+        self._update_ref = self.update
+        self._schedule_ref = self._schedule_update
+        self.control_timer = None
+
+    @micropython.native
+    def update(self, timer=None):
+        """!
+            @brief              Reads all encoders, runs all controllers, and sets all duty cycles
+            @param  timer       Ignored; present so that this method can be a timer callback
+        """
+        num_axes = self._num_axes
+        counts = self._counts
+        counters = self._counters
+        for axis in range(num_axes):
+            counts[axis] = counters[axis]()
+        time_us = utime.ticks_us()
+        encoders = self._encoders
+        controllers = self._controllers
+        setpoint_shares = self._setpoint_shares
+        duties = self._duties
+        in_ISR = self.control_timer is not None
+        for axis in range(num_axes):
+            encoder = encoders[axis]
+            encoder.update_count(counts[axis], time_us)
+            controller = controllers[axis]
+            controller.set_point = setpoint_shares[axis].get(in_ISR)
+            duties[axis] = controller.run(encoder.position)
+        drivers = self._drivers
+        for axis in range(num_axes):
+            drivers[axis].set_duty_cycle(duties[axis])
+        state = self._state
+        if state is None:
+            position_shares = self._position_shares
+            for axis in range(num_axes):
+                position_shares[axis].put(encoders[axis].position, in_ISR)
+        else:
+            positions = self._positions
+            for axis in range(num_axes):
+                positions[axis] = encoders[axis].position
+            state.publish(positions)
+
+    def run(self):
+        """!
+            @brief              Generator which updates the group each time it is run, for use as a task function
+        """
+        while True:
+            self.update()
+            yield 0
+
+    def start_timer_control(self, timer, freq, hard=False):
+        """!
+            @brief              Starts updating the group from a hardware timer's interrupt rather than from a task
+            @details            This works as MotorTask.start_timer_control() does, but one interrupt updates all
+                                the axes. The shares must be created with @c thread_protect set.
+            @param  timer       The number of a timer which isn't used for anything else, such as 6
+            @param  freq        The frequency of the control loop in Hz
+            @param  hard        If @c True, run the update in the interrupt itself
+        """
+        self.control_timer = pyb.Timer(timer, freq=freq)
+        self.control_timer.callback(self._update_ref if hard else self._schedule_ref)
+
+    def stop_timer_control(self):
+        """!
+            @brief              Stops updating the group from a timer interrupt and stops all the motors
+        """
+        self.control_timer.callback(None)
+        self.control_timer = None
+        for driver in self._drivers:
+            driver.set_duty_cycle(0)
+
+    def _schedule_update(self, timer):
+        """!
+            @brief              Timer callback which asks MicroPython to run the update soon
+        """
+        micropython.schedule(self._update_ref, timer)
+
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,243 @@
+"""!
+@file recorder.py
+    This file contains a class which records samples of data in memory which
+    is allocated once, before recording starts.
+
+    Building a list of samples, with a new list or array object for each
+    sample, allocates memory every time a sample is taken and makes the
+    garbage collector run at unpredictable times in the middle of a control
+    run. A @c SampleRecorder instead allocates one array per channel, big
+    enough for all the samples, when it is created; recording a sample only
+    stores numbers in those arrays.
+
+@author Peyton Archibald
+@author Harrison Hirsch
+@date   October 18, 2026
+"""
+
+import array
+import gc
+import micropython
+
+
+class SampleRecorder:
+    """!
+    Records samples of several channels into preallocated arrays.
+
+    Each channel, such as time or a motor position, has its own array of
+    @c capacity items. When the arrays are full, the recorder either stops
+    taking samples or, if it was created as a ring buffer, overwrites the
+    oldest samples so that it always holds the most recent ones.
+
+    @code
+    import array
+    import recorder
+
+    # Room for 1000 samples of time and two positions
+    log = recorder.SampleRecorder(3, 1000, name="Step log")
+
+    # In a task, record a sample from a reused array...
+    sample = array.array('l', [0, 0, 0])
+    sample[0] = time_ms
+    sample[1] = position_1
+    sample[2] = position_2
+    log.record(sample)
+
+    # ...or one channel at a time
+    log.store(0, time_ms)
+    log.store(1, position_1)
+    log.store(2, position_2)
+    log.commit()
+
+    # Afterwards, look at the data a channel at a time
+    times = log.column(0)
+    @endcode
+    """
+
+    def __init__(self, num_channels, capacity, type_code='l', ring=False,
+                 name=None):
+        """!
+        Create a recorder and allocate the memory for all its samples.
+        @param num_channels The number of values in each sample
+        @param capacity The largest number of samples which can be held
+        @param type_code The @c array.array type code for the values, as for
+               a @c task_share.Queue; the default @c 'l' is a 32-bit integer
+        @param ring If @c True, when the recorder is full new samples replace
+               the oldest ones; if @c False (the default), new samples are
+               refused
+        @param name A short name for the recorder used in diagnostics
+        """
+        self._num_channels = num_channels
+        self._capacity = capacity
+        self._type_code = type_code
+        self._ring = ring
+        self._name = str(name) if name != None else 'Recorder'
+
+        # Allocate the arrays in which the channels are stored
+        self._channels = [array.array(type_code, range(capacity))
+                          for _ in range(num_channels)]
+
+        self.clear()
+
+        # Since we may have allocated a bunch of memory, call the garbage
+        # collector to neaten up what memory is left for future use
+        gc.collect()
+
+    @micropython.native
+    def store(self, channel, value):
+        """!
+        Store one channel's value in the sample being recorded.
+        After a value has been stored in each channel, @c commit() adds the
+        sample to the recording.
+        @param channel The number of the channel, starting at 0
+        @param value The value to be stored
+        """
+        if self._wr_idx >= 0:
+            self._channels[channel][self._wr_idx] = value
+
+    @micropython.native
+    def commit(self):
+        """!
+        Add the sample whose values were given by @c store() to the recording.
+        @return @c True if the sample was recorded, @c False if the recorder
+                was full and not a ring buffer
+        """
+        if self._wr_idx < 0:
+            self._overflows += 1
+            return False
+
+        self._wr_idx += 1
+        if self._wr_idx >= self._capacity:
+            self._wr_idx = 0
+        if self._num_samples < self._capacity:
+            self._num_samples += 1
+        elif self._ring:
+            self._start += 1
+            if self._start >= self._capacity:
+                self._start = 0
+            self._overflows += 1
+
+        # If full and not allowed to overwrite, refuse further samples
+        if self._num_samples >= self._capacity and not self._ring:
+            self._wr_idx = -1
+        return True
+
+    @micropython.native
+    def record(self, values):
+        """!
+        Record a sample with a value for each channel.
+        @param values A sequence, such as an @c array.array which is reused
+               for each sample, holding one value for each channel
+        @return @c True if the sample was recorded, @c False if the recorder
+                was full and not a ring buffer
+        """
+        idx = self._wr_idx
+        if idx >= 0:
+            channels = self._channels
+            for channel in range(self._num_channels):
+                channels[channel][idx] = values[channel]
+        return self.commit()
+
+    @micropython.native
+    def get(self, index, channel):
+        """!
+        Read one value of a recorded sample.
+        @param index The number of the sample, 0 being the oldest one held
+        @param channel The number of the channel
+        @return The value
+        """
+        if index < 0 or index >= self._num_samples:
+            raise IndexError('Sample index out of range')
+        index += self._start
+        if index >= self._capacity:
+            index -= self._capacity
+        return self._channels[channel][index]
+
+    def column(self, channel):
+        """!
+        Get the recorded values of one channel in the order they were taken.
+        If a ring buffer has wrapped around, its arrays are first rotated in
+        place so that the oldest sample comes first; this takes time but no
+        memory, so it should be done after recording.
+        @param channel The number of the channel
+        @return A memoryview of the channel's array holding only the recorded
+                values
+        """
+        self.unroll()
+        return memoryview(self._channels[channel])[:self._num_samples]
+
+    def unroll(self):
+        """!
+        Rotate the arrays in place so that the oldest sample is first.
+        """
+        if self._start == 0:
+            return
+        start = self._start
+        for arr in self._channels:
+            self._reverse(arr, 0, start)
+            self._reverse(arr, start, self._capacity)
+            self._reverse(arr, 0, self._capacity)
+        self._start = 0
+        self._wr_idx = self._num_samples if self._num_samples < self._capacity \
+            else 0
+
+    @staticmethod
+    @micropython.native
+    def _reverse(arr, low, high):
+        """!
+        Reverse the items of an array from index @c low up to @c high in place.
+        """
+        high -= 1
+        while low < high:
+            arr[low], arr[high] = arr[high], arr[low]
+            low += 1
+            high -= 1
+
+    def write_to(self, writer, values):
+        """!
+        Send the recorded samples, oldest first, through a telemetry writer.
+        @param writer A @c telemetry.FrameWriter with one field per channel
+        @param values An @c array.array with one item per channel, used to
+               hold each sample as it is sent
+        """
+        for index in range(self._num_samples):
+            for channel in range(self._num_channels):
+                values[channel] = self.get(index, channel)
+            writer.add(values)
+        writer.flush()
+
+    @micropython.native
+    def num_samples(self):
+        """!
+        Find how many samples have been recorded and are being held.
+        @return The number of samples held
+        """
+        return self._num_samples
+
+    @micropython.native
+    def full(self):
+        """!
+        Check if the recorder is full. A full ring buffer still takes samples.
+        @return @c True if the recorder holds as many samples as it can
+        """
+        return self._num_samples >= self._capacity
+
+    def clear(self):
+        """!
+        Remove all samples from the recorder. The memory is kept for reuse.
+        """
+        self._wr_idx = 0 if self._capacity > 0 else -1
+        self._start = 0
+        self._num_samples = 0
+        self._overflows = 0
+
+    def __repr__(self):
+        """!
+        This method puts diagnostic information about the recorder into a
+        string, showing its name, how full it is, and how many samples have
+        been refused or overwritten.
+        """
+        return '{:<12s} Recorder<{:d}x{:s}> {:d}/{:d} {:s} {:d}'.format(
+            self._name, self._num_channels, self._type_code,
+            self._num_samples, self._capacity,
+            'overwritten' if self._ring else 'refused', self._overflows)
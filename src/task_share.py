@@ -26,6 +26,10 @@ import array
 import gc
 import pyb
 import micropython
+try:
+    import struct                      # Packs the fields of record shares
+except ImportError:
+    import ustruct as struct           # Older MicroPython name for struct
 
 
 # This is a system-wide list of all the queues and shared variables. It is
@@ -61,6 +65,9 @@ class BaseShare:
     useful. It exists to implement things which are common between its child
     classes @c Queue and @c Share. 
     """
+    # True for shares, which hold one item, so that they wake every
+    # subscriber whenever data is put in
+    _holds_one = False
 
     def __init__(self, type_code, thread_protect=True, name=None):
         """!
@@ -71,9 +78,55 @@ class BaseShare:
         self._type_code = type_code
         self._thread_protect = thread_protect
 
+        # Tasks which are woken when data is put in, and for each one the
+        # number of items there must be before it is woken
+        self._subscribers = []
+        self._watermarks = []
+
         # Add this queue to the global share and queue list
         share_list.append (self)
 
+    def subscribe (self, task, watermark = 1):
+        """!
+        Have a task woken whenever data is put into this queue or share.
+
+        After each @c put(), the @c go() method of each subscribed task is
+        called if the number of items waiting is at least the task's
+        watermark, so a task with no period runs only when there is data for
+        it. This is usually done through @c cotask.Task.subscribe().
+        @param task The task, or any object with a @c go() method
+        @param watermark For a queue, the number of items which must be in
+               the queue for the task to be woken, such as half the queue's
+               size to wake the task when the queue is half full; for a share,
+               which holds one item, it is ignored and taken to be 1
+        """
+        if self._holds_one:
+            watermark = 1
+        self._subscribers.append (task)
+        self._watermarks.append (watermark)
+
+    def unsubscribe (self, task):
+        """!
+        Stop waking a task when data is put in.
+        @param task A task given to @c subscribe()
+        """
+        index = self._subscribers.index (task)
+        del self._subscribers[index]
+        del self._watermarks[index]
+
+    @micropython.native
+    def _notify (self, level):
+        """!
+        Wake the subscribed tasks whose watermarks have been reached. This
+        sets flags only, so it may be called from an interrupt.
+        @param level The number of items now waiting
+        """
+        subscribers = self._subscribers
+        watermarks = self._watermarks
+        for index in range (len (subscribers)):
+            if level >= watermarks[index]:
+                subscribers[index].go ()
+
 
 # ============================================================================
 
@@ -212,6 +265,10 @@ class Queue (BaseShare):
         if self._thread_protect and not in_ISR:
             pyb.enable_irq(_irq_state)
 
+        # Wake any tasks waiting for this much data
+        if self._subscribers:
+            self._notify (self._num_items)
+
 
     @micropython.native
     def get(self, in_ISR = False):
@@ -308,6 +365,29 @@ class Queue (BaseShare):
         return (self._num_items)
 
 
+    @micropython.native
+    def room (self):
+        """!
+        Check how many more items will fit in the queue.
+
+        This method returns the number of items which can be put into the
+        queue before it is full.
+        @return The number of empty places in the queue
+        """
+        return (self._size - self._num_items)
+
+
+    def renotify (self):
+        """!
+        Wake the subscribed tasks again if the queue still holds enough items
+        to reach their watermarks. A task which takes only some of the items
+        waiting each time it runs calls this so that it runs again for the
+        rest, rather than waiting until more items are put in.
+        """
+        if self._subscribers:
+            self._notify (self.num_in ())
+
+
     def clear (self):
         """!
         Remove all contents from the queue.
@@ -329,6 +409,244 @@ class Queue (BaseShare):
                 type_code_strings[self._type_code], self._max_full, self._size))
 
 
+# ============================================================================
+
+class RingQueue (BaseShare):
+    """!
+    A queue for one producer and one consumer which never disables interrupts.
+
+    Only the producer changes the write index and only the consumer changes
+    the read index, and each index is changed only after the data it covers
+    has been written or read. Either side may therefore be an interrupt
+    service routine while the other is a task, and neither needs to turn
+    interrupts off. One place in the buffer is always left empty so that a
+    full queue can be told apart from an empty one.
+
+    Nothing here ever waits: the @c try_ methods report whether they
+    succeeded, and the bulk methods move as many items as there are, or as
+    there is room for. The bulk methods copy items one at a time with index
+    loops rather than slicing, since making slices allocates memory; no
+    method allocates any, so all may be used in a hard interrupt.
+
+    @code
+    import array
+    import task_share
+
+    # This queue holds up to 256 signed 32-bit integers
+    samples = task_share.RingQueue ('l', 256, name="Samples")
+
+    # In an interrupt service routine, put one item or a block of them
+    samples.try_put (encoder_count)
+    samples.put_many (block)                # block is an array.array('l')
+
+    # In a task, take everything waiting, up to the size of a buffer
+    buf = array.array ('l', range (64))
+    count = samples.get_into (buf)
+    @endcode
+    """
+    # A counter used to give serial numbers to queues for diagnostic use.
+    ser_num = 0
+
+    def __init__ (self, type_code, size, name = None):
+        """!
+        Initialize a ring queue, allocating memory for its contents.
+        @param type_code The type of data items which the queue can hold, as
+               for @c Queue
+        @param size The maximum number of items which the queue can hold
+        @param name A short name for the queue, default @c RingQueueN where
+               @c N is a serial number for the queue
+        """
+        super ().__init__ (type_code, False, name)
+
+        self._size = size
+        self._name = str (name) if name != None \
+            else 'RingQueue' + str (RingQueue.ser_num)
+        RingQueue.ser_num += 1
+
+        # One more place than the size is allocated; it is always left empty
+        self._length = size + 1
+        self._buffer = array.array (type_code, range (self._length))
+
+        self.clear ()
+        gc.collect ()
+
+    @micropython.native
+    def try_put (self, item):
+        """!
+        Put an item into the queue if there is room.
+        @param item The item to be placed into the queue
+        @return @c True if the item was put in, @c False if the queue was full
+        """
+        wr_idx = self._wr_idx
+        next_idx = wr_idx + 1
+        if next_idx >= self._length:
+            next_idx = 0
+        if next_idx == self._rd_idx:
+            self._refused += 1
+            return False
+        self._buffer[wr_idx] = item
+        self._wr_idx = next_idx
+        filled = next_idx - self._rd_idx
+        if filled < 0:
+            filled += self._length
+        if filled > self._max_full:
+            self._max_full = filled
+        if self._subscribers:
+            self._notify (filled)
+        return True
+
+    @micropython.native
+    def try_get (self, default = None):
+        """!
+        Take the oldest item from the queue if there is one.
+        @param default The value returned if the queue is empty
+        @return The item, or @c default if the queue was empty
+        """
+        rd_idx = self._rd_idx
+        if rd_idx == self._wr_idx:
+            return default
+        item = self._buffer[rd_idx]
+        rd_idx += 1
+        self._rd_idx = 0 if rd_idx >= self._length else rd_idx
+        return item
+
+    @micropython.native
+    def put_many (self, items, count = -1):
+        """!
+        Put as many items from a buffer into the queue as there is room for.
+        @param items A sequence, such as an @c array.array of the same type
+               as the queue, holding the items
+        @param count The number of items from the start of @c items to put,
+               or -1 for all of them
+        @return The number of items put into the queue
+        """
+        if count < 0:
+            count = len (items)
+        room = self.room ()
+        if count > room:
+            self._refused += count - room
+            count = room
+        if count <= 0:
+            return 0
+        buffer = self._buffer
+        length = self._length
+        wr_idx = self._wr_idx
+        for index in range (count):
+            buffer[wr_idx] = items[index]
+            wr_idx += 1
+            if wr_idx >= length:
+                wr_idx = 0
+        self._wr_idx = wr_idx
+        filled = self.num_in ()
+        if filled > self._max_full:
+            self._max_full = filled
+        if self._subscribers:
+            self._notify (filled)
+        return count
+
+    @micropython.native
+    def get_into (self, buf, count = -1):
+        """!
+        Take as many items from the queue as are waiting and fit in a buffer.
+        @param buf A sequence, such as an @c array.array of the same type as
+               the queue, into which the items are copied, oldest first
+        @param count The largest number of items to take, or -1 for as many
+               as fit in @c buf
+        @return The number of items taken
+        """
+        if count < 0 or count > len (buf):
+            count = len (buf)
+        waiting = self.num_in ()
+        if count > waiting:
+            count = waiting
+        if count <= 0:
+            return 0
+        buffer = self._buffer
+        length = self._length
+        rd_idx = self._rd_idx
+        for index in range (count):
+            buf[index] = buffer[rd_idx]
+            rd_idx += 1
+            if rd_idx >= length:
+                rd_idx = 0
+        self._rd_idx = rd_idx
+        return count
+
+    @micropython.native
+    def any (self):
+        """!
+        Check if there are any items in the queue.
+        @return @c True if items are in the queue, @c False if not
+        """
+        return self._rd_idx != self._wr_idx
+
+    @micropython.native
+    def empty (self):
+        """!
+        Check if the queue is empty.
+        @return @c True if queue is empty, @c False if it's not empty
+        """
+        return self._rd_idx == self._wr_idx
+
+    @micropython.native
+    def full (self):
+        """!
+        Check if the queue is full.
+        @return @c True if the queue is full
+        """
+        return self.num_in () >= self._size
+
+    @micropython.native
+    def num_in (self):
+        """!
+        Check how many items are in the queue.
+        @return The number of items in the queue
+        """
+        count = self._wr_idx - self._rd_idx
+        if count < 0:
+            count += self._length
+        return count
+
+    @micropython.native
+    def room (self):
+        """!
+        Check how many more items will fit in the queue.
+        @return The number of empty places in the queue
+        """
+        return self._size - self.num_in ()
+
+    def renotify (self):
+        """!
+        Wake the subscribed tasks again if the queue still holds enough items
+        to reach their watermarks. A task which takes only some of the items
+        waiting each time it runs calls this so that it runs again for the
+        rest, rather than waiting until more items are put in.
+        """
+        if self._subscribers:
+            self._notify (self.num_in ())
+
+    def clear (self):
+        """!
+        Remove all contents from the queue. This must not be done while the
+        producer or consumer may be using the queue.
+        """
+        self._rd_idx = 0
+        self._wr_idx = 0
+        self._max_full = 0
+        self._refused = 0
+
+    def __repr__ (self):
+        """!
+        This method puts diagnostic information about the queue into a string.
+
+        It shows the queue's name and type, the maximum number of items and
+        queue size, and how many items were refused because it was full.
+        """
+        return ('{:<12s} RingQueue<{:s}> Max Full {:d}/{:d} Refused {:d}'.format (
+                self._name, type_code_strings[self._type_code], self._max_full,
+                self._size, self._refused))
+
+
 # ============================================================================
 
 class Share (BaseShare):
@@ -356,6 +674,7 @@ class Share (BaseShare):
     """
     # A counter used to give serial numbers to shares for diagnostic use.
     ser_num = 0
+    _holds_one = True
 
     def __init__(self, type_code, thread_protect=True, name=None):
         """!
@@ -413,6 +732,9 @@ class Share (BaseShare):
         if self._thread_protect and not in_ISR:
             pyb.enable_irq(irq_state)
 
+        if self._subscribers:
+            self._notify (1)
+
     @micropython.native
     def get (self, in_ISR=False):
         """!
@@ -445,3 +767,210 @@ class Share (BaseShare):
                 type_code_strings[self._type_code]))
 
 
+## The largest sequence number of a @c RecordShare, after which it wraps
+#  around to 0. Keeping it within 30 bits means it is always a small integer
+#  on the pyboard, so writing the record never allocates memory. The number
+#  wraps after an even count, 2**30, so wrapping doesn't change whether it
+#  is odd.
+SEQ_MASK = 0x3FFFFFFF
+
+
+# ============================================================================
+
+class RecordShare (BaseShare):
+    """!
+    A share which holds a record of several named fields, such as the
+    positions of all the axes of a machine, written and read as a whole.
+
+    The record is kept in one buffer laid out by a @c struct format. A
+    sequence number is made odd before the record is changed and even again
+    afterwards (a "seqlock"), so a reader which sees the same even number
+    before and after copying the record knows that it got a complete,
+    consistent copy, without interrupts ever being disabled. A reader which
+    is interrupted by a writer simply copies the record again.
+
+    There may be only one writer. If the writer is a task and a reader is an
+    interrupt service routine, the reader can't wait for the writer to
+    finish, so it should call @c snapshot_into() with @c retries of 1 and
+    use its last copy when that returns @c False.
+
+    @code
+    import task_share
+
+    # Positions of two axes, as 64-bit integers
+    state = task_share.RecordShare ('<qq', ('position_1', 'position_2'),
+                                    name="Positions")
+
+    # The writer, such as the motor control task or ISR
+    positions = [0, 0]
+    positions[0] = encoder_1.read_position ()
+    positions[1] = encoder_2.read_position ()
+    state.publish (positions)
+
+    # A reader gets a consistent copy of the whole record
+    snapshot = state.new_buffer ()
+    if state.snapshot_into (snapshot):
+        position_2 = state.unpack_from (snapshot, 'position_2')
+    @endcode
+    """
+    # A counter used to give serial numbers to record shares for diagnostics
+    ser_num = 0
+    _holds_one = True
+
+    def __init__ (self, fmt, fields, name = None):
+        """!
+        Create a record share, allocating its buffer.
+        @param fmt A @c struct format with one type code per field, such as
+               @c '<qqll'; an optional first character gives the byte order,
+               but repeat counts such as @c '2q' are not allowed
+        @param fields The names of the fields, in the order of the format
+        @param name A short name for the share, default @c RecordN where
+               @c N is a serial number for the share
+        """
+        super ().__init__ (fmt, False, name)
+
+        order = fmt[0] if fmt and fmt[0] in '@=<>!' else ''
+        codes = fmt[len (order):]
+        if len (codes) != len (fields) or not codes.isalpha ():
+            raise ValueError ('Format must have one type code per field')
+
+        self._fields = tuple (fields)
+        self._field_formats = tuple (order + code for code in codes)
+        # The offset of each field allows for any padding which the format adds
+        self._offsets = tuple (struct.calcsize (order + codes[:index + 1])
+                               - struct.calcsize (order + codes[index])
+                               for index in range (len (codes)))
+        self._record_size = struct.calcsize (fmt)
+        self._buffer = bytearray (self._record_size)
+        self._seq = 0
+        self._torn = 0
+        self._name = str (name) if name != None \
+            else 'Record' + str (RecordShare.ser_num)
+        RecordShare.ser_num += 1
+
+    def index (self, field):
+        """!
+        Find the position of a field in the record. Using the position
+        rather than the name makes later accesses quicker.
+        @param field The name of the field
+        @return The field's position, starting from 0
+        """
+        return self._fields.index (field)
+
+    def new_buffer (self):
+        """!
+        Make a buffer the right size to hold a snapshot of the record.
+        This should be done once, before the buffer is used repeatedly.
+        @return A new @c bytearray
+        """
+        return bytearray (self._record_size)
+
+    @micropython.native
+    def publish (self, values):
+        """!
+        Write every field of the record at once.
+        @param values A sequence, such as a list or @c array.array which is
+               reused for each record, holding a value for each field
+        """
+        self._seq = (self._seq + 1) & SEQ_MASK   # Odd: a write is under way
+        buf = self._buffer
+        formats = self._field_formats
+        offsets = self._offsets
+        for index in range (len (formats)):
+            struct.pack_into (formats[index], buf, offsets[index],
+                              values[index])
+        self._seq = (self._seq + 1) & SEQ_MASK   # Even: the record is consistent
+        if self._subscribers:
+            self._notify (1)
+
+    @micropython.native
+    def put (self, field, value):
+        """!
+        Write one field of the record.
+        @param field The field's name or position
+        @param value The value to be written
+        """
+        if not isinstance (field, int):
+            field = self._fields.index (field)
+        self._seq = (self._seq + 1) & SEQ_MASK
+        struct.pack_into (self._field_formats[field], self._buffer,
+                          self._offsets[field], value)
+        self._seq = (self._seq + 1) & SEQ_MASK
+        if self._subscribers:
+            self._notify (1)
+
+    @micropython.native
+    def snapshot_into (self, buf, retries = 10):
+        """!
+        Copy the whole record into a buffer, making sure it wasn't changed
+        partway through the copy.
+        @param buf A buffer from @c new_buffer()
+        @param retries How many times to try before giving up
+        @return @c True if @c buf holds a consistent copy of the record,
+                @c False if the record was being written every time
+        """
+        size = self._record_size
+        source = self._buffer
+        for _ in range (retries):
+            seq = self._seq
+            if not seq & 1:
+                # Copied a byte at a time, since slicing would allocate memory
+                for index in range (size):
+                    buf[index] = source[index]
+                if self._seq == seq:
+                    return True
+            self._torn += 1
+        return False
+
+    def unpack_from (self, buf, field):
+        """!
+        Get the value of one field from a snapshot of the record.
+        @param buf A buffer filled by @c snapshot_into()
+        @param field The field's name or position
+        @return The value of the field
+        """
+        if not isinstance (field, int):
+            field = self._fields.index (field)
+        return struct.unpack_from (self._field_formats[field], buf,
+                                   self._offsets[field])[0]
+
+    def get (self, field, retries = 10):
+        """!
+        Read one field of the record, making sure it wasn't changed partway
+        through being read.
+        @param field The field's name or position
+        @param retries How many times to try before giving up
+        @return The value of the field
+        """
+        if not isinstance (field, int):
+            field = self._fields.index (field)
+        for _ in range (retries):
+            seq = self._seq
+            if not seq & 1:
+                value = struct.unpack_from (self._field_formats[field],
+                                            self._buffer, self._offsets[field])[0]
+                if self._seq == seq:
+                    return value
+            self._torn += 1
+        raise RuntimeError ('Record share was being written on every read')
+
+    @micropython.native
+    def sequence (self):
+        """!
+        Get the record's sequence number, which goes up by two each time the
+        record is written, wrapping around to 0 after @c SEQ_MASK. A reader
+        can compare it with the number seen last time to find out whether
+        there is new data.
+        @return The sequence number
+        """
+        return self._seq
+
+    def __repr__ (self):
+        """!
+        This method puts diagnostic information about the record share into
+        a string, showing its name, format, how many times it has been
+        written (modulo 2**29), and how many reads had to be retried.
+        """
+        return ('{:<12s} Record<{:s}> Writes {:d} Retries {:d}'.format (
+                self._name, self._type_code, self._seq // 2, self._torn))
+
@@ -0,0 +1,417 @@
+"""!
+@file telemetry.py
+    This file contains a compact binary format for sending telemetry, such
+    as step response data, over a serial port, a class which writes it, and
+    a task which streams records from a queue to the serial port as they are
+    produced.
+
+    Each frame holds one record of signed 32-bit integer fields:
+    | Bytes | Contents |
+    |:------|:---------|
+    | 2 | Sync bytes 0xA5 0x5A |
+    | 1 | Frame type, such as @c FRAME_SAMPLE |
+    | 1 | Number of fields N |
+    | 2 | Sequence number, counting frames modulo 65536 |
+    | 4 N | The fields, each a little-endian signed 32-bit integer |
+    | 2 | CRC-16/CCITT (polynomial 0x1021, initial value 0xFFFF) of the bytes
+          from the frame type to the end of the fields |
+    All multi-byte values are little-endian. A matching decoder for the PC
+    is in @c temp/telemetry_decode.py.
+
+    Besides samples, the scheduler's metrics can be sent with
+    @c MetricsReporter: a @c FRAME_SCHEDULER frame holding the time over
+    which the metrics were measured, the number of scheduler passes and the
+    time spent idle, followed by a @c FRAME_TASK frame for each task holding
+    its profile and histograms (see @c MetricsReporter for the fields).
+
+@author Peyton Archibald
+@author Harrison Hirsch
+@date   October 18, 2026
+"""
+
+import array
+import micropython
+import cotask
+import task_share
+
+## Frame type for a record of sampled data, such as time and positions
+FRAME_SAMPLE = 0
+
+## Frame type for the scheduler-wide metrics sent by @c MetricsReporter
+FRAME_SCHEDULER = 1
+
+## Frame type for the profile of one task sent by @c MetricsReporter
+FRAME_TASK = 2
+
+## Number of fields in a @c FRAME_SCHEDULER frame
+SCHEDULER_FIELDS = 4
+
+## Number of 32-bit fields holding a task's name, four characters in each
+NAME_FIELDS = 4
+
+## Number of fields in a @c FRAME_TASK frame
+TASK_FIELDS = 3 + NAME_FIELDS + 6 + 2 * cotask.HIST_BUCKETS
+
+## The two bytes which begin every frame
+SYNC_1 = 0xA5
+SYNC_2 = 0x5A
+
+## Number of bytes in a frame before the fields
+HEADER_SIZE = 6
+
+## Number of bytes in a frame after the fields
+CRC_SIZE = 2
+
+
+def _make_crc_table():
+    """!
+    Make the lookup table used to compute CRC-16/CCITT one byte at a time.
+    @return An array of 256 16-bit table entries
+    """
+    table = array.array('H', [0] * 256)
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table[byte] = crc
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+@micropython.native
+def crc16(buf, start, end, crc=0xFFFF):
+    """!
+    Compute the CRC-16/CCITT of part of a buffer.
+    @param buf The buffer, such as a @c bytearray
+    @param start The index of the first byte to include
+    @param end The index after the last byte to include
+    @param crc The initial CRC value, 0xFFFF for a new CRC
+    @return The CRC of the bytes
+    """
+    table = _CRC_TABLE
+    for index in range(start, end):
+        crc = ((crc << 8) & 0xFFFF) ^ table[((crc >> 8) ^ buf[index]) & 0xFF]
+    return crc
+
+
+def frame_size(num_fields):
+    """!
+    Find the number of bytes in a frame with the given number of fields.
+    @param num_fields The number of 32-bit fields in each frame
+    @return The size of each frame in bytes
+    """
+    return HEADER_SIZE + 4 * num_fields + CRC_SIZE
+
+
+class FrameWriter:
+    """!
+    Packs records into binary frames and writes them to a serial port.
+
+    Frames are packed into a buffer which is allocated when the writer is
+    created, and the buffer is sent with a single call to the port's
+    @c write() method each time it fills up, so writing records allocates no
+    memory. Call @c flush() to send frames waiting in a partly full buffer.
+
+    @code
+    import array
+    import pyb
+    import telemetry
+
+    u2 = pyb.UART(2, baudrate=115200)
+    writer = telemetry.FrameWriter(u2, 3, frames_per_write=16)
+    sample = array.array('l', [0, 0, 0])
+
+    # For each sample, fill in the fields and add a frame
+    sample[0] = time_ms
+    sample[1] = position_1
+    sample[2] = position_2
+    writer.add(sample)
+
+    # When done, send any frames left in the buffer
+    writer.flush()
+    @endcode
+    """
+
+    def __init__(self, port, num_fields, frames_per_write=1,
+                 frame_type=FRAME_SAMPLE):
+        """!
+        Create a frame writer and allocate its buffer.
+        @param port The serial port, or any object with a @c write() method
+        @param num_fields The number of 32-bit fields in each frame
+        @param frames_per_write The number of frames to collect in the buffer
+               before they are written to the port
+        @param frame_type The type byte put in each frame
+        """
+        self._port = port
+        self._num_fields = num_fields
+        self._frame_size = frame_size(num_fields)
+        self._frames_per_write = frames_per_write
+        self._frame_type = frame_type
+        self._buffer = bytearray(self._frame_size * frames_per_write)
+        # A view of the filled part of the buffer for each number of frames
+        #  it may hold, made now so that flush() allocates no memory
+        view = memoryview(self._buffer)
+        self._views = [view[:count * self._frame_size]
+                       for count in range(frames_per_write + 1)]
+        self._index = 0
+        self._used = 0
+        ## The sequence number which will be put in the next frame
+        self.seq = 0
+
+    @micropython.native
+    def add(self, values):
+        """!
+        Pack a record into a frame, sending the buffer if it is full.
+        @param values A sequence, such as an @c array.array, holding at least
+               as many integers as the writer has fields; the first ones are
+               used
+        """
+        buf = self._buffer
+        start = self._used
+        buf[start] = SYNC_1
+        buf[start + 1] = SYNC_2
+        buf[start + 2] = self._frame_type
+        buf[start + 3] = self._num_fields
+        buf[start + 4] = self.seq & 0xFF
+        buf[start + 5] = (self.seq >> 8) & 0xFF
+        pos = start + HEADER_SIZE
+        for index in range(self._num_fields):
+            value = values[index]
+            buf[pos] = value & 0xFF
+            buf[pos + 1] = (value >> 8) & 0xFF
+            buf[pos + 2] = (value >> 16) & 0xFF
+            buf[pos + 3] = (value >> 24) & 0xFF
+            pos += 4
+        crc = crc16(buf, start + 2, pos)
+        buf[pos] = crc & 0xFF
+        buf[pos + 1] = crc >> 8
+
+        self.seq = (self.seq + 1) & 0xFFFF
+        self._used = pos + CRC_SIZE
+        self._index += 1
+        if self._index >= self._frames_per_write:
+            self._port.write(self._buffer)
+            self._index = 0
+            self._used = 0
+
+    def flush(self):
+        """!
+        Send any frames waiting in the buffer.
+        """
+        if self._used:
+            self._port.write(self._views[self._index])
+            self._index = 0
+            self._used = 0
+
+    def pending(self):
+        """!
+        Find how many frames are waiting in the buffer to be sent.
+        @return The number of frames in the buffer
+        """
+        return self._index
+
+
+def put_record(queue, values, num_fields=None):
+    """!
+    Put a whole record into a queue of integers, or none of it.
+
+    A record of N fields takes N places in the queue. If there isn't room for
+    the whole record, nothing is put in, so the queue never holds part of a
+    record and the caller never waits for room.
+    @param queue A @c task_share.Queue or @c task_share.RingQueue holding
+           integers
+    @param values A sequence holding the fields of the record; for a
+           @c RingQueue, an @c array.array of the queue's type
+    @param num_fields The number of fields to put, by default all of them
+    @return @c True if the record was put into the queue, @c False if there
+            wasn't room
+    """
+    if num_fields is None:
+        num_fields = len(values)
+    if queue.room() < num_fields:
+        return False
+    if isinstance(queue, task_share.RingQueue):
+        queue.put_many(values, num_fields)
+        return True
+    for index in range(num_fields):
+        queue.put(values[index])
+    return True
+
+
+class TelemetryStreamer:
+    """!
+    A task which sends records from a queue to a serial port as frames.
+
+    Tasks which produce data put each record into a queue with
+    @c put_record(). Each time this task runs, it takes up to a set number
+    of whole records from the queue, packs them into frames and sends them
+    with a single write. If the task is subscribed to the queue and records
+    are left over, it is woken again to send them. Records are therefore
+    sent while a test runs rather than saved and sent at the end, and the
+    memory used is the queue and one frame buffer, however long the test
+    runs.
+
+    @code
+    samples = task_share.Queue('l', 3 * 32, name="Samples")
+    streamer = telemetry.TelemetryStreamer(samples, pyb.UART(2, 115200), 3)
+    cotask.task_list.append(cotask.Task(streamer.run, name="Telemetry",
+                                        priority=0, period=20))
+    @endcode
+    """
+
+    def __init__(self, queue, port, num_fields, chunk=8):
+        """!
+        Create a streamer and allocate its buffers.
+        @param queue The @c task_share.Queue or @c task_share.RingQueue from
+               which records are taken
+        @param port The serial port, or any object with a @c write() method
+        @param num_fields The number of fields in each record
+        @param chunk The largest number of records sent each time the task
+               runs, which bounds how long each run takes
+        """
+        self._queue = queue
+        self._ring = isinstance(queue, task_share.RingQueue)
+        self._num_fields = num_fields
+        self._chunk = chunk
+        self._writer = FrameWriter(port, num_fields, frames_per_write=chunk)
+        self._record = array.array('l', [0] * num_fields)
+        ## The number of records sent so far
+        self.sent = 0
+
+    @micropython.native
+    def drain(self):
+        """!
+        Send up to one chunk of whole records from the queue.
+        @return The number of records sent
+        """
+        queue = self._queue
+        record = self._record
+        num_fields = self._num_fields
+        count = 0
+        while count < self._chunk and queue.num_in() >= num_fields:
+            if self._ring:
+                queue.get_into(record)
+            else:
+                for index in range(num_fields):
+                    record[index] = queue.get()
+            self._writer.add(record)
+            count += 1
+        self._writer.flush()
+        # A task woken by the queue only runs again when it is woken, so if
+        # records are left over, wake it for them now
+        if count >= self._chunk:
+            queue.renotify()
+        self.sent += count
+        return count
+
+    def run(self):
+        """!
+        The task function, a generator which sends a chunk each time it runs.
+        """
+        while True:
+            self.drain()
+            yield 0
+
+
+class MetricsReporter:
+    """!
+    A task which sends the scheduler's metrics and every task's profile over
+    a serial port as frames.
+
+    Each report is one @c FRAME_SCHEDULER frame, whose fields are those
+    written by @c cotask.TaskList.metrics_into(): the microseconds over which
+    the metrics were measured, the number of scheduler passes, the
+    microseconds spent idle and the number of tasks. Then comes one
+    @c FRAME_TASK frame for each task, whose fields are the task's index in
+    the report, its priority, its period in microseconds or -1 if it has
+    none, its name in @c NAME_FIELDS fields of four characters each, and
+    the items written by @c cotask.Task.profile_into(). Tasks which aren't
+    profiled have empty histograms.
+
+    The frames may share a serial port with sample frames; the decoder tells
+    them apart by their type.
+
+    @code
+    reporter = telemetry.MetricsReporter(pyb.UART(2, 115200))
+    cotask.task_list.append(cotask.Task(reporter.run, name="Metrics",
+                                        priority=0, period=1000))
+    @endcode
+    """
+
+    def __init__(self, port, task_list=None, reset=True):
+        """!
+        Create a reporter and allocate its buffers.
+        @param port The serial port, or any object with a @c write() method
+        @param task_list The @c cotask.TaskList to report on, by default
+               @c cotask.task_list
+        @param reset If @c True, the scheduler-wide metrics are reset after
+               each report, so each report covers the time since the last;
+               task profiles are never reset
+        """
+        self._task_list = cotask.task_list if task_list is None else task_list
+        self._reset = reset
+        self._scheduler_writer = FrameWriter(port, SCHEDULER_FIELDS,
+                                             frame_type=FRAME_SCHEDULER)
+        self._task_writer = FrameWriter(port, TASK_FIELDS,
+                                        frame_type=FRAME_TASK)
+        # Fields may be unsigned 32-bit values, such as packed names, which
+        #  don't fit a signed 'l' array
+        self._record = array.array('q', [0] * TASK_FIELDS)
+        self._names = {}
+
+    def _pack_name(self, task):
+        """!
+        Find the fields holding a task's name, packing them the first time.
+        @param task The task whose name is wanted
+        @return A tuple of @c NAME_FIELDS integers, each holding four bytes
+                of the name in little-endian order, padded with zeros
+        """
+        words = self._names.get(task)
+        if words is None:
+            name = task.name.encode()[:4 * NAME_FIELDS]
+            name += bytes(4 * NAME_FIELDS - len(name))
+            words = tuple(name[index] | name[index + 1] << 8
+                          | name[index + 2] << 16 | name[index + 3] << 24
+                          for index in range(0, 4 * NAME_FIELDS, 4))
+            self._names[task] = words
+        return words
+
+    def send(self):
+        """!
+        Send one report of the scheduler's metrics and every task's profile.
+        """
+        record = self._record
+        task_list = self._task_list
+        task_list.metrics_into(record)
+        self._scheduler_writer.add(record)
+        if self._reset:
+            task_list.reset_metrics()
+        self._scheduler_writer.flush()
+
+        index = 0
+        for pri in task_list.pri_list:
+            for position in range(2, len(pri)):
+                task = pri[position]
+                record[0] = index
+                record[1] = task.priority
+                record[2] = -1 if task.period is None else task.period
+                words = self._pack_name(task)
+                for word in range(NAME_FIELDS):
+                    record[3 + word] = words[word]
+                task.profile_into(record, 3 + NAME_FIELDS)
+                self._task_writer.add(record)
+                index += 1
+        self._task_writer.flush()
+
+    def run(self):
+        """!
+        The task function, a generator which sends a report each time it runs.
+        """
+        while True:
+            self.send()
+            yield 0
@@ -0,0 +1,337 @@
+"""!
+@file trajectory.py
+    This file contains motion profiles which move motors smoothly from one
+    position to another, and a task which sends the profiles' setpoints to
+    the motor tasks as time passes.
+
+    Stepping a setpoint straight to its final value asks for an instant
+    change in position, so the controller saturates the motor driver and the
+    motor overshoots. A profile instead moves the setpoint no faster than a
+    given velocity, changing speed no faster than a given acceleration; a
+    trapezoidal profile limits velocity and acceleration, and an S-curve
+    profile also limits jerk, the rate at which acceleration changes.
+
+    A profile is made of segments in each of which the jerk is constant, so
+    the position is a cubic polynomial of the time since the segment began.
+    The polynomials' coefficients are worked out when the profile is made,
+    and finding a setpoint only means finding the current segment and
+    evaluating its cubic.
+
+    Floats on the pyboard have only 24 bits of precision, so positions far
+    from zero can't be held in them exactly. Each segment therefore starts at
+    a whole number of counts held as an integer, and only the cubic, which
+    covers no more than the segment's own movement, is worked out in floating
+    point. Segment start times are held as integer microseconds.
+
+@author Peyton Archibald
+@author Harrison Hirsch
+@date   October 18, 2026
+"""
+
+import array
+import math
+import micropython
+import utime
+
+
+def _phases_to_segments(start, phases, end=None):
+    """!
+    Integrate phases of motion, starting at rest, into the times, starting
+    positions and polynomial coefficients of the segments of a profile.
+    @param start The position at which the profile starts, in whole counts
+    @param phases A sequence of tuples, one per phase, of the phase's length
+           in seconds, the acceleration in counts/s^2 at its start or @c None
+           to carry on from the last phase, and its jerk in counts/s^3
+    @param end The position at which the profile ends, in whole counts, or
+           @c None to use the end of the last phase
+    @return A tuple of a list of start times in microseconds, a list of
+            whole starting positions in counts, and a tuple of four lists of
+            the coefficients of the position, in counts from the starting
+            position, as a cubic in the ms since each segment began
+    """
+    start = int(start)
+    times = []
+    bases = []
+    coefficients = ([], [], [], [])
+    time = 0.0
+    # The position is found relative to the start, so that it needs no more
+    # precision than the length of the move
+    position = 0.0
+    velocity = 0.0
+    acceleration = 0.0
+    for duration, new_acceleration, jerk in phases:
+        if duration <= 0.0:
+            continue
+        if new_acceleration is not None:
+            acceleration = new_acceleration
+        times.append(round(time * 1e6))
+        whole = math.floor(position)
+        bases.append(start + int(whole))
+        for coefficient, value in zip(coefficients, (position - whole, velocity / 1e3, acceleration / 2e6,
+                                                     jerk / 6e9)):
+            coefficient.append(value)
+        position += (velocity + (acceleration / 2 + jerk * duration / 6) * duration) * duration
+        velocity += (acceleration + jerk * duration / 2) * duration
+        acceleration += jerk * duration
+        time += duration
+
+    # Finish with a segment which holds the final position
+    times.append(round(time * 1e6))
+    bases.append(start + round(position) if end is None else int(end))
+    for coefficient in coefficients:
+        coefficient.append(0.0)
+    return times, bases, coefficients
+
+
+class Trajectory:
+    """!
+    A motion profile which gives a setpoint for each moment of a move.
+
+    Profiles are usually made with @c trapezoidal() or @c s_curve() rather
+    than by calling the constructor.
+
+    @code
+    import trajectory
+
+    # Move from 0 to 24000 counts at up to 20000 counts/s and 40000 counts/s^2
+    move = trajectory.Trajectory.trapezoidal(0, 24000, 20000, 40000)
+    print(move.duration())                  # Length of the move in ms
+    setpoint = move.position(250)           # Setpoint 250 ms into the move
+    @endcode
+    """
+
+    def __init__(self, times, bases, coefficients):
+        """!
+        Create a profile from its segments.
+        @param times The time in whole microseconds at which each segment
+               starts, the first being 0 and the last being the end of the
+               move
+        @param bases The position at which each segment starts, in whole
+               counts
+        @param coefficients A tuple of four sequences holding, for each
+               segment, the coefficients of the position, in counts from the
+               segment's base, as a cubic in the ms since the segment began,
+               constant term first
+        """
+        self._times = array.array('q', times)
+        self._bases = array.array('q', bases)
+        self._c0, self._c1, self._c2, self._c3 = (array.array('f', c) for c in coefficients)
+        self._num_segments = len(self._times)
+        self._segment = 0
+
+    @classmethod
+    def trapezoidal(cls, start, end, v_max, a_max):
+        """!
+        Make a profile which limits velocity and acceleration.
+        If the move is too short to reach @c v_max, the velocity profile is a
+        triangle rather than a trapezoid.
+        @param start The position at which the move starts, in counts
+        @param end The position at which the move ends, in counts
+        @param v_max The largest velocity allowed, in counts/s
+        @param a_max The largest acceleration allowed, in counts/s^2
+        @return A @c Trajectory
+        """
+        distance = abs(end - start)
+        sign = 1.0 if end >= start else -1.0
+        if v_max * v_max > distance * a_max:
+            v_max = math.sqrt(distance * a_max)
+        if v_max <= 0.0:
+            return cls(*_phases_to_segments(start, (), end))
+        t_accel = v_max / a_max
+        t_cruise = distance / v_max - t_accel
+        return cls(*_phases_to_segments(
+            start, ((t_accel, sign * a_max, 0.0), (t_cruise, 0.0, 0.0), (t_accel, -sign * a_max, 0.0)), end))
+
+    @classmethod
+    def s_curve(cls, start, end, v_max, a_max, j_max):
+        """!
+        Make a jerk-limited profile which limits velocity, acceleration and
+        jerk. If the move is too short to reach @c v_max or @c a_max, smaller
+        peaks are used.
+        @param start The position at which the move starts, in counts
+        @param end The position at which the move ends, in counts
+        @param v_max The largest velocity allowed, in counts/s
+        @param a_max The largest acceleration allowed, in counts/s^2
+        @param j_max The largest jerk allowed, in counts/s^3
+        @return A @c Trajectory
+        """
+        distance = abs(end - start)
+        sign = 1.0 if end >= start else -1.0
+        if distance <= 0.0:
+            return cls(*_phases_to_segments(start, (), end))
+
+        # The acceleration can't reach a_max if the velocity reaches v_max first
+        if v_max * j_max < a_max * a_max:
+            a_max = math.sqrt(v_max * j_max)
+        # The distance covered speeding up to v_max and slowing down again
+        if v_max * (v_max / a_max + a_max / j_max) > distance:
+            # Too short to reach v_max; find the peak velocity at which speeding up and slowing down just meet
+            v_max = a_max * (math.sqrt(a_max * a_max / (j_max * j_max) + 4 * distance / a_max) - a_max / j_max) / 2
+            if v_max * j_max < a_max * a_max:
+                # Too short even to reach a_max
+                v_max = (distance * math.sqrt(j_max) / 2) ** (2 / 3)
+                a_max = math.sqrt(v_max * j_max)
+        t_jerk = a_max / j_max
+        t_accel = v_max / a_max - t_jerk
+        t_cruise = distance / v_max - (t_accel + 2 * t_jerk)
+        durations = (t_jerk, t_accel, t_jerk, t_cruise, t_jerk, t_accel, t_jerk)
+        jerks = (j_max, 0.0, -j_max, 0.0, -j_max, 0.0, j_max)
+        return cls(*_phases_to_segments(start, [(duration, None, sign * jerk)
+                                                 for duration, jerk in zip(durations, jerks)], end))
+
+    def duration(self):
+        """!
+        Find how long the move takes.
+        @return The length of the move in ms
+        """
+        return self._times[self._num_segments - 1] / 1000
+
+    def stretched(self, duration):
+        """!
+        Make a copy of the profile which follows the same path more slowly.
+        Velocities are divided by the stretch factor, accelerations by its
+        square and jerks by its cube, so the copy stays within the limits of
+        the original. This is used to make the moves of several axes finish
+        together.
+        @param duration The length in ms of the new profile, no less than the
+               length of this one
+        @return A new @c Trajectory
+        """
+        old = self.duration()
+        scale = duration / old if old > 0 else 1.0
+        return Trajectory([round(t * scale) for t in self._times], self._bases,
+                          (self._c0, [c / scale for c in self._c1], [c / scale ** 2 for c in self._c2],
+                           [c / scale ** 3 for c in self._c3]))
+
+    @micropython.native
+    def position(self, time):
+        """!
+        Find the setpoint at a given time during the move.
+        Successive calls are quickest when the times increase, as they do in
+        a task, since the search for the segment starts from the last one
+        used.
+        @param time The time in ms since the move began
+        @return The position in whole counts; before the move this is the
+                starting position and after it the final one
+        """
+        time_us = time * 1000
+        times = self._times
+        segment = self._segment
+        if time_us < times[segment]:
+            segment = 0
+        last = self._num_segments - 1
+        while segment < last and time_us >= times[segment + 1]:
+            segment += 1
+        self._segment = segment
+        if time < 0:
+            return self._bases[0]
+        if segment == last:
+            return self._bases[last]
+        t = (time_us - times[segment]) / 1000
+        return self._bases[segment] + round(
+            self._c0[segment] + t * (self._c1[segment] + t * (self._c2[segment] + t * self._c3[segment])))
+
+
+class TrajectoryTask:
+    """!
+    A task which moves the setpoints of one or more axes along profiles.
+
+    Each time the task runs, it finds each axis's setpoint for the present
+    time and puts it into that axis's setpoint share, so it should run as
+    often as the motor control task. A move of several axes can be
+    coordinated, so that all the axes start and finish together.
+
+    @code
+    planner = trajectory.TrajectoryTask(setpoint_shares, 20000, 40000, j_max=400000)
+    cotask.task_list.append(cotask.Task(planner.run, name="Trajectory", priority=2, period=10))
+    ...
+    planner.move_to((24000, 16000))
+    @endcode
+    """
+
+    def __init__(self, setpoint_shares, v_max, a_max, j_max=None, coordinated=True):
+        """!
+        Create a trajectory task for a set of axes, which start at rest with
+        the setpoints which their shares hold.
+        @param setpoint_shares A share for each axis into which its setpoint
+               is put
+        @param v_max The largest velocity allowed, in counts/s; either one
+               number for all axes or a sequence with one for each
+        @param a_max The largest acceleration allowed, in counts/s^2, as for
+               @c v_max
+        @param j_max The largest jerk allowed, in counts/s^3, as for
+               @c v_max; if @c None, trapezoidal profiles are used instead of
+               S-curves
+        @param coordinated If @c True, the axes of each move finish together,
+               all taking as long as the slowest one
+        """
+        self._shares = list(setpoint_shares)
+        num_axes = len(self._shares)
+        self._v_max = self._per_axis(v_max, num_axes)
+        self._a_max = self._per_axis(a_max, num_axes)
+        self._j_max = None if j_max is None else self._per_axis(j_max, num_axes)
+        self._coordinated = coordinated
+        self._moves = [Trajectory.trapezoidal(share.get(), share.get(), 1, 1) for share in self._shares]
+        self._start = utime.ticks_ms()
+        self._duration = 0
+
+    @staticmethod
+    def _per_axis(value, num_axes):
+        """!
+        Turn a limit given once for all axes into one for each axis.
+        """
+        try:
+            return list(value)
+        except TypeError:
+            return [value] * num_axes
+
+    def move_to(self, targets):
+        """!
+        Start moving the axes from their present setpoints to new ones.
+        A move which is under way is replaced, starting from the setpoints
+        reached so far; profiles start at rest, so this is smoothest when
+        the last move has finished.
+        @param targets The final setpoint of each axis, in counts
+        """
+        now = utime.ticks_ms()
+        elapsed = utime.ticks_diff(now, self._start)
+        moves = []
+        for axis, target in enumerate(targets):
+            start = self._moves[axis].position(elapsed)
+            if self._j_max is None:
+                moves.append(Trajectory.trapezoidal(start, target, self._v_max[axis], self._a_max[axis]))
+            else:
+                moves.append(Trajectory.s_curve(start, target, self._v_max[axis], self._a_max[axis],
+                                                self._j_max[axis]))
+        self._duration = max(move.duration() for move in moves)
+        if self._coordinated:
+            moves = [move.stretched(self._duration) for move in moves]
+        self._moves = moves
+        self._start = now
+
+    def done(self):
+        """!
+        Check whether the last move has finished.
+        @return @c True if every axis has reached its final setpoint
+        """
+        return utime.ticks_diff(utime.ticks_ms(), self._start) >= self._duration
+
+    @micropython.native
+    def update(self):
+        """!
+        Put each axis's setpoint for the present time into its share.
+        """
+        elapsed = utime.ticks_diff(utime.ticks_ms(), self._start)
+        moves = self._moves
+        shares = self._shares
+        for axis in range(len(shares)):
+            shares[axis].put(moves[axis].position(elapsed))
+
+    def run(self):
+        """!
+        Generator which updates the setpoints each time it is run, for use as
+        a task function.
+        """
+        while True:
+            self.update()
+            yield 0
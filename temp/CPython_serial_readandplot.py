@@ -1,44 +1,56 @@
-import time
 import serial
 import matplotlib.pyplot as plt
+import step_analysis
+import telemetry_decode
 
 """!
     @file                       CPython_serial_readandplot.py
     @brief                      Reads and plots data from a serial port
     @details                    This file is to be run on a computer that is reading data from a serial port. The
-                                incoming data will be read, formatted, and plotted.
+                                incoming data will be read, formatted, and plotted. The data arrives as binary frames
+                                of time, the positions of both motors and their setpoints, decoded by telemetry_decode.py.
 
     @author                     Peyton Archibald
     @author                     Harrison Hirsch
     @date                       February 7, 2023
 """
 
-
 def main():
     """!
         @brief                  Method that plots incoming data from a serial port
         @details                This file waits for data coming into a serial port, then reads, formats, and plots the
                                 data.
     """
-    with(serial.Serial('COM4', 115200) as ser):     # Set up serial port
+    with(serial.Serial('COM4', 115200, timeout=0.1) as ser):    # Set up serial port; reads wait at most 0.1 s
         ser.flush()
         plt.close()         # Close any existing figures
+        decoder = telemetry_decode.FrameDecoder()
         data_list_x = []    # Allocate memory for x values
         data_list_y = []    # Allocate memory for y values
-        try:
-            while True:
-                if ser.inWaiting() > 0:     # Once data is read
-                    data = ser.readline().strip(b'\r\n').split(b', ')   # Format incoming data
-                    data_list_x.append(int(data[0]))      # Append x values to x list
-                    data_list_y.append(int(data[1]))      # Append y values to y list
-                    if data_list_x[len(data_list_x)-1] >= 6000:         # Once data is finished (change this to length of step response)
-                        break                               # Break out of loop to plot
-                else:
-                    time.sleep(0.01)
-        except (ValueError, IndexError) as e:       # Corrupted data handling
-            print(e)
+        data_list_y2 = []   # Allocate memory for motor 2 y values
+        setpoints = None    # The setpoints of the motors, sent after their positions in each frame
+        done = False
+        while not done:
+            # Wait for a byte or the timeout, then take whatever else has arrived
+            for frame in decoder.feed(ser.read(max(1, ser.in_waiting))):   # Decode complete frames
+                if frame.type != telemetry_decode.FRAME_SAMPLE:
+                    continue
+                num_axes = (len(frame.fields) - 1) // 2
+                data_list_x.append(frame.fields[0])      # Append x values to x list
+                data_list_y.append(frame.fields[1])      # Append y values to y list
+                data_list_y2.append(frame.fields[2])     # Append motor 2 y values
+                setpoints = frame.fields[1 + num_axes:1 + 2 * num_axes]
+                if data_list_x[-1] >= 6000:             # Once data is finished (change this to length of step response)
+                    done = True                         # Break out of loop to plot
+        if decoder.crc_errors or decoder.lost_frames:       # Corrupted data handling
+            print(f'{decoder.crc_errors} corrupted frames, {decoder.lost_frames} frames lost')
     # print('checkpoint')     # For debugging
-    plt.plot(data_list_x, data_list_y, 'r-')        # Plot x and y data
+    for name, positions, setpoint in (('Motor 1', data_list_y, setpoints[0]), ('Motor 2', data_list_y2, setpoints[1])):
+        print(f'{name}, setpoint {setpoint} counts:')
+        print(step_analysis.summary(step_analysis.analyze(data_list_x, positions, setpoint)))
+    plt.plot(data_list_x, data_list_y, 'r-', label='Motor 1')      # Plot x and y data
+    plt.plot(data_list_x, data_list_y2, 'b-', label='Motor 2')     # Plot motor 2 data
+    plt.legend()
     plt.xlabel('Time [ms]')                         # Label x axis
     plt.ylabel('Position [encoder counts]')         # Label y axis
     # Label steady state value
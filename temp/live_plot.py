@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import queue
+import threading
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.animation import FuncAnimation
+
+import run_store
+import serial_ingest
+import telemetry_decode
+
+"""!
+    @file                       live_plot.py
+    @brief                      Plots telemetry from one or more boards live, for streams of any length
+    @details                    Frames are read by serial_ingest.py in a background thread and passed to the plot
+                                through a queue. The plot shows a rolling window of the most recent data, with time
+                                measured back from each line's newest sample so that the axes stay still and only the lines
+                                need to be redrawn (blitting). Each line is kept in a fixed-size ring buffer, and
+                                before drawing, the samples in the window are reduced to the minimum and maximum in
+                                each pixel column, which looks the same as drawing every sample but draws at most two
+                                points per column however long the stream has run.
+
+                                Example, plotting both motors of two boards with a 10 second window, and also storing
+                                the runs:
+                                @code
+                                    python live_plot.py COM4 COM5 --window 10 --out runs
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+
+def decimate_minmax(x, y, x_min, x_max, columns):
+    """!
+        @brief                  Reduces samples to the minimum and maximum in each of a number of equal bins
+        @details                The samples must be in order of increasing @c x. Bins with no samples are left out.
+        @param  x               Sample times
+        @param  y               Sample values
+        @param  x_min           The start of the first bin
+        @param  x_max           The end of the last bin
+        @param  columns         The number of bins, usually the width of the plot in pixels
+        @return                 A tuple of arrays of times and values with two points per non-empty bin
+    """
+    if len(x) <= 2 * columns:
+        return x, y
+    edges = np.linspace(x_min, x_max, columns + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1]))
+    starts = starts[starts < len(x)]
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    ends = np.append(starts[1:], len(x)) - 1
+    xs = np.empty(2 * len(starts))
+    ys = np.empty(2 * len(starts))
+    xs[0::2] = x[starts]
+    xs[1::2] = x[ends]
+    ys[0::2] = lows
+    ys[1::2] = highs
+    return xs, ys
+
+
+class RingSeries:
+    """!
+    @brief                      A fixed-size ring buffer of (time, value) samples for one plotted line
+    """
+
+    def __init__(self, capacity):
+        """!
+            @brief              Allocates the buffer
+            @param  capacity    The largest number of samples kept; older samples are dropped
+        """
+        self._t = np.zeros(capacity)
+        self._y = np.zeros(capacity)
+        self._capacity = capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, t, y):
+        """!
+            @brief              Adds one sample
+        """
+        self._t[self._next] = t
+        self._y[self._next] = y
+        self._next = (self._next + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+
+    def clear(self):
+        """!
+            @brief              Removes all samples
+        """
+        self._next = 0
+        self._count = 0
+
+    def latest_time(self):
+        """!
+            @brief              Returns the time of the newest sample, or @c None if there are none
+        """
+        return self._t[self._next - 1] if self._count else None
+
+    def since(self, t_start):
+        """!
+            @brief              Returns the samples from a given time on, oldest first
+            @details            Once the ring has wrapped, its older and newer halves are searched separately, so
+                                only the samples returned are copied; if they are all in the newer half, views of
+                                the buffer are returned and nothing is copied.
+            @return             A tuple of arrays of times and values
+        """
+        if self._count < self._capacity:
+            first = np.searchsorted(self._t[:self._count], t_start)
+            return self._t[first:self._count], self._y[first:self._count]
+        if self._next and self._t[0] <= t_start:
+            first = np.searchsorted(self._t[:self._next], t_start)
+            return self._t[first:self._next], self._y[first:self._next]
+        first = self._next + np.searchsorted(self._t[self._next:], t_start)
+        return (np.concatenate((self._t[first:], self._t[:self._next])),
+                np.concatenate((self._y[first:], self._y[:self._next])))
+
+
+class QueueSink:
+    """!
+    @brief                      A sink for serial_ingest.py which passes frames to another thread through a queue
+    """
+
+    def __init__(self, *others):
+        """!
+            @brief              Creates the sink
+            @param  others      Other sinks, such as a @c run_store.RunStoreSink, which also receive every frame
+        """
+        ## The queue of (port, frame) pairs
+        self.queue = queue.Queue()
+        self._others = others
+
+    def frame(self, port, frame):
+        """!
+            @brief              Queues a frame and passes it to the other sinks
+        """
+        self.queue.put((port, frame))
+        for sink in self._others:
+            sink.frame(port, frame)
+
+    def flush(self):
+        """!
+            @brief              Flushes the other sinks
+        """
+        for sink in self._others:
+            sink.flush()
+
+    def close(self):
+        """!
+            @brief              Closes the other sinks
+        """
+        for sink in self._others:
+            sink.close()
+
+
+class LivePlot:
+    """!
+    @brief                      A plot of the latest few seconds of several telemetry streams, updated as data arrives
+    """
+
+    def __init__(self, ports, fields=(1, 2), window=10.0, capacity=200000, interval=50):
+        """!
+            @brief              Creates the figure and a line for each field of each port
+            @param  ports       The names of the ports being read
+            @param  fields      The frame fields to plot; field 0 is the time in ms
+            @param  window      The width of the rolling window in seconds
+            @param  capacity    The number of samples kept for each line
+            @param  interval    Time between plot updates in ms
+        """
+        self._fields = fields
+        self._window = window
+        self._interval = interval
+        self._sink = None
+        self.fig, self.ax = plt.subplots()
+        self.ax.set_xlim(-window, 0)
+        self.ax.set_ylim(-1000, 1000)
+        self.ax.set_xlabel('Time before latest sample [s]')
+        self.ax.set_ylabel('Position [encoder counts]')
+        self._series = {}
+        self._lines = {}
+        for port in ports:
+            for field in fields:
+                key = (port, field)
+                self._series[key] = RingSeries(capacity)
+                (self._lines[key],) = self.ax.plot([], [], '-', label=f'{port} field {field}', animated=True)
+        self.ax.legend(loc='upper left')
+
+    def attach(self, sink):
+        """!
+            @brief              Sets the @c QueueSink from which frames are taken
+        """
+        self._sink = sink
+
+    def _take_frames(self):
+        """!
+            @brief              Moves all waiting frames from the queue into the ring buffers
+        """
+        while True:
+            try:
+                port, frame = self._sink.queue.get_nowait()
+            except queue.Empty:
+                return
+            if frame.type != telemetry_decode.FRAME_SAMPLE:
+                continue
+            t = frame.fields[0] / 1000.0
+            for field in self._fields:
+                series = self._series.get((port, field))
+                if series is None or field >= len(frame.fields):
+                    continue
+                latest = series.latest_time()
+                if latest is not None and t < latest:
+                    series.clear()          # A new run has started
+                series.append(t, frame.fields[field])
+
+    def _update(self, _):
+        """!
+            @brief              Redraws the lines with the latest data; called by the animation
+        """
+        if self._sink is not None:
+            self._take_frames()
+        columns = max(int(self.ax.bbox.width), 1)
+        low, high = self.ax.get_ylim()
+        rescale = False
+        for key, series in self._series.items():
+            # Each board has its own clock, so each line is placed relative to its own newest sample
+            latest = series.latest_time()
+            if latest is None:
+                continue
+            t, y = series.since(latest - self._window)
+            t, y = decimate_minmax(t - latest, y, -self._window, 0.0, columns)
+            self._lines[key].set_data(t, y)
+            if len(y) and (y.min() < low or y.max() > high):
+                low, high = min(low, y.min()), max(high, y.max())
+                rescale = True
+        if rescale:
+            # The axes themselves must change, which blitting can't do; redraw everything once
+            margin = 0.05 * (high - low)
+            self.ax.set_ylim(low - margin, high + margin)
+            self.fig.canvas.draw_idle()
+        return list(self._lines.values())
+
+    def show(self):
+        """!
+            @brief              Shows the plot and keeps it updating until the window is closed
+        """
+        self._animation = FuncAnimation(self.fig, self._update, interval=self._interval, blit=True,
+                                        cache_frame_data=False)
+        plt.show()
+
+
+def main():
+    """!
+        @brief                  Reads the ports given on the command line and plots them live
+    """
+    parser = argparse.ArgumentParser(description="Plot telemetry from several boards live")
+    parser.add_argument('ports', nargs='+', help="serial ports to read, such as COM4 or /dev/ttyACM0")
+    parser.add_argument('--baudrate', type=int, default=115200)
+    parser.add_argument('--window', type=float, default=10.0, help="width of the rolling window in seconds")
+    parser.add_argument('--fields', type=int, nargs='+', default=[1, 2], help="frame fields to plot")
+    parser.add_argument('--out', default=None, help="also store the runs in this run store directory")
+    args = parser.parse_args()
+
+    others = [run_store.RunStoreSink(run_store.RunStore(args.out))] if args.out else []
+    sink = QueueSink(*others)
+    plot = LivePlot(args.ports, fields=args.fields, window=args.window)
+    plot.attach(sink)
+
+    loop_ready = threading.Event()
+    holder = {}
+
+    def reader():
+        async def run():
+            holder['loop'] = asyncio.get_running_loop()
+            holder['stop'] = asyncio.Event()
+            loop_ready.set()
+            await serial_ingest.ingest(args.ports, args.baudrate, sink, stop=holder['stop'])
+        asyncio.run(run())
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    loop_ready.wait()
+    try:
+        plot.show()
+    finally:
+        holder['loop'].call_soon_threadsafe(holder['stop'].set)
+        thread.join(timeout=2.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+
+import serial_ingest
+import telemetry_decode
+
+"""!
+    @file                       metrics_report.py
+    @brief                      Prints the scheduler metrics and task profiles which boards send over serial
+    @details                    Boards running a @c telemetry.MetricsReporter task send a report now and then: the
+                                scheduler's passes and idle time, and each task's run duration and lateness, with
+                                histograms which show the slow runs that averages hide. This file collects the frames
+                                of each report, read with serial_ingest.py, and prints a table for each complete
+                                report. Sample frames sent on the same port are ignored.
+
+                                Example:
+                                @code
+                                    python metrics_report.py COM4
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+
+def format_report(scheduler, tasks):
+    """!
+        @brief                  Makes a table of one report
+        @param  scheduler       The report's @c telemetry_decode.SchedulerMetrics
+        @param  tasks           A list of the report's @c telemetry_decode.TaskMetrics
+        @return                 The table as a string; times are in ms, and percentiles are upper bounds found from
+                                the histograms
+    """
+    elapsed = scheduler.elapsed_us
+    lines = []
+    if elapsed > 0:
+        lines.append(f'{scheduler.passes * 1e6 / elapsed:.0f} passes/s, {scheduler.idle_us * 100 / elapsed:.1f}% idle '
+                     f'over {elapsed / 1e6:.3f} s')
+    lines.append('TASK             PRI    PERIOD    RUNS   DUR P50   DUR P99   MAX DUR  LATE P99  MAX LATE  MISSED')
+    for task in tasks:
+        row = f'{task.name:<16s}{task.priority:4d}'
+        row += '         -' if task.period_us is None else f'{task.period_us / 1000:10.1f}'
+        row += f'{task.runs:8d}'
+        if task.runs == 0:
+            lines.append(row)           # Not profiled, or not yet run
+            continue
+        # A bucket's upper limit may be above the longest time actually counted
+        for value in (telemetry_decode.histogram_percentile(task.run_hist, 0.5),
+                      telemetry_decode.histogram_percentile(task.run_hist, 0.99)):
+            row += '         -' if value is None else f'{min(value, task.slowest_us) / 1000:10.3f}'
+        row += f'{task.slowest_us / 1000:10.3f}'
+        if task.period_us is not None:
+            late = telemetry_decode.histogram_percentile(task.late_hist, 0.99)
+            row += '         -' if late is None else f'{min(late, task.latest_us) / 1000:10.3f}'
+            row += f'{task.latest_us / 1000:10.3f}{task.missed:8d}'
+        lines.append(row)
+    return '\n'.join(lines)
+
+
+class MetricsSink:
+    """!
+    @brief                      A sink for serial_ingest.py which gathers the frames of each report and prints it
+    """
+
+    def __init__(self, report=print):
+        """!
+            @brief              Creates the sink
+            @param  report      A function called with the port name and the table of each complete report
+        """
+        self._report = report
+        self._pending = {}
+
+    def frame(self, port, frame):
+        """!
+            @brief              Adds one frame received from a port, printing the report if it is complete
+        """
+        if frame.type == telemetry_decode.FRAME_SCHEDULER:
+            self._pending[port] = (telemetry_decode.decode_scheduler(frame), [])
+        elif frame.type == telemetry_decode.FRAME_TASK and port in self._pending:
+            scheduler, tasks = self._pending[port]
+            tasks.append(telemetry_decode.decode_task(frame))
+            if len(tasks) >= scheduler.num_tasks:
+                del self._pending[port]
+                self._report(port, format_report(scheduler, tasks))
+
+    def flush(self):
+        """!
+            @brief              Does nothing; reports are printed as soon as they are complete
+        """
+
+    def close(self):
+        """!
+            @brief              Forgets reports which were never completed
+        """
+        self._pending.clear()
+
+
+def main():
+    """!
+        @brief                  Reads the ports given on the command line and prints their reports until Ctrl-C
+    """
+    parser = argparse.ArgumentParser(description="Print scheduler metrics sent by boards")
+    parser.add_argument('ports', nargs='+', help="serial ports to read, such as COM4 or /dev/ttyACM0")
+    parser.add_argument('--baudrate', type=int, default=115200)
+    args = parser.parse_args()
+
+    sink = MetricsSink(lambda port, table: print(f'{port}:\n{table}\n'))
+    try:
+        asyncio.run(serial_ingest.ingest(args.ports, args.baudrate, sink))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
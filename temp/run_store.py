@@ -0,0 +1,268 @@
+import datetime
+import json
+import os
+import uuid
+
+import numpy as np
+import telemetry_decode
+
+"""!
+    @file                       run_store.py
+    @brief                      Stores logged runs on disk as binary columns, read back through memory maps
+    @details                    Each run is kept in its own directory with one file per column, such as time, each
+                                motor's position and setpoint, or duty cycle. A column file is nothing but the column's
+                                values as little-endian 32-bit integers, so a run is appended to by adding to the end
+                                of each file, and it is read by mapping the files into memory with @c numpy.memmap;
+                                only the parts of the files which are actually used are loaded, so months of runs can
+                                be analysed without reading them all into memory.
+
+                                A small index, @c index.jsonl, holds one line of JSON for each finished run with its
+                                identifier, date, rig, gain, task periods, column names, number of samples and any
+                                other notes given when the run was started. Runs are added to the index when they are
+                                closed.
+
+                                Example:
+                                @code
+                                    store = run_store.RunStore('runs')
+                                    with store.new_run(['time_ms', 'position_1'], rig='bench 2', kp=0.1,
+                                                       periods={'motor_1': 20}) as run:
+                                        run.append((0, 0))
+                                        run.append((10, 250))
+                                    for info in store.runs(rig='bench 2'):
+                                        columns = store.load(info['run_id'])
+                                        print(columns['position_1'].max())
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+## The data type in which every column is stored
+DTYPE = np.dtype('<i4')
+
+## The name of the index file in the store's directory
+INDEX_NAME = 'index.jsonl'
+
+
+class RunWriter:
+    """!
+    @brief                      Appends samples to one run's column files
+    @details                    Rows are collected in memory and written to the column files in blocks. The run is
+                                added to the store's index when it is closed.
+    """
+
+    def __init__(self, store, run_id, columns, info, block=1024):
+        """!
+            @brief              Creates the run's directory and empty column files; done by @c RunStore.new_run()
+        """
+        self._store = store
+        self._columns = list(columns)
+        self._info = info
+        self._block = block
+        self._rows = []
+        self._path = store.run_path(run_id)
+        os.makedirs(self._path)
+        self._files = [open(os.path.join(self._path, name + '.i4'), 'ab') for name in self._columns]
+        ## The number of samples appended so far
+        self.samples = 0
+        ## The run's identifier
+        self.run_id = run_id
+
+    def append(self, row):
+        """!
+            @brief              Adds one sample to the run
+            @param  row         A sequence of integers, one for each column
+        """
+        self._rows.append(row[:len(self._columns)])
+        self.samples += 1
+        if len(self._rows) >= self._block:
+            self.flush()
+
+    def flush(self):
+        """!
+            @brief              Writes the collected rows to the column files
+        """
+        if not self._rows:
+            return
+        block = np.asarray(self._rows, dtype=DTYPE).reshape(len(self._rows), len(self._columns))
+        for index, file in enumerate(self._files):
+            block[:, index].tofile(file)
+            file.flush()
+        self._rows = []
+
+    def close(self):
+        """!
+            @brief              Writes any remaining rows, closes the files and adds the run to the index
+        """
+        if self._files is None:
+            return
+        self.flush()
+        for file in self._files:
+            file.close()
+        self._files = None
+        self._info['samples'] = self.samples
+        self._store._add_to_index(self._info)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RunStore:
+    """!
+    @brief                      A directory of runs and the index which describes them
+    """
+
+    def __init__(self, directory):
+        """!
+            @brief              Opens a store, creating its directory if needed
+            @param  directory   The directory holding the store
+        """
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'runs'), exist_ok=True)
+        self._index_path = os.path.join(directory, INDEX_NAME)
+
+    def run_path(self, run_id):
+        """!
+            @brief              Returns the directory which holds a run's column files
+        """
+        return os.path.join(self.directory, 'runs', run_id)
+
+    def new_run(self, columns, rig='', kp=None, periods=None, date=None, **notes):
+        """!
+            @brief              Starts a new run
+            @param  columns     The names of the columns, such as @c ('time_ms', 'position_1', 'setpoint_1')
+            @param  rig         The name of the rig or board the run came from
+            @param  kp          The controller gain used for the run
+            @param  periods     The task periods used for the run, such as a dictionary from task names to ms
+            @param  date        The date and time of the run, by default now
+            @param  notes       Any other values to be kept in the index with the run
+            @return             A @c RunWriter to which the run's samples are appended
+        """
+        date = date or datetime.datetime.now()
+        run_id = f"{date:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        info = {'run_id': run_id, 'date': date.isoformat(timespec='seconds'), 'rig': rig, 'kp': kp,
+                'periods': periods, 'columns': list(columns)}
+        info.update(notes)
+        return RunWriter(self, run_id, columns, info)
+
+    def _add_to_index(self, info):
+        """!
+            @brief              Appends a finished run's description to the index
+        """
+        with open(self._index_path, 'a') as index:
+            index.write(json.dumps(info) + '\n')
+
+    def runs(self, **filters):
+        """!
+            @brief              Lists finished runs, optionally only those whose index entries match given values
+            @details            For example, @c runs(rig='bench 2', kp=0.1) lists the runs on bench 2 with a gain of
+                                0.1. A filter value may also be a function, which is called with the entry's value
+                                and should return @c True for runs to be listed.
+            @return             A list of index entries, each a dictionary, oldest first
+        """
+        if not os.path.exists(self._index_path):
+            return []
+        found = []
+        with open(self._index_path) as index:
+            for line in index:
+                if not line.strip():
+                    continue
+                info = json.loads(line)
+                if all(test(info.get(key)) if callable(test) else info.get(key) == test
+                       for key, test in filters.items()):
+                    found.append(info)
+        return found
+
+    def load(self, run_id, columns=None):
+        """!
+            @brief              Maps a run's columns into memory for reading
+            @param  run_id      The run's identifier
+            @param  columns     The names of the columns wanted, by default all of them
+            @return             A dictionary from column names to read-only @c numpy.memmap arrays
+        """
+        path = self.run_path(run_id)
+        if columns is None:
+            columns = [name[:-3] for name in sorted(os.listdir(path)) if name.endswith('.i4')]
+        mapped = {}
+        for name in columns:
+            file_path = os.path.join(path, name + '.i4')
+            if os.path.getsize(file_path) == 0:
+                mapped[name] = np.zeros(0, dtype=DTYPE)
+            else:
+                mapped[name] = np.memmap(file_path, dtype=DTYPE, mode='r')
+        return mapped
+
+    def column(self, run_ids, name):
+        """!
+            @brief              Maps one column of several runs into memory
+            @param  run_ids     The runs' identifiers, or index entries from @c runs()
+            @param  name        The name of the column
+            @return             A list of @c numpy.memmap arrays, one per run
+        """
+        return [self.load(run['run_id'] if isinstance(run, dict) else run, [name])[name] for run in run_ids]
+
+
+class RunStoreSink:
+    """!
+    @brief                      A sink for serial_ingest.py which stores sample frames as runs in a @c RunStore
+    @details                    As with @c serial_ingest.CsvSink, a new run is started for a port when the time in the
+                                first field of a sample frame goes backwards.
+    """
+
+    def __init__(self, store, columns=('time_ms', 'position_1', 'position_2', 'setpoint_1', 'setpoint_2'),
+                 **info):
+        """!
+            @brief              Creates a sink which stores runs in the given store
+            @param  store       The @c RunStore
+            @param  columns     Column names for the fields of each frame; extra fields are named by number
+            @param  info        Values for the index entry of every run, such as @c kp and @c periods; the rig is
+                                the port name unless given here
+        """
+        self._store = store
+        self._columns = columns
+        self._info = info
+        self._runs = {}
+        self._last_time = {}
+
+    def frame(self, port, frame):
+        """!
+            @brief              Stores one frame received from a port
+        """
+        if frame.type != telemetry_decode.FRAME_SAMPLE:
+            return
+        last = self._last_time.get(port)
+        if port not in self._runs or (last is not None and frame.fields[0] < last):
+            self._close(port)
+            names = list(self._columns[:len(frame.fields)])
+            names += [f'field_{index}' for index in range(len(names), len(frame.fields))]
+            info = dict(self._info)
+            info.setdefault('rig', port)
+            self._runs[port] = self._store.new_run(names, **info)
+        self._last_time[port] = frame.fields[0]
+        self._runs[port].append(frame.fields)
+
+    def _close(self, port):
+        """!
+            @brief              Closes a port's current run, if any
+        """
+        run = self._runs.pop(port, None)
+        if run is not None:
+            run.close()
+
+    def flush(self):
+        """!
+            @brief              Writes collected samples of all open runs to disk
+        """
+        for run in self._runs.values():
+            run.flush()
+
+    def close(self):
+        """!
+            @brief              Closes all open runs, adding them to the index
+        """
+        for port in list(self._runs):
+            self._close(port)
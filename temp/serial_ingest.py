@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import csv
+import os
+import time
+
+import serial
+import telemetry_decode
+import run_store
+
+try:
+    import serial_asyncio           # Optional; reads ports from the event loop without threads
+except ImportError:
+    serial_asyncio = None
+
+"""!
+    @file                       serial_ingest.py
+    @brief                      Reads telemetry from several boards' serial ports at once and stores it
+    @details                    This file runs one asyncio task per serial port. Each task reads bytes as soon as they
+                                arrive, decodes them into frames with telemetry_decode.py, and hands each frame to a
+                                sink which stores it; nothing here plots, so plotting can be done separately from the
+                                stored data or from a live sink. If the pyserial-asyncio package is installed, ports
+                                are read directly by the event loop; otherwise each port's blocking reads run in a
+                                worker thread.
+
+                                The default sink stores runs in a run_store.RunStore, with the gain, task periods and
+                                rig given on the command line in its index; with @c --csv, one CSV file is written per
+                                run per port instead. A new run is taken to start
+                                when the time in the first field of a sample frame goes backwards, as it does when the
+                                board starts a new step response.
+
+                                Example, reading two boards:
+                                @code
+                                    python serial_ingest.py COM4 COM5 --out runs --kp 0.1 --period motor_1=20 \
+                                        --period motor_2=10
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+## Largest number of bytes read from a port at once
+READ_SIZE = 4096
+
+
+class CsvSink:
+    """!
+    @brief                      Stores sample frames in CSV files, one file per run per port
+    """
+
+    def __init__(self, directory, field_names=('time_ms', 'position_1', 'position_2', 'setpoint_1', 'setpoint_2')):
+        """!
+            @brief              Creates a sink which writes files in the given directory
+            @param  directory   The directory for the CSV files, which is created if needed
+            @param  field_names Column names for the fields of each frame; extra fields are named by number
+        """
+        self._directory = directory
+        self._field_names = field_names
+        self._files = {}
+        self._last_time = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def frame(self, port, frame):
+        """!
+            @brief              Stores one frame received from a port
+            @param  port        The name of the port the frame came from
+            @param  frame       The decoded @c telemetry_decode.Frame
+        """
+        if frame.type != telemetry_decode.FRAME_SAMPLE:
+            return
+        last = self._last_time.get(port)
+        if port not in self._files or (last is not None and frame.fields[0] < last):
+            self._start_run(port, len(frame.fields))
+        self._last_time[port] = frame.fields[0]
+        self._files[port][1].writerow(frame.fields)
+
+    def _start_run(self, port, num_fields):
+        """!
+            @brief              Closes a port's current file, if any, and opens a file for a new run
+        """
+        self._close(port)
+        safe_port = ''.join(c if c.isalnum() else '_' for c in port)
+        path = os.path.join(self._directory, f"{safe_port}_{time.strftime('%Y%m%d_%H%M%S')}_{time.time_ns() % 1000000:06d}.csv")
+        file = open(path, 'w', newline='')
+        writer = csv.writer(file)
+        names = list(self._field_names[:num_fields])
+        names += [f'field_{index}' for index in range(len(names), num_fields)]
+        writer.writerow(names)
+        self._files[port] = (file, writer)
+        self._last_time[port] = None
+
+    def _close(self, port):
+        """!
+            @brief              Closes a port's current file, if any
+        """
+        entry = self._files.pop(port, None)
+        if entry is not None:
+            entry[0].close()
+
+    def flush(self):
+        """!
+            @brief              Writes buffered rows of all open files to disk
+        """
+        for file, _ in self._files.values():
+            file.flush()
+
+    def close(self):
+        """!
+            @brief              Closes all open files
+        """
+        for port in list(self._files):
+            self._close(port)
+
+
+async def _open_stream(port, baudrate):
+    """!
+        @brief                  Opens a port and returns an async function which reads the next bytes from it
+    """
+    if serial_asyncio is not None:
+        reader, writer = await serial_asyncio.open_serial_connection(url=port, baudrate=baudrate)
+
+        async def read():
+            # Give up now and then so that the caller can check whether to stop
+            try:
+                return await asyncio.wait_for(reader.read(READ_SIZE), timeout=0.1)
+            except asyncio.TimeoutError:
+                return b''
+
+        return read, writer.close
+
+    ser = serial.serial_for_url(port, baudrate, timeout=0.1)
+    loop = asyncio.get_running_loop()
+
+    def blocking_read():
+        # Wait for at least one byte (or the timeout), then take all that have arrived
+        return ser.read(min(max(ser.in_waiting, 1), READ_SIZE))
+
+    async def read():
+        return await loop.run_in_executor(None, blocking_read)
+
+    return read, ser.close
+
+
+async def read_port(port, baudrate, sink, stop):
+    """!
+        @brief                  Reads, decodes and stores frames from one serial port until told to stop
+        @param  port            The name of the port, such as @c COM4 or @c /dev/ttyACM0
+        @param  baudrate        The baud rate
+        @param  sink            An object with a @c frame(port, frame) method which stores each frame
+        @param  stop            An @c asyncio.Event which is set to stop reading
+        @return                 The port's decoder, which holds counts of damaged and lost frames
+    """
+    decoder = telemetry_decode.FrameDecoder()
+    read, close = await _open_stream(port, baudrate)
+    try:
+        while not stop.is_set():
+            data = await read()
+            if data:
+                for frame in decoder.feed(data):
+                    sink.frame(port, frame)
+    finally:
+        close()
+    return decoder
+
+
+async def ingest(ports, baudrate, sink, stop=None, duration=None):
+    """!
+        @brief                  Reads several serial ports at once, storing their frames in a sink
+        @param  ports           The names of the ports to read
+        @param  baudrate        The baud rate for all ports
+        @param  sink            An object with @c frame(port, frame), @c flush() and @c close() methods
+        @param  stop            An @c asyncio.Event which is set to stop reading, or @c None to make one
+        @param  duration        If given, stop after this many seconds
+        @return                 A dictionary from port names to their decoders
+    """
+    stop = stop or asyncio.Event()
+    readers = [asyncio.create_task(read_port(port, baudrate, sink, stop)) for port in ports]
+
+    async def flush_now_and_then():
+        while not stop.is_set():
+            await asyncio.sleep(1.0)
+            sink.flush()
+
+    flusher = asyncio.create_task(flush_now_and_then())
+    try:
+        if duration is not None:
+            await asyncio.wait(readers, timeout=duration)
+            stop.set()
+        decoders = await asyncio.gather(*readers)
+    finally:
+        stop.set()
+        flusher.cancel()
+        sink.close()
+    return dict(zip(ports, decoders))
+
+
+def main():
+    """!
+        @brief                  Reads the ports given on the command line until Ctrl-C is pressed
+    """
+    parser = argparse.ArgumentParser(description="Store telemetry from several boards' serial ports")
+    parser.add_argument('ports', nargs='+', help="serial ports to read, such as COM4 or /dev/ttyACM0")
+    parser.add_argument('--baudrate', type=int, default=115200)
+    parser.add_argument('--out', default='runs', help="directory in which to store runs")
+    parser.add_argument('--csv', action='store_true', help="write CSV files instead of a run store")
+    parser.add_argument('--kp', type=float, default=None, help="controller gain, noted in the run index")
+    parser.add_argument('--period', action='append', default=[], metavar='TASK=MS',
+                        help="a task period, noted in the run index; may be given more than once")
+    parser.add_argument('--rig', default=None, help="rig name for the run index (default: the port name)")
+    parser.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    if args.csv:
+        sink = CsvSink(args.out)
+    else:
+        periods = {name: float(ms) for name, ms in (item.split('=', 1) for item in args.period)}
+        info = {'kp': args.kp, 'periods': periods}
+        if args.rig is not None:
+            info['rig'] = args.rig
+        sink = run_store.RunStoreSink(run_store.RunStore(args.out), **info)
+    try:
+        decoders = asyncio.run(ingest(args.ports, args.baudrate, sink, duration=args.duration))
+    except KeyboardInterrupt:
+        return
+    for port, decoder in decoders.items():
+        print(f'{port}: {decoder.crc_errors} corrupted frames, {decoder.lost_frames} frames lost')
+
+
+if __name__ == '__main__':
+    main()
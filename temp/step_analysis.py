@@ -0,0 +1,168 @@
+import numpy as np
+
+"""!
+    @file                       step_analysis.py
+    @brief                      Measures step responses from logged runs with NumPy
+    @details                    This file computes the usual measures of a step response from whole logged runs at
+                                once: rise time, percent overshoot, settling time, steady-state error, integrated
+                                absolute and squared error, and the frequency of any oscillation. A single run is
+                                given as two 1-D arrays of times and positions; many runs are given as 2-D arrays with
+                                one run per row, and every measure is computed for all the runs together. Runs of
+                                different lengths can be batched by padding the ends of the shorter rows with NaN.
+
+                                Times are in milliseconds and positions in encoder counts, as sent by the step
+                                response task. Measures which a run never reaches, such as the settling time of a run
+                                which doesn't settle, are NaN.
+
+                                Example:
+                                @code
+                                    import step_analysis
+                                    results = step_analysis.analyze(times, positions, setpoint=24000)
+                                    print(results['overshoot_pct'], results['settling_time_ms'])
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+## The names of the measures returned by analyze()
+MEASURES = ('rise_time_ms', 'overshoot_pct', 'settling_time_ms', 'steady_state_error', 'iae', 'ise',
+            'oscillation_hz')
+
+
+def stack_runs(runs):
+    """!
+        @brief                  Packs runs of different lengths into 2-D arrays padded with NaN
+        @param  runs            A sequence of (times, positions) pairs, each holding a sequence of values
+        @return                 A tuple of 2-D float arrays of times and positions, one run per row
+    """
+    length = max(len(times) for times, _ in runs)
+    times_out = np.full((len(runs), length), np.nan)
+    positions_out = np.full((len(runs), length), np.nan)
+    for row, (times, positions) in enumerate(runs):
+        times_out[row, :len(times)] = times
+        positions_out[row, :len(positions)] = positions
+    return times_out, positions_out
+
+
+def _first_crossing(times, fraction, level):
+    """!
+        @brief                  Finds when each run first reaches a fraction of its step, interpolating between samples
+        @param  times           2-D array of times
+        @param  fraction        2-D array of the response as a fraction of the step
+        @param  level           The fraction to look for
+        @return                 1-D array of crossing times, NaN for runs which never reach the level
+    """
+    above = fraction >= level
+    reached = above.any(axis=1)
+    index = above.argmax(axis=1)
+    rows = np.arange(times.shape[0])
+    before = np.maximum(index - 1, 0)
+    t0, t1 = times[rows, before], times[rows, index]
+    f0, f1 = fraction[rows, before], fraction[rows, index]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        crossing = np.where(f1 > f0, t0 + (level - f0) * (t1 - t0) / (f1 - f0), t1)
+    crossing = np.where(index == 0, t1, crossing)
+    return np.where(reached, crossing, np.nan)
+
+
+def _integrate(times, values):
+    """!
+        @brief                  Integrates each row over time with the trapezoid rule, skipping NaN padding
+    """
+    dt = np.diff(times, axis=1)
+    mean = (values[:, 1:] + values[:, :-1]) / 2
+    return np.nansum(dt * mean, axis=1)
+
+
+def analyze(times, positions, setpoint, initial=None, band=0.02, tail=0.1):
+    """!
+        @brief                  Computes the step response measures for one run or a batch of runs
+        @details                The rise time is from 10% to 90% of the step. The settling time, from the first
+                                sample, is when the response enters the band around the setpoint for good. The
+                                steady-state error is the setpoint less the mean position over the last @c tail of
+                                each run. IAE and ISE integrate the absolute and squared error in count*seconds and
+                                count^2*seconds. The oscillation frequency is found from the times at which the
+                                response crosses the setpoint, ignoring crossings within the settling band.
+        @param  times           Sample times in ms, a 1-D array for one run or a 2-D array with one run per row
+        @param  positions       Positions in encoder counts, the same shape as @c times
+        @param  setpoint        The setpoint of the step, a number or one value per run
+        @param  initial         The position before the step, a number or one value per run; by default the first
+                                position of each run
+        @param  band            The settling band as a fraction of the step size
+        @param  tail            The fraction of each run, at its end, used to find the steady-state error
+        @return                 A dictionary from the names in @c MEASURES to arrays with one value per run, or to
+                                single numbers if one run was given
+    """
+    single = np.ndim(times) == 1
+    times = np.atleast_2d(np.asarray(times, dtype=float))
+    positions = np.atleast_2d(np.asarray(positions, dtype=float))
+    if times.shape != positions.shape:
+        raise ValueError("Times and positions must have the same shape")
+    runs, length = times.shape
+    rows = np.arange(runs)
+
+    setpoint = np.broadcast_to(np.asarray(setpoint, dtype=float), (runs,))
+    if initial is None:
+        initial = positions[:, 0]
+    initial = np.broadcast_to(np.asarray(initial, dtype=float), (runs,))
+    step = (setpoint - initial)[:, None]
+    elapsed = times - times[:, :1]
+    error = setpoint[:, None] - positions
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = (positions - initial[:, None]) / step
+
+    valid = ~np.isnan(positions)
+    count = valid.sum(axis=1)
+    last = count - 1
+
+    rise = _first_crossing(elapsed, fraction, 0.9) - _first_crossing(elapsed, fraction, 0.1)
+
+    overshoot = np.maximum(0.0, (np.nanmax(fraction, axis=1) - 1.0) * 100.0)
+
+    outside = (np.abs(fraction - 1.0) > band) & valid
+    index = np.arange(length)
+    last_outside = np.where(outside, index, -1).max(axis=1)
+    settle_index = np.minimum(last_outside + 1, length - 1)
+    settling = np.where(last_outside >= last, np.nan, elapsed[rows, settle_index])
+    settling = np.where(last_outside < 0, 0.0, settling)
+
+    tail_start = count - np.maximum((count * tail).astype(int), 1)
+    in_tail = valid & (index >= tail_start[:, None])
+    steady = setpoint - np.nansum(np.where(in_tail, positions, 0.0), axis=1) / in_tail.sum(axis=1)
+
+    seconds = elapsed / 1000.0
+    iae = _integrate(seconds, np.abs(error))
+    ise = _integrate(seconds, error * error)
+
+    # Carry the sign of the error forward through samples within the band, so
+    # noise around the setpoint isn't counted as crossings
+    sign = np.where(np.abs(fraction - 1.0) > band, np.sign(error), 0.0)
+    sign = np.where(valid, sign, 0.0)
+    held = np.maximum.accumulate(np.where(sign != 0, index, 0), axis=1)
+    sign = sign[rows[:, None], held]
+    crossed = (sign[:, 1:] * sign[:, :-1]) < 0
+    crossings = crossed.sum(axis=1)
+    first = crossed.argmax(axis=1)
+    final = length - 2 - crossed[:, ::-1].argmax(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        span = seconds[rows, final + 1] - seconds[rows, first + 1]
+        frequency = np.where(crossings >= 3, (crossings - 1) / (2.0 * span), np.nan)
+
+    results = {'rise_time_ms': rise, 'overshoot_pct': overshoot, 'settling_time_ms': settling,
+               'steady_state_error': steady, 'iae': iae, 'ise': ise, 'oscillation_hz': frequency}
+    if single:
+        return {name: float(value[0]) for name, value in results.items()}
+    return results
+
+
+def summary(results):
+    """!
+        @brief                  Formats the measures of one run as readable text
+        @param  results         A dictionary returned by @c analyze() for a single run
+        @return                 A string with one measure per line
+    """
+    units = {'rise_time_ms': 'ms', 'overshoot_pct': '%', 'settling_time_ms': 'ms', 'steady_state_error': 'counts',
+             'iae': 'count*s', 'ise': 'count^2*s', 'oscillation_hz': 'Hz'}
+    return '\n'.join(f'{name:<20s}{results[name]:12.4g} {units[name]}' for name in MEASURES)
@@ -0,0 +1,211 @@
+import binascii
+import collections
+import struct
+
+"""!
+    @file                       telemetry_decode.py
+    @brief                      Decodes binary telemetry frames sent by the board
+    @details                    This file decodes the framed format written by @c src/telemetry.py. Bytes can be fed to
+                                a decoder in pieces of any size as they arrive from a serial port; complete frames
+                                whose CRC is correct are returned, and after a damaged frame or a lost byte the decoder
+                                searches for the next pair of sync bytes. The constants here must match those in
+                                @c src/telemetry.py.
+
+                                Metrics frames sent by @c telemetry.MetricsReporter can be turned into named tuples
+                                with decode_scheduler() and decode_task().
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+## Frame type for a record of sampled data, such as time and positions
+FRAME_SAMPLE = 0
+
+## Frame type for the scheduler-wide metrics
+FRAME_SCHEDULER = 1
+
+## Frame type for the profile of one task
+FRAME_TASK = 2
+
+## Number of buckets in each task histogram; must match @c HIST_BUCKETS in @c src/cotask.py
+HIST_BUCKETS = 16
+
+## Number of 32-bit fields holding a task's name
+NAME_FIELDS = 4
+
+## The two bytes which begin every frame
+SYNC = b'\xa5\x5a'
+
+## Number of bytes in a frame before the fields
+HEADER_SIZE = 6
+
+## Number of bytes in a frame after the fields
+CRC_SIZE = 2
+
+## A decoded frame: its type, sequence number and tuple of integer fields
+Frame = collections.namedtuple('Frame', ('type', 'seq', 'fields'))
+
+## Scheduler-wide metrics: the microseconds they cover, the scheduler passes and idle microseconds in that time, and
+#  the number of tasks whose profiles follow
+SchedulerMetrics = collections.namedtuple('SchedulerMetrics', ('elapsed_us', 'passes', 'idle_us', 'num_tasks'))
+
+## The profile of one task; times are in microseconds, the period is @c None for a task without one, and the
+#  histograms are tuples of @c HIST_BUCKETS counts
+TaskMetrics = collections.namedtuple('TaskMetrics', ('index', 'name', 'priority', 'period_us', 'runs', 'run_sum_us',
+                                                     'slowest_us', 'late_sum_us', 'latest_us', 'missed',
+                                                     'run_hist', 'late_hist'))
+
+
+def crc16(data):
+    """!
+        @brief                  Computes the CRC-16/CCITT used by the frames
+        @param  data            The bytes from the frame type to the end of the fields
+        @return                 The CRC value
+    """
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode(fields, seq=0, frame_type=FRAME_SAMPLE):
+    """!
+        @brief                  Packs one frame, as the board would; useful for testing and simulation
+        @param  fields          A sequence of integers to put in the frame
+        @param  seq             The sequence number
+        @param  frame_type      The frame type
+        @return                 The frame as bytes
+    """
+    body = struct.pack(f'<BBH{len(fields)}i', frame_type, len(fields), seq & 0xFFFF, *fields)
+    return SYNC + body + struct.pack('<H', crc16(body))
+
+
+def decode_scheduler(frame):
+    """!
+        @brief                  Reads the scheduler-wide metrics from a @c FRAME_SCHEDULER frame
+        @param  frame           The decoded @c Frame
+        @return                 A @c SchedulerMetrics tuple
+    """
+    elapsed, passes, idle, num_tasks = frame.fields[:4]
+    # Counters are unsigned on the board; the fields are decoded as signed
+    return SchedulerMetrics(elapsed & 0xFFFFFFFF, passes & 0xFFFFFFFF, idle & 0xFFFFFFFF, num_tasks)
+
+
+def decode_task(frame):
+    """!
+        @brief                  Reads one task's profile from a @c FRAME_TASK frame
+        @param  frame           The decoded @c Frame
+        @return                 A @c TaskMetrics tuple
+    """
+    fields = frame.fields
+    index, priority, period = fields[:3]
+    name = struct.pack(f'<{NAME_FIELDS}I', *(word & 0xFFFFFFFF for word in fields[3:3 + NAME_FIELDS]))
+    profile = [value & 0xFFFFFFFF for value in fields[3 + NAME_FIELDS:]]
+    return TaskMetrics(index, name.rstrip(b'\0').decode(errors='replace'), priority, None if period < 0 else period,
+                       *profile[:6], tuple(profile[6:6 + HIST_BUCKETS]),
+                       tuple(profile[6 + HIST_BUCKETS:6 + 2 * HIST_BUCKETS]))
+
+
+def bucket_limits(bucket):
+    """!
+        @brief                  Finds the range of times counted in a histogram bucket
+        @param  bucket          The index of the bucket
+        @return                 A tuple of the shortest time in µs counted in the bucket and the shortest time after
+                                it, which is @c None for the last bucket
+    """
+    low = (1 << bucket) >> 1
+    return low, None if bucket == HIST_BUCKETS - 1 else 1 << bucket
+
+
+def histogram_percentile(hist, fraction):
+    """!
+        @brief                  Finds an upper bound for a percentile of the times counted in a histogram
+        @param  hist            The bucket counts
+        @param  fraction        The percentile as a fraction, such as 0.99
+        @return                 The smallest time in µs which no more than @c 1 - fraction of the counted times
+                                reach; for the last bucket, its lower limit; @c None if the histogram is empty
+    """
+    total = sum(hist)
+    if total == 0:
+        return None
+    needed = fraction * total
+    count = 0
+    for bucket, bucket_count in enumerate(hist):
+        count += bucket_count
+        if count >= needed and bucket_count:
+            low, high = bucket_limits(bucket)
+            return low if high is None else high - 1
+    return bucket_limits(len(hist) - 1)[0]
+
+
+class FrameDecoder:
+    """!
+    @brief                      Turns a stream of bytes into telemetry frames
+    @details                    The decoder keeps bytes which don't yet make a whole frame until more are fed to it. It
+                                counts frames rejected for a bad CRC and frames missing from the sequence. Each
+                                frame type is written by its own writer on the board with its own sequence, so gaps
+                                are looked for in each type's sequence separately.
+    """
+
+    def __init__(self):
+        """!
+            @brief              Creates a decoder with nothing buffered
+        """
+        self._buffer = bytearray()
+        self._last_seq = {}
+        ## Number of frames whose CRC didn't match
+        self.crc_errors = 0
+        ## Number of frames missed, judged by gaps in the sequence numbers
+        self.lost_frames = 0
+        ## Number of bytes thrown away while searching for sync bytes
+        self.skipped_bytes = 0
+
+    def feed(self, data):
+        """!
+            @brief              Adds received bytes and returns the frames completed by them
+            @param  data        Bytes received from the serial port
+            @return             A list of @c Frame tuples, oldest first
+        """
+        self._buffer.extend(data)
+        frames = []
+        buf = self._buffer
+        start = 0
+        while True:
+            sync = buf.find(SYNC, start)
+            if sync < 0:
+                # Keep a last byte which might be the first half of a sync pair
+                keep = 1 if start < len(buf) and buf[-1] == SYNC[0] else 0
+                self.skipped_bytes += len(buf) - start - keep
+                start = len(buf) - keep
+                break
+            self.skipped_bytes += sync - start
+            start = sync
+            if len(buf) - start < HEADER_SIZE:
+                break
+            num_fields = buf[start + 3]
+            size = HEADER_SIZE + 4 * num_fields + CRC_SIZE
+            if len(buf) - start < size:
+                break
+            body = bytes(buf[start + 2:start + size - CRC_SIZE])
+            (crc,) = struct.unpack_from('<H', buf, start + size - CRC_SIZE)
+            if crc != crc16(body):
+                # Not a good frame; look for sync bytes after these ones
+                self.crc_errors += 1
+                self.skipped_bytes += 1
+                start += 1
+                continue
+            frame_type, _, seq = struct.unpack_from('<BBH', body)
+            fields = struct.unpack_from(f'<{num_fields}i', body, 4)
+            last_seq = self._last_seq.get(frame_type)
+            if last_seq is not None:
+                self.lost_frames += (seq - last_seq - 1) & 0xFFFF
+            self._last_seq[frame_type] = seq
+            frames.append(Frame(frame_type, seq, fields))
+            start += size
+        del buf[:start]
+        return frames
+
+    def reset(self):
+        """!
+            @brief              Forgets buffered bytes and the last sequence numbers
+        """
+        self._buffer.clear()
+        self._last_seq = {}
@@ -0,0 +1,102 @@
+import argparse
+import json
+import sys
+
+"""!
+    @file                       trace_export.py
+    @brief                      Turns a task trace printed by the board into a Chrome trace for Perfetto
+    @details                    On the board, @c cotask.trace.dump() prints the state transitions held in the trace
+                                buffer shared by all tasks. This file reads that printout, from a file or from standard
+                                input, and writes it in the Chrome trace event format, which can be opened at
+                                https://ui.perfetto.dev or in @c chrome://tracing. Each task is shown as a thread,
+                                ordered by priority, and each state as a slice lasting until the task's next
+                                transition; the last state of each task lasts until the end of the trace. Lines which
+                                aren't part of the dump, such as other REPL output, are ignored.
+
+                                Example, after saving the output of @c cotask.trace.dump() in @c dump.txt:
+                                @code
+                                    python trace_export.py dump.txt -o trace.json
+                                @endcode
+
+    @author                     Peyton Archibald
+    @author                     Harrison Hirsch
+    @date                       October 18, 2026
+"""
+
+
+def parse_dump(lines):
+    """!
+        @brief                  Reads the lines printed by @c cotask.TraceBuffer.dump()
+        @param  lines           An iterable of lines of text
+        @return                 A tuple of a dictionary from task ids to (priority, name) tuples, the number of
+                                transitions which were overwritten, and a list of (time in µs, task id, state) tuples
+    """
+    tasks = {}
+    overwritten = 0
+    transitions = []
+    for line in lines:
+        words = line.split()
+        try:
+            if len(words) >= 3 and words[0] == 'T':
+                tasks[int(words[1])] = (int(words[2]), ' '.join(words[3:]))
+            elif len(words) == 2 and words[0] == 'S':
+                overwritten = int(words[1])
+            elif len(words) == 3:
+                transitions.append(tuple(int(word) for word in words))
+        except ValueError:
+            continue
+    return tasks, overwritten, transitions
+
+
+def to_chrome_trace(tasks, overwritten, transitions, process_name='pyboard'):
+    """!
+        @brief                  Makes a Chrome trace from a parsed dump
+        @param  tasks           A dictionary from task ids to (priority, name) tuples
+        @param  overwritten     The number of transitions which were overwritten on the board
+        @param  transitions     A list of (time in µs, task id, state) tuples, oldest first
+        @param  process_name    The name shown for the process holding the tasks' threads
+        @return                 A dictionary which can be written with @c json.dump()
+    """
+    events = [{'ph': 'M', 'pid': 0, 'tid': 0, 'name': 'process_name', 'args': {'name': process_name}}]
+    task_ids = sorted(set(tasks) | {task_id for _, task_id, _ in transitions})
+    for task_id in task_ids:
+        priority, name = tasks.get(task_id, (0, f'Task {task_id}'))
+        events.append({'ph': 'M', 'pid': 0, 'tid': task_id, 'name': 'thread_name', 'args': {'name': name}})
+        # Higher priority tasks are shown first
+        events.append({'ph': 'M', 'pid': 0, 'tid': task_id, 'name': 'thread_sort_index',
+                       'args': {'sort_index': -priority}})
+
+    end = transitions[-1][0] if transitions else 0
+    last = {}
+    for time, task_id, state in transitions + [(end, task_id, None) for task_id in task_ids]:
+        if task_id in last:
+            start, previous = last[task_id]
+            events.append({'ph': 'X', 'pid': 0, 'tid': task_id, 'name': f'state {previous}', 'ts': start,
+                           'dur': time - start, 'args': {'state': previous}})
+        last[task_id] = (time, state)
+    return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'overwritten': overwritten}}
+
+
+def main():
+    """!
+        @brief                  Converts the dump named on the command line, or standard input, to a Chrome trace
+    """
+    parser = argparse.ArgumentParser(description="Convert a cotask trace dump to a Chrome/Perfetto trace")
+    parser.add_argument('dump', nargs='?', default=None, help="file holding the dump (default: standard input)")
+    parser.add_argument('-o', '--out', default='trace.json', help="the trace file to write")
+    args = parser.parse_args()
+
+    if args.dump is None:
+        parsed = parse_dump(sys.stdin)
+    else:
+        with open(args.dump) as file:
+            parsed = parse_dump(file)
+    with open(args.out, 'w') as file:
+        json.dump(to_chrome_trace(*parsed), file)
+    tasks, overwritten, transitions = parsed
+    print(f'{len(transitions)} transitions of {len(tasks)} tasks written to {args.out}'
+          + (f'; {overwritten} older transitions were overwritten' if overwritten else ''))
+
+
+if __name__ == '__main__':
+    main()